@@ -1,24 +1,116 @@
 from __future__ import annotations
 
 import concurrent.futures
+import contextlib
+import gzip
+import itertools
 import logging
+import queue
 import re
+import threading
 import time
 import xml.etree.ElementTree as ET
-from typing import TYPE_CHECKING, Optional
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Container,
+    Iterable,
+    Iterator,
+    Optional,
+    Union,
+)
 
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
 from urllib3.util.retry import Retry
 
 from archivooor import exceptions
+from archivooor.canonical import Canonicalizer, SeenSet, iter_unique
+from archivooor.concurrency import AdaptiveConcurrency
+from archivooor.poller import TERMINAL_STATUSES, PollScheduler
+from archivooor.ratelimit import DeadlineExceeded, RateLimiter, default_limiter
+from archivooor.retry import (  # noqa: F401 - retry limits are re-exported
+    MAX_RETRIES,
+    MAX_STATUS_RETRIES,
+    RetryBudget,
+    RetryPolicy,
+)
 
 if TYPE_CHECKING:
     from archivooor.history import HistoryDB
+    from archivooor.sitemap_cache import SitemapCache
 
 logger = logging.getLogger(__name__)
-MAX_RETRIES = 3
-MAX_STATUS_RETRIES = 5
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504, 520]
+SAVE_ENDPOINT = "https://web.archive.org/save/"
+# (connect, read) timeouts in seconds.
+SAVE_TIMEOUT = (10.0, 60.0)
+STATUS_TIMEOUT = (10.0, 30.0)
+SITEMAP_TIMEOUT = (10.0, 60.0)
+# Job ids per request to the multi-job status endpoint.
+STATUS_BATCH_SIZE = 100
+# Child sitemaps of a sitemapindex fetched at once, and how deep indexes may nest.
+SITEMAP_MAX_WORKERS = 8
+SITEMAP_MAX_DEPTH = 3
+_GZIP_MAGIC = b"\x1f\x8b"
+# Pages looked up in history at a time in since-last-run mode.
+HISTORY_LOOKUP_CHUNK = 500
+# How long submissions still running at the deadline are waited for; their
+# request timeouts are capped to the deadline, so this is only a safety net.
+DEADLINE_GRACE = 1.0
+
+
+class _ObservedRetry(Retry):
+    """
+    urllib3 Retry that reports every retried response to an observer, so throttling
+    absorbed by the transport is still visible to the caller.
+    """
+
+    def __init__(
+        self,
+        *args,
+        observer: Optional[Callable] = None,
+        budget: Optional[RetryBudget] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.observer = observer
+        self.budget = budget
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.observer = self.observer
+        retry.budget = self.budget
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, **kwargs):
+        retry = super().increment(method, url, response, error, **kwargs)
+        if self.budget is not None and not self.budget.try_spend():
+            raise MaxRetryError(
+                kwargs.get("_pool"), url, ResponseError("retry budget exhausted")
+            )
+        # Only reached when another attempt will actually be made.
+        if self.observer is not None:
+            self.observer(url, response, error)
+        return retry
+
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that takes a token from a RateLimiter before each request."""
+
+    def __init__(self, rate_limiter: RateLimiter, **kwargs):
+        self.rate_limiter = rate_limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.rate_limiter.acquire(request.url)
+        response = super().send(request, **kwargs)
+        self.rate_limiter.observe(
+            response.status_code, response.headers.get("Retry-After")
+        )
+        return response
 
 
 class NetworkHandler:
@@ -26,23 +118,67 @@ class NetworkHandler:
     Abstracts the creation of session with specific retry strategy and multithreading
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = 5,
+        retry_observer: Optional[Callable] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        self.retry_observer = retry_observer
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.max_workers = max_workers
         self.session = self.mount_session()
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
 
-    def mount_session(self):
-        retry_strategy = Retry(
-            total=5,
-            respect_retry_after_header=True,
+    def _on_retry(self, url, response, error) -> None:
+        if self.rate_limiter is not None:
+            if response is not None:
+                self.rate_limiter.observe(
+                    response.status, response.headers.get("Retry-After")
+                )
+            # Transport-level retries are requests too.
+            self.rate_limiter.acquire(url or "")
+        if self.retry_observer is not None:
+            self.retry_observer(response, error)
+
+    def _adapter(self, total: int, raise_on_status: bool = True) -> HTTPAdapter:
+        policy = self.retry_policy
+        retry_strategy = _ObservedRetry(
+            observer=self._on_retry,
+            budget=policy.budget if policy is not None else None,
+            total=total,
+            raise_on_status=raise_on_status,
+            # With a rate limiter, Retry-After pauses every thread through the
+            # shared limiter instead of sleeping in this connection only.
+            respect_retry_after_header=self.rate_limiter is None,
             backoff_factor=0.1,
-            status_forcelist=[429, 500, 502, 503, 504, 520],
+            status_forcelist=RETRY_STATUS_CODES,
             allowed_methods=["GET", "POST"],
         )
         retry_strategy.DEFAULT_BACKOFF_MAX = 5
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        if self.rate_limiter is not None:
+            return _RateLimitedAdapter(self.rate_limiter, max_retries=retry_strategy)
+        return HTTPAdapter(max_retries=retry_strategy)
+
+    def mount_session(self):
+        adapter = self._adapter(
+            self.retry_policy.transport_retries if self.retry_policy else 5
+        )
         session = requests.Session()
         session.mount(prefix="https://", adapter=adapter)
         session.mount(prefix="http://", adapter=adapter)
+        if self.retry_policy is not None:
+            # A failed save attempt fails right away, so that the policy's
+            # per-URL retries are the only ones and do not multiply with
+            # urllib3's. Throttled responses are still returned, for the rate
+            # limiter to see their Retry-After; save_page raises on them.
+            # Status checks keep their transport retries.
+            session.mount(
+                prefix=SAVE_ENDPOINT, adapter=self._adapter(0, raise_on_status=False)
+            )
+            session.mount(prefix=f"{SAVE_ENDPOINT}status", adapter=adapter)
         return session
 
 
@@ -58,12 +194,30 @@ class Archiver:
         *,
         db_path: Optional[str] = None,
         track_history: bool = True,
+        history_write_behind: bool = False,
+        adaptive_concurrency: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        save_timeout: tuple[float, float] = SAVE_TIMEOUT,
+        status_timeout: tuple[float, float] = STATUS_TIMEOUT,
     ):
         self.s3_access_key = s3_access_key
         self.s3_secret_key = s3_secret_key
-        handler = NetworkHandler()
+        self.save_timeout = save_timeout
+        self.status_timeout = status_timeout
+        self.rate_limiter = rate_limiter or default_limiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        handler = NetworkHandler(
+            retry_observer=self._observe_retry,
+            rate_limiter=self.rate_limiter,
+            retry_policy=self.retry_policy,
+        )
         self.session = handler.session
         self.executor = handler.executor
+        self._max_workers = handler.max_workers
+        self.concurrency: Optional[AdaptiveConcurrency] = None
+        if adaptive_concurrency:
+            self.use_adaptive_concurrency()
 
         headers = {
             "Accept": "application/json",
@@ -76,14 +230,42 @@ class Archiver:
             try:
                 from archivooor.history import HistoryDB
 
-                self._history = HistoryDB(db_path=db_path)
+                self._history = HistoryDB(
+                    db_path=db_path, write_behind=history_write_behind
+                )
             except Exception:
                 logger.debug("Failed to initialize history DB", exc_info=True)
+        self._poller: Optional[PollScheduler] = None
+        self._poller_lock = threading.Lock()
 
     @property
     def history(self) -> Optional[HistoryDB]:
         return self._history
 
+    def use_adaptive_concurrency(
+        self, controller: Optional[AdaptiveConcurrency] = None
+    ) -> AdaptiveConcurrency:
+        """
+        Let an AdaptiveConcurrency controller decide how many submissions run at once.
+
+        The executor is grown to the controller's maximum; the controller then gates
+        how many of its workers may have a request in flight.
+        """
+        controller = controller or AdaptiveConcurrency()
+        if controller.maximum > self._max_workers:
+            self.set_max_workers(controller.maximum)
+        self.concurrency = controller
+        return controller
+
+    def set_max_workers(self, max_workers: int) -> None:
+        """Replace the executor with one of ``max_workers`` concurrent submissions."""
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        previous = self.executor
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self._max_workers = max_workers
+        previous.shutdown(wait=False)
+
     def save_pages(
         self,
         pages: list,
@@ -94,18 +276,24 @@ class Archiver:
         skip_first_archive=True,
         outlinks_availability=False,
         email_result=False,
-        _retries: int = 0,
+        deadline: Optional[Union[float, timedelta]] = None,
+        skip_if_archived_within: Optional[timedelta] = None,
+        canonicalizer: Optional[Canonicalizer] = None,
     ):
         """
         Save a list of webpages to the archive.org API using multithreading and automatic retries
-        """
 
-        results = []
-        failures = []
-        future_to_url = {
-            self.executor.submit(
-                self.save_page,
-                url,
+        With a ``deadline`` (seconds or timedelta), URLs that could not be submitted
+        in time are returned with ``status: "deadline"``. With
+        ``skip_if_archived_within``, URLs archived successfully that recently are
+        returned with ``status: "skipped"`` instead of being submitted.
+        """
+        return list(
+            self.iter_save_pages(
+                pages,
+                deadline=deadline,
+                skip_if_archived_within=skip_if_archived_within,
+                canonicalizer=canonicalizer,
                 capture_all=capture_all,
                 capture_outlinks=capture_outlinks,
                 capture_screenshot=capture_screenshot,
@@ -113,53 +301,241 @@ class Archiver:
                 skip_first_archive=skip_first_archive,
                 outlinks_availability=outlinks_availability,
                 email_result=email_result,
-            ): url
-            for url in pages
+            )
+        )
+
+    def iter_save_pages(
+        self,
+        urls: Iterable[str],
+        max_in_flight: Optional[int] = None,
+        capture_all=False,
+        capture_outlinks=False,
+        capture_screenshot=False,
+        force_get=False,
+        skip_first_archive=True,
+        outlinks_availability=False,
+        email_result=False,
+        deadline: Optional[Union[float, timedelta]] = None,
+        skip_if_archived_within: Optional[timedelta] = None,
+        canonicalizer: Optional[Canonicalizer] = None,
+    ) -> Iterator[dict]:
+        """
+        Save webpages lazily, yielding each result as soon as it completes.
+
+        ``urls`` is consumed on demand and at most ``max_in_flight`` submissions
+        (twice the worker count by default) are pending at any time, so memory stays
+        bounded by the window instead of growing with the input.
+
+        ``deadline`` bounds the whole call (seconds or timedelta): no submission is
+        started that is not expected to finish in time, request timeouts are capped
+        to the time left, and every URL left over is yielded with
+        ``status: "deadline"``.
+
+        ``skip_if_archived_within`` yields URLs with a successful capture in the
+        history that recent as ``status: "skipped"`` without submitting them. The
+        recent successes are loaded into a Bloom filter when the call starts, so
+        only possible matches are looked up in the database.
+
+        With a ``canonicalizer``, every URL is rewritten to its canonical form
+        before anything else and duplicates are dropped, so the canonical form is
+        what gets submitted and recorded in the history.
+        """
+        if max_in_flight is None:
+            max_in_flight = 2 * self._max_workers
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        options = {
+            "capture_all": capture_all,
+            "capture_outlinks": capture_outlinks,
+            "capture_screenshot": capture_screenshot,
+            "force_get": force_get,
+            "skip_first_archive": skip_first_archive,
+            "outlinks_availability": outlinks_availability,
+            "email_result": email_result,
         }
-        for future in concurrent.futures.as_completed(future_to_url):
-            url = future_to_url[future]
+
+        deadline_at = None
+        if deadline is not None:
+            if isinstance(deadline, timedelta):
+                deadline = deadline.total_seconds()
+            deadline_at = time.monotonic() + deadline
+
+        if canonicalizer is not None:
+            urls = iter_unique(urls, canonicalizer)
+
+        recent = None
+        if skip_if_archived_within is not None:
+            if self._history is None:
+                raise ValueError("skip_if_archived_within needs history tracking")
+            from archivooor.history import RecentSuccesses
+
+            recent = RecentSuccesses(self._history, skip_if_archived_within)
+
+        for result in self._run_submissions(
+            iter(urls), max_in_flight, options, deadline_at, recent
+        ):
+            job_id = result.get("job_id")
+            if self._history and job_id:
+                self.poller.add(job_id)
+            yield result
+
+    def _run_submissions(
+        self,
+        urls: Iterator[str],
+        max_in_flight: int,
+        options: dict,
+        deadline_at: Optional[float] = None,
+        skip: Optional[Container[str]] = None,
+    ) -> Iterator[dict]:
+        """
+        Keep up to ``max_in_flight`` submissions pending and yield their results in
+        completion order.
+
+        Failed submissions go into the batch's RetryScheduler and are resubmitted,
+        interleaved with fresh URLs, once their own backoff has elapsed and as long as
+        the retry policy allows it.
+
+        ``deadline_at`` is a ``time.monotonic()`` value. Once the time left drops below
+        the average submission duration, nothing new is launched and the remaining
+        URLs are yielded as deadline results. Submissions still running
+        ``DEADLINE_GRACE`` seconds after the deadline are given up on the same way.
+
+        Fresh URLs found in ``skip`` are yielded as skipped results right away.
+        """
+        batch = self.retry_policy.new_batch()
+        retries = batch.scheduler
+        in_flight: dict[concurrent.futures.Future, tuple[str, int, float]] = {}
+        exhausted = False
+        expired = False
+        # Moving average of how long a submission takes, used against the deadline.
+        estimate = 0.0
+        try:
+            while True:
+                if (
+                    deadline_at is not None
+                    and not expired
+                    and deadline_at - time.monotonic() <= estimate
+                ):
+                    expired = True
+                    logger.warning("Deadline reached, not starting new submissions")
+                    for leftover, _ in retries.drain():
+                        yield _deadline_result(leftover)
+                    if not exhausted:
+                        for leftover in urls:
+                            yield _deadline_result(leftover)
+                        exhausted = True
+
+                while not expired and len(in_flight) < max_in_flight:
+                    due = retries.pop_due()
+                    if due is None:
+                        url = None if exhausted else next(urls, None)
+                        if url is None:
+                            exhausted = True
+                            break
+                        if skip is not None and url in skip:
+                            yield _skipped_result(url)
+                            continue
+                        batch.record_attempt()
+                        due = (url, 0)
+                    future = self.executor.submit(
+                        self._save_page_controlled,
+                        due[0],
+                        deadline_at=deadline_at,
+                        **options,
+                    )
+                    in_flight[future] = (due[0], due[1], time.monotonic())
+
+                # With the window full a due retry cannot start anyway, so only a
+                # completion (or the deadline) is worth waking up for.
+                wait_for = None
+                if len(in_flight) < max_in_flight:
+                    wait_for = retries.next_due_in()
+                if deadline_at is not None and not expired:
+                    until_deadline = max(deadline_at - time.monotonic() - estimate, 0)
+                    if wait_for is None or until_deadline < wait_for:
+                        wait_for = until_deadline
+                elif deadline_at is not None:
+                    wait_for = max(deadline_at + DEADLINE_GRACE - time.monotonic(), 0)
+                if not in_flight:
+                    if exhausted and not len(retries):
+                        return
+                    time.sleep(wait_for or 0)
+                    continue
+                done, _ = concurrent.futures.wait(
+                    in_flight,
+                    timeout=wait_for,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                if expired and not done and wait_for == 0:
+                    logger.warning(
+                        "Giving up on %d submissions still running after the deadline",
+                        len(in_flight),
+                    )
+                    for url, _, _ in in_flight.values():
+                        yield _deadline_result(url, "no response before the deadline")
+                    return
+                for future in done:
+                    url, attempt, started = in_flight.pop(future)
+                    estimate = 0.8 * estimate + 0.2 * (time.monotonic() - started)
+                    try:
+                        result = future.result()
+                    except exceptions.ArchivooorException:
+                        raise
+                    except Exception:
+                        logger.debug("Submission of %s failed", url, exc_info=True)
+                        if expired:
+                            yield _deadline_result(url)
+                            continue
+                        reason = batch.deny_reason(attempt)
+                        if reason is None:
+                            retries.schedule(url, attempt + 1)
+                            continue
+                        logger.warning("Giving up on %s: %s", url, reason)
+                        result = {"url": url, "status": "failed", "message": reason}
+                    yield result
+        finally:
+            # The consumer stopped early or an error is propagating.
+            for future in in_flight:
+                future.cancel()
+
+    def _save_page_controlled(self, url, deadline_at=None, **options):
+        """
+        Run save_page under the adaptive concurrency controller, if any. A URL whose
+        request cannot get a rate limit token before ``deadline_at`` is not sent and
+        comes back as a deadline result.
+        """
+        options["timeout"] = _cap_timeout(self.save_timeout, deadline_at)
+        try:
+            with self.rate_limiter.deadline(deadline_at):
+                return self._save_page_in_slot(url, **options)
+        except DeadlineExceeded:
+            return _deadline_result(url)
+
+    def _save_page_in_slot(self, url, **options):
+        controller = self.concurrency
+        if controller is None:
+            return self.save_page(url, **options)
+
+        controller.maybe_sample(self.get_user_status_request)
+        with controller.slot():
             try:
-                results.append(future.result())
-            except exceptions.ArchivooorException:
+                result = self.save_page(url, **options)
+            except (exceptions.ArchivooorException, DeadlineExceeded):
                 raise
             except Exception:
-                failures.append(url)
-
-        if self._history:
-            for result in results:
-                job_id = result.get("job_id") if isinstance(result, dict) else None
-                if job_id:
-                    self.executor.submit(self._poll_and_update, job_id)
-
-        if failures:
-            if _retries >= MAX_RETRIES:
-                logger.warning(
-                    "Max retries (%d) reached for %d URLs", MAX_RETRIES, len(failures)
-                )
-                for url in failures:
-                    results.append(
-                        {
-                            "url": url,
-                            "status": "failed",
-                            "message": "max retries exceeded",
-                        }
-                    )
-            else:
-                time.sleep(min(2**_retries, 30))
-                results.extend(
-                    self.save_pages(
-                        failures,
-                        capture_all=capture_all,
-                        capture_outlinks=capture_outlinks,
-                        capture_screenshot=capture_screenshot,
-                        force_get=force_get,
-                        skip_first_archive=skip_first_archive,
-                        outlinks_availability=outlinks_availability,
-                        email_result=email_result,
-                        _retries=_retries + 1,
-                    )
-                )
-        return results
+                controller.record_throttle()
+                raise
+        if result.get("status_code") in RETRY_STATUS_CODES:
+            controller.record_throttle()
+        else:
+            controller.record_success()
+        return result
+
+    def _observe_retry(self, response, error) -> None:
+        if self.concurrency is None or response is None:
+            return
+        if response.status == 429 or response.status >= 500:
+            self.concurrency.record_throttle()
 
     def save_page(
         self,
@@ -171,14 +547,18 @@ class Archiver:
         skip_first_archive=True,
         outlinks_availability=False,
         email_result=False,
+        timeout: Optional[tuple[float, float]] = None,
     ):
         """
         Save a single webpage to archive.org
+
+        ``timeout`` overrides the (connect, read) timeout of the save endpoint.
         """
 
         save_url = f"https://web.archive.org/save/{url}"
         response = self.session.post(
             url=save_url,
+            timeout=timeout or self.save_timeout,
             data={
                 "url": url,
                 "capture_all": capture_all,
@@ -190,6 +570,9 @@ class Archiver:
                 "email_result": email_result,
             },
         )
+        if response.status_code in RETRY_STATUS_CODES:
+            # Fails the attempt; the retry policy decides if the URL is sent again.
+            response.raise_for_status()
         if response.status_code == 200:
             data = response.json()
             if data.get("status") is None and data.get("job_id"):
@@ -228,31 +611,129 @@ class Archiver:
         :param job_id: job_id
         :return: save_status
         """
-        url = f"https://web.archive.org/save/status/{job_id}?_t={int(time.time())}"
-        response = self.session.get(url=url)
-        if response.status_code == 200:
-            data = response.json()
+        if _retries == 0:
+            self.retry_policy.budget.record_attempt()
+        data = self._fetch_save_status(job_id)
+        if isinstance(data, dict):
             if data.get("status") == "error":
-                if _retries >= MAX_STATUS_RETRIES:
+                if not self.retry_policy.allow_status_retry(_retries):
                     logger.warning(
-                        "Max status retries (%d) reached for job %s",
-                        MAX_STATUS_RETRIES,
+                        "Giving up on status of job %s after %d retries",
                         job_id,
+                        _retries,
                     )
                     return data
                 time.sleep(min(2**_retries, 30))
                 return self.get_save_status(job_id=job_id, _retries=_retries + 1)
-            else:
-                return data
-        else:
-            return response.text
+        return data
+
+    def get_save_statuses(
+        self, job_ids: Iterable[str], chunk_size: int = STATUS_BATCH_SIZE
+    ) -> dict:
+        """
+        Get the save status of several jobs with the multi-job status endpoint.
+
+        The ids are sent in chunks of ``chunk_size`` that are requested concurrently.
+        :return: dict mapping each job_id that was answered to its status payload,
+            or to the response body if its chunk failed
+        """
+        unique_ids = list(dict.fromkeys(job_ids))
+        chunks = [
+            unique_ids[i : i + chunk_size]
+            for i in range(0, len(unique_ids), chunk_size)
+        ]
+        if len(chunks) <= 1:
+            return self._fetch_save_statuses(chunks[0]) if chunks else {}
+        statuses: dict = {}
+        for chunk_statuses in self.executor.map(self._fetch_save_statuses, chunks):
+            statuses.update(chunk_statuses)
+        return statuses
+
+    def iter_reconcile(self, chunk_size: int = STATUS_BATCH_SIZE) -> Iterator[dict]:
+        """
+        Resolve the history entries whose job never reached a final status, for
+        instance because the process exited before polling finished.
+
+        The pending job ids are read from the history lazily and checked with the
+        multi-job status endpoint, ``chunk_size`` ids per request and one request
+        per worker at a time, under the status rate limit. The final statuses of
+        each round are written back in one transaction before its results are
+        yielded: ``{"job_id": ..., "status": ...}`` where status is the final
+        status, ``pending`` if the job is still running, or ``unknown`` if its
+        check failed. A failed request only leaves its own ids unknown.
+        """
+        if self._history is None:
+            raise ValueError("reconcile needs history tracking")
+        job_ids = self._history.iter_pending_jobs()
+        while chunk := list(itertools.islice(job_ids, chunk_size * self._max_workers)):
+            batches = [
+                chunk[i : i + chunk_size] for i in range(0, len(chunk), chunk_size)
+            ]
+            statuses: dict = {}
+            for batch_statuses in self.executor.map(
+                self._try_fetch_save_statuses, batches
+            ):
+                statuses.update(batch_statuses)
+            completions = []
+            results = []
+            for job_id in chunk:
+                data = statuses.get(job_id)
+                status = data.get("status") if isinstance(data, dict) else None
+                if isinstance(data, dict) and status in TERMINAL_STATUSES:
+                    completions.append(
+                        {
+                            "job_id": job_id,
+                            "status": status,
+                            "original_url": data.get("original_url"),
+                            "timestamp": data.get("timestamp"),
+                            "duration_sec": data.get("duration_sec"),
+                            "status_ext": data.get("status_ext"),
+                        }
+                    )
+                results.append({"job_id": job_id, "status": status or "unknown"})
+            self._history.update_completions(completions)
+            yield from results
+
+    def _try_fetch_save_statuses(self, job_ids: list[str]) -> dict:
+        """_fetch_save_statuses that answers nothing instead of raising."""
+        try:
+            return self._fetch_save_statuses(job_ids)
+        except Exception as e:
+            logger.warning("Status check of %d jobs failed: %s", len(job_ids), e)
+            return {}
+
+    def _fetch_save_statuses(self, job_ids: list[str]) -> dict:
+        self.retry_policy.budget.record_attempt()
+        response = self.session.post(
+            url="https://web.archive.org/save/status",
+            data={"job_ids": ",".join(job_ids)},
+            timeout=self.status_timeout,
+        )
+        if response.status_code != 200:
+            return {job_id: response.text for job_id in job_ids}
+        data = response.json()
+        if isinstance(data, dict):
+            data = [data]
+        return {
+            item["job_id"]: item
+            for item in data
+            if isinstance(item, dict) and item.get("job_id")
+        }
+
+    def _fetch_save_status(self, job_id: str):
+        """Single status request: the JSON payload, or the body of a non-200 response."""
+        url = f"https://web.archive.org/save/status/{job_id}?_t={int(time.time())}"
+        response = self.session.get(url=url, timeout=self.status_timeout)
+        if response.status_code == 200:
+            return response.json()
+        return response.text
 
     def get_user_status_request(self):
         """
         Get the current number of active and available session of the user account.
         """
         url = f"https://web.archive.org/save/status/user?_t={int(time.time())}"
-        response = self.session.get(url=url)
+        response = self.session.get(url=url, timeout=self.status_timeout)
 
         if response.status_code == 200:
             try:
@@ -284,68 +765,144 @@ class Archiver:
         except Exception:
             logger.debug("Failed to record history for %s", url, exc_info=True)
 
-    def _poll_and_update(
-        self, job_id: str, max_polls: int = 30, poll_interval: int = 6
-    ) -> None:
-        try:
-            for _ in range(max_polls):
-                data = self.get_save_status(job_id)
-                if isinstance(data, dict) and data.get("status") in (
-                    "success",
-                    "error",
-                ):
-                    if self._history:
-                        self._history.update_completion(
-                            job_id=job_id,
-                            status=data["status"],
-                            original_url=data.get("original_url"),
-                            timestamp=data.get("timestamp"),
-                            duration_sec=data.get("duration_sec"),
-                            status_ext=data.get("status_ext"),
-                        )
-                    return
-                time.sleep(poll_interval)
-        except Exception:
-            logger.debug("Poll failed for job %s", job_id, exc_info=True)
+    @property
+    def poller(self) -> PollScheduler:
+        """Scheduler tracking submitted jobs until completion, created on first use."""
+        with self._poller_lock:
+            if self._poller is None:
+                self._poller = PollScheduler(
+                    self.get_save_statuses,
+                    self._record_completion,
+                    error_retries=self.retry_policy.status_retries,
+                )
+            return self._poller
+
+    def _record_completion(self, job_id: str, data: dict) -> None:
+        if not self._history:
+            return
+        self._history.update_completion(
+            job_id=job_id,
+            status=data["status"],
+            original_url=data.get("original_url"),
+            timestamp=data.get("timestamp"),
+            duration_sec=data.get("duration_sec"),
+            status_ext=data.get("status_ext"),
+        )
+
+
+def _deadline_result(
+    url: str, message: str = "deadline reached before submission"
+) -> dict:
+    return {"url": url, "status": "deadline", "message": message}
+
+
+def _skipped_result(url: str) -> dict:
+    return {
+        "url": url,
+        "status": "skipped",
+        "message": "archived successfully within the skip window",
+    }
+
+
+def _cap_timeout(
+    timeout: tuple[float, float], deadline_at: Optional[float]
+) -> tuple[float, float]:
+    """Shrink a (connect, read) timeout so the request ends by ``deadline_at``."""
+    if deadline_at is None:
+        return timeout
+    remaining = max(deadline_at - time.monotonic(), 0.1)
+    return min(timeout[0], remaining), min(timeout[1], remaining)
 
 
 class Sitemap:
-    def __init__(self, sitemap_URL):
+    """
+    A urlset sitemap or a sitemapindex, from a local file or a URL.
+
+    With ``stream=True`` nothing is loaded up front: :meth:`iter_pages` parses the
+    file or HTTP response incrementally, and ``type`` and ``namespace`` are set
+    once it has read the root element.
+
+    The child sitemaps of a sitemapindex are fetched ``max_workers`` at a time over
+    one pooled session and always streamed, gzipped or not. Nested indexes are
+    expanded up to ``max_depth`` levels and a sitemap is never read twice, so
+    cycles end. Pages of different children arrive in the order they are read.
+
+    With a :class:`~archivooor.sitemap_cache.SitemapCache` remote sitemaps are
+    requested with ``If-None-Match``/``If-Modified-Since``, and on 304 their cached
+    ``<loc>`` values are used without downloading or parsing anything. A cache
+    implies ``stream=True``.
+
+    Every request uses the (connect, read) ``timeout``, and an index whose
+    children send nothing for as long as both together raises TimeoutError.
+    """
+
+    def __init__(
+        self,
+        sitemap_URL,
+        stream=False,
+        max_workers=SITEMAP_MAX_WORKERS,
+        max_depth=SITEMAP_MAX_DEPTH,
+        session: Optional[requests.Session] = None,
+        cache: Optional[SitemapCache] = None,
+        canonicalizer: Optional[Canonicalizer] = None,
+        timeout: tuple[float, float] = SITEMAP_TIMEOUT,
+    ):
         self.location = sitemap_URL
+        self.timeout = timeout
         self.LOCAL_PREFIX = "file://"
         self.local_sitemap = self._sitemap_is_local()
-        self.content = self._load_sitemap()
-        self.encoded_content = ET.fromstring(self.content)
-        self.namespace = self._get_namespace()
-        self.type = self._get_sitemap_type()
+        self.cache = cache
+        self.canonicalizer = canonicalizer
+        self.stream = stream or cache is not None
+        self.skipped = 0
+        self.max_workers = max_workers
+        self.max_depth = max_depth
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=max_workers)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+        if self.stream:
+            self.content = None
+            self.encoded_content = None
+            self.namespace = ""
+            self.type = None
+        else:
+            self.content = self._load_sitemap()
+            self.encoded_content = ET.fromstring(self.content)
+            self.namespace = self._get_namespace()
+            self.type = self._get_sitemap_type()
 
-    def _sitemap_is_local(self):
+    def _sitemap_is_local(self, location=None):
         """
         Returns True if we believe a URI to be local, False otherwise.
         """
-        return self.location.startswith(self.LOCAL_PREFIX) or self.location.startswith(
-            "/"
-        )
+        location = self.location if location is None else location
+        return location.startswith(self.LOCAL_PREFIX) or location.startswith("/")
+
+    def _local_path(self, location=None):
+        location = self.location if location is None else location
+        if location.startswith(self.LOCAL_PREFIX):
+            return location[len(self.LOCAL_PREFIX) :]
+        return location
 
     def _load_sitemap(self):
         """Loads a sitemap from a local file or download it from the internet."""
         if self.local_sitemap:
-            if self.location.startswith(self.LOCAL_PREFIX):
-                sitemap_filepath = self.location[len(self.LOCAL_PREFIX) :]
-            else:
-                sitemap_filepath = self.location
-
             # Try to open the file, error on failure
             try:
-                with open(sitemap_filepath, "r") as fp:
-                    contents = fp.read()
+                with open(self._local_path(), "rb") as fp:
+                    data = fp.read()
             except IOError as e:
                 print(e)
                 raise
-            return contents
+            if data.startswith(_GZIP_MAGIC):
+                data = gzip.decompress(data)
+            return data.decode()
 
         else:
-            response = requests.get(self.location)
+            response = self.session.get(self.location, timeout=self.timeout)
             try:
                 # Raise `requests.exceptions.HTTPError` if 4XX or 5XX status
                 response.raise_for_status()
@@ -353,34 +910,319 @@ class Sitemap:
                 print(e)
                 raise
             else:
+                if response.content.startswith(_GZIP_MAGIC):
+                    return gzip.decompress(response.content)
                 return response.text.encode("utf-8")
 
-    def _get_sitemap_type(self):
-        if "sitemapindex" in self.encoded_content.tag:
+    @contextlib.contextmanager
+    def _open_stream(self, location=None, headers=None):
+        """
+        Open a sitemap as a binary stream, gunzipping it on the fly if needed.
+
+        Yields ``(source, validators)``, where validators holds the ETag and
+        Last-Modified of a remote sitemap; source is None if the server answered
+        304 Not Modified to conditional ``headers``.
+        """
+        location = self.location if location is None else location
+        validators: dict = {}
+        # Errors are left to the caller: the root sitemap's reach the user, and a
+        # child sitemap's are logged by the worker thread that read it.
+        with contextlib.ExitStack() as stack:
+            if self._sitemap_is_local(location):
+                raw = stack.enter_context(open(self._local_path(location), "rb"))
+            else:
+                response = stack.enter_context(
+                    self.session.get(
+                        location, stream=True, headers=headers, timeout=self.timeout
+                    )
+                )
+                if response.status_code == 304:
+                    yield None, validators
+                    return
+                response.raise_for_status()
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                # Let urllib3 undo any Content-Encoding while we read.
+                response.raw.decode_content = True
+                raw = response.raw
+            head = raw.read(2)
+            source = _PrefixedReader(head, raw)
+            if head == _GZIP_MAGIC:
+                source = stack.enter_context(gzip.GzipFile(fileobj=source))
+            yield source, validators
+
+    @contextlib.contextmanager
+    def _open_entries(self, location=None):
+        """
+        Open a sitemap and yield its root tag and a lazy iterator over its
+        ``(loc, lastmod)`` entries, from the cache if the server reports it unchanged.
+        """
+        location = self.location if location is None else location
+        cached = None
+        headers = {}
+        if self.cache is not None and not self._sitemap_is_local(location):
+            cached = self.cache.get(location)
+            if cached is not None:
+                if cached["etag"]:
+                    headers["If-None-Match"] = cached["etag"]
+                if cached["last_modified"]:
+                    headers["If-Modified-Since"] = cached["last_modified"]
+        with self._open_stream(location, headers) as (source, validators):
+            if source is None:
+                if cached is None:
+                    raise ValueError(f"Unexpected 304 for uncached sitemap {location}")
+                logger.info("Sitemap %s not modified, using the cache", location)
+                yield cached["root_tag"], cached["entries"]
+                return
+            tag, entries = _iterparse_entries(source)
+            if self.cache is not None and any(validators.values()):
+                entries = self._cache_through(location, tag, entries, validators)
+            yield tag, entries
+
+    def _cache_through(
+        self,
+        location: str,
+        tag: str,
+        entries: Iterator[tuple[str, Optional[str]]],
+        validators: dict,
+    ) -> Iterator[tuple[str, Optional[str]]]:
+        """
+        Pass ``entries`` through, compressing them into the cache as they go, and
+        store them once the sitemap was read to the end.
+        """
+        assert self.cache is not None
+        writer = self.cache.writer(location, tag, **validators)
+        for loc, lastmod in entries:
+            writer.add(loc, lastmod)
+            yield loc, lastmod
+        try:
+            writer.commit()
+        except Exception:
+            logger.debug("Failed to cache sitemap %s", location, exc_info=True)
+
+    def _get_sitemap_type(self, tag=None):
+        tag = self.encoded_content.tag if tag is None else tag
+        if "sitemapindex" in tag:
             return "sitemapindex"
-        elif "urlset" in self.encoded_content.tag:
+        elif "urlset" in tag:
             return "urlset"
         else:
             return None
 
-    def _get_namespace(self):
+    def _get_namespace(self, tag=None):
         """Extract the namespace using a regular expression."""
-        match = re.match(r"{.*}", self.encoded_content.tag)
-        return match.group(0) if match else ""
+        return _namespace_of(self.encoded_content.tag if tag is None else tag)
+
+    def _iter_entries(self) -> Iterator[tuple[str, Optional[str]]]:
+        if self.encoded_content is not None:
+            entries = _entries_of(self.encoded_content)
+            if self.type == "urlset":
+                yield from entries
+            elif self.type == "sitemapindex":
+                yield from self._expand_index([loc for loc, _ in entries])
+            else:
+                raise ValueError(f"Unknown sitemap type: {self.type}")
+            return
+
+        with self._open_entries() as (tag, stream_entries):
+            self.namespace = self._get_namespace(tag)
+            self.type = self._get_sitemap_type(tag)
+            if self.type == "urlset":
+                yield from stream_entries
+                return
+            if self.type != "sitemapindex":
+                raise ValueError(f"Unknown sitemap type: {self.type}")
+            children = [loc for loc, _ in stream_entries]
+        yield from self._expand_index(children)
+
+    def _expand_index(self, children: list[str]) -> Iterator[tuple[str, Optional[str]]]:
+        """Yield the pages of the child sitemaps of an index, fetched concurrently."""
+        results: queue.Queue = queue.Queue(maxsize=1000)
+        stop = threading.Event()
+        visited = {self.location}
+        pending = 0
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="archivooor-sitemap"
+        )
+
+        def schedule(loc: str, depth: int) -> None:
+            nonlocal pending
+            if not loc:
+                return
+            if loc in visited:
+                logger.warning("Skipping sitemap %s: already read (cycle)", loc)
+                return
+            if depth > self.max_depth:
+                logger.warning("Skipping sitemap %s: deeper than %d", loc, depth - 1)
+                return
+            visited.add(loc)
+            executor.submit(self._read_child, loc, depth, results, stop)
+            pending += 1
+
+        try:
+            for child in children:
+                schedule(child, 1)
+            while pending:
+                try:
+                    kind, value, depth = results.get(timeout=sum(self.timeout))
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"No data from {pending} child sitemaps in "
+                        f"{sum(self.timeout):.0f}s"
+                    ) from None
+                if kind == "page":
+                    yield value
+                elif kind == "sitemap":
+                    schedule(value[0], depth)
+                else:
+                    pending -= 1
+        finally:
+            # Also reached when the consumer stops early: unblock the workers.
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _read_child(
+        self, location: str, depth: int, results: queue.Queue, stop: threading.Event
+    ) -> None:
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            with self._open_entries(location) as (tag, entries):
+                child_type = self._get_sitemap_type(tag)
+                if child_type is None:
+                    raise ValueError(f"Unknown sitemap type: {tag}")
+                kind = "page" if child_type == "urlset" else "sitemap"
+                for entry in entries:
+                    if not put((kind, entry, depth + 1)):
+                        return
+        except Exception as e:
+            logger.warning("Failed to read sitemap %s: %s", location, e)
+        finally:
+            put(("done", location, depth))
+
+    def iter_entries(self) -> Iterator[tuple[str, Optional[str]]]:
+        """
+        Yield ``(page, lastmod)`` for each page of the sitemap lazily, without
+        duplicates; lastmod is None if the entry has no ``<lastmod>``. Pages are
+        rewritten by the ``canonicalizer`` first, if there is one.
+        """
+        seen = SeenSet()
+        for url, lastmod in self._iter_entries():
+            if url and self.canonicalizer is not None:
+                url = self.canonicalizer(url)
+            if url and seen.add(url):
+                yield url, lastmod
+
+    def iter_pages(self, since_last_run: Optional[HistoryDB] = None) -> Iterator[str]:
+        """
+        Yield the pages of the sitemap lazily, without duplicates.
+
+        With ``since_last_run``, pages whose ``<lastmod>`` is not newer than their
+        latest successful capture in that history are skipped and counted in
+        ``skipped``. Pages without a ``<lastmod>`` are always yielded.
+        """
+        self.skipped = 0
+        if since_last_run is None:
+            for url, _ in self.iter_entries():
+                yield url
+            return
+        entries = self.iter_entries()
+        while chunk := list(itertools.islice(entries, HISTORY_LOOKUP_CHUNK)):
+            captured = since_last_run.last_successes(
+                [url for url, lastmod in chunk if lastmod]
+            )
+            for url, lastmod in chunk:
+                if url in captured and not _modified_since(lastmod, captured[url]):
+                    self.skipped += 1
+                    continue
+                yield url
 
     def extract_pages_from_sitemap(self):
         """
         Extract the various pages from the sitemap text.
         """
-        if self.type == "urlset":
-            urls = []
-            for loc_node in self.encoded_content.findall(f".//{self.namespace}loc"):
-                urls.append(loc_node.text)
+        return list(self.iter_pages())
 
-            return list(set(urls))
-        elif self.type == "sitemapindex":
-            raise NotImplementedError(
-                "sitemapindex not implemented yet.\nPlease retry with a urlset sitemap."
-            )
-        else:
-            raise ValueError(f"Unknown sitemap type: {self.type}")
+
+def _iterparse_entries(source) -> tuple[str, Iterator[tuple[str, Optional[str]]]]:
+    """
+    Start parsing a sitemap stream: return the root tag and a lazy iterator over the
+    ``(loc, lastmod)`` of its ``<url>`` or ``<sitemap>`` elements.
+    """
+    events = ET.iterparse(source, events=("start", "end"))
+    _, root = next(events)
+
+    def entries() -> Iterator[tuple[str, Optional[str]]]:
+        depth = 1
+        for event, elem in events:
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1:
+                yield _entry_of(elem, _namespace_of(root.tag))
+                # The child of the root is complete; drop it so the tree
+                # never grows beyond one <url> element.
+                root.clear()
+
+    return root.tag, entries()
+
+
+def _entries_of(root: ET.Element) -> list[tuple[str, Optional[str]]]:
+    namespace = _namespace_of(root.tag)
+    return [_entry_of(child, namespace) for child in root]
+
+
+def _entry_of(elem: ET.Element, namespace: str) -> tuple[str, Optional[str]]:
+    loc = (elem.findtext(f"{namespace}loc") or "").strip()
+    lastmod = (elem.findtext(f"{namespace}lastmod") or "").strip()
+    return loc, lastmod or None
+
+
+def _modified_since(lastmod: Optional[str], captured_at: str) -> bool:
+    """Whether a ``<lastmod>`` value is later than a capture recorded in history."""
+    if not lastmod:
+        return True
+    try:
+        modified = datetime.fromisoformat(lastmod.replace("Z", "+00:00"))
+        captured = datetime.fromisoformat(captured_at)
+    except ValueError:
+        return True
+    if modified.tzinfo is None:
+        modified = modified.replace(tzinfo=timezone.utc)
+    if captured.tzinfo is None:
+        captured = captured.replace(tzinfo=timezone.utc)
+    return modified > captured
+
+
+class _PrefixedReader:
+    """Binary reader that returns ``head`` before reading on from ``fp``."""
+
+    def __init__(self, head: bytes, fp):
+        self._head = head
+        self._fp = fp
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._head:
+            return self._fp.read(size)
+        head, self._head = self._head, b""
+        if size is None or size < 0:
+            return head + self._fp.read()
+        if size <= len(head):
+            self._head = head[size:]
+            return head[:size]
+        return head + self._fp.read(size - len(head))
+
+
+def _namespace_of(tag: str) -> str:
+    match = re.match(r"{.*}", tag)
+    return match.group(0) if match else ""
@@ -0,0 +1,404 @@
+"""asyncio-based counterpart of :class:`archivooor.archiver.Archiver`.
+
+Requires the optional ``aiohttp`` dependency (``pip install archivooor[async]``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from archivooor import exceptions
+from archivooor.archiver import RETRY_STATUS_CODES, SAVE_TIMEOUT, STATUS_TIMEOUT
+from archivooor.poller import TERMINAL_STATUSES
+from archivooor.ratelimit import RateLimiter, default_limiter
+from archivooor.retry import RetryBatch, RetryPolicy
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - exercised only without the extra
+    aiohttp = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from archivooor.history import HistoryDB
+
+logger = logging.getLogger(__name__)
+DEFAULT_MAX_CONCURRENCY = 50
+
+
+class TransientStatus(Exception):
+    """A save attempt was answered with a status that is worth retrying."""
+
+    def __init__(self, status: int):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def _client_timeout(timeout: tuple[float, float]) -> aiohttp.ClientTimeout:
+    connect, read = timeout
+    return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+
+class AsyncArchiver:
+    """
+    Used for authenticating and interacting with the archive.org API from asyncio code.
+
+    Concurrency is bounded by a semaphore of ``max_concurrency`` in-flight requests
+    instead of a thread pool, so hundreds of submissions can be pending at once.
+    Requests take their tokens from the same process-wide RateLimiter as
+    :class:`~archivooor.archiver.Archiver`, and every retry is decided by a
+    RetryPolicy. History is written behind by default so that SQLite commits
+    never run on the event loop.
+    """
+
+    def __init__(
+        self,
+        s3_access_key: Optional[str],
+        s3_secret_key: Optional[str],
+        *,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        db_path: Optional[str] = None,
+        track_history: bool = True,
+        history_write_behind: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        if aiohttp is None:
+            raise exceptions.ArchivooorException(
+                "AsyncArchiver requires aiohttp - install it with 'archivooor[async]'."
+            )
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.s3_access_key = s3_access_key
+        self.s3_secret_key = s3_secret_key
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter or default_limiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.headers = {
+            "Accept": "application/json",
+            "Authorization": f"LOW {self.s3_access_key}:{self.s3_secret_key}",
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._poll_tasks: set[asyncio.Task] = set()
+
+        self._history: Optional[HistoryDB] = None
+        if track_history:
+            try:
+                from archivooor.history import HistoryDB
+
+                self._history = HistoryDB(
+                    db_path=db_path, write_behind=history_write_behind
+                )
+            except Exception:
+                logger.debug("Failed to initialize history DB", exc_info=True)
+
+    @property
+    def history(self) -> Optional[HistoryDB]:
+        return self._history
+
+    async def __aenter__(self) -> AsyncArchiver:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Wait for pending status polls and history writes, then release the session."""
+        if self._poll_tasks:
+            await asyncio.gather(*self._poll_tasks, return_exceptions=True)
+        if self._history is not None and self._history.write_behind:
+            await asyncio.to_thread(self._history.flush)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the session and semaphore bind to the running loop.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector
+            )
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _acquire(self, url: str) -> None:
+        while (wait := self.rate_limiter.try_acquire(url)) > 0:
+            await asyncio.sleep(wait)
+
+    async def _request(
+        self, method: str, url: str, retries: Optional[int] = None, **kwargs
+    ) -> tuple[int, str]:
+        """
+        Perform a request under the rate limiter and the concurrency semaphore,
+        retrying transient statuses up to ``retries`` times (the policy's
+        transport retries by default) the same way the synchronous session's
+        urllib3 ``Retry`` does.
+        """
+        session = self._get_session()
+        assert self._semaphore is not None
+        policy = self.retry_policy
+        if retries is None:
+            retries = policy.transport_retries
+        status, text = 0, ""
+        for attempt in range(retries + 1):
+            await self._acquire(url)
+            async with self._semaphore:
+                async with session.request(method, url, **kwargs) as response:
+                    status = response.status
+                    text = await response.text()
+                    retry_after = response.headers.get("Retry-After")
+            # A Retry-After pauses the shared limiter, which the next attempt
+            # waits on along with every other request.
+            self.rate_limiter.observe(status, retry_after)
+            if status not in RETRY_STATUS_CODES or attempt == retries:
+                break
+            if not policy.budget.try_spend():
+                break
+            await asyncio.sleep(min(0.1 * 2**attempt, 5))
+        return status, text
+
+    async def save_pages(
+        self,
+        pages: list,
+        capture_all=False,
+        capture_outlinks=False,
+        capture_screenshot=False,
+        force_get=False,
+        skip_first_archive=True,
+        outlinks_availability=False,
+        email_result=False,
+    ):
+        """
+        Save a list of webpages to the archive.org API concurrently with automatic retries
+        """
+
+        batch = self.retry_policy.new_batch()
+        options = dict(
+            capture_all=capture_all,
+            capture_outlinks=capture_outlinks,
+            capture_screenshot=capture_screenshot,
+            force_get=force_get,
+            skip_first_archive=skip_first_archive,
+            outlinks_availability=outlinks_availability,
+            email_result=email_result,
+        )
+        outcomes = await asyncio.gather(
+            *(self._save_page_retried(url, batch, **options) for url in pages),
+            return_exceptions=True,
+        )
+
+        results = []
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+            results.append(outcome)
+
+        if self._history:
+            for result in results:
+                job_id = result.get("job_id") if isinstance(result, dict) else None
+                if job_id:
+                    task = asyncio.create_task(self._poll_and_update(job_id))
+                    self._poll_tasks.add(task)
+                    task.add_done_callback(self._poll_tasks.discard)
+        return results
+
+    async def _save_page_retried(self, url, batch: RetryBatch, **options):
+        """
+        Save ``url``, backing off on its own and retrying failed attempts for as long
+        as the retry policy allows.
+        """
+        batch.record_attempt()
+        attempt = 0
+        while True:
+            try:
+                return await self.save_page(url, **options)
+            except exceptions.ArchivooorException:
+                raise
+            except Exception:
+                logger.debug("Submission of %s failed", url, exc_info=True)
+            reason = batch.deny_reason(attempt)
+            if reason is not None:
+                logger.warning("Giving up on %s: %s", url, reason)
+                return {"url": url, "status": "failed", "message": reason}
+            attempt += 1
+            await asyncio.sleep(batch.scheduler.delay_for(attempt))
+
+    async def save_page(
+        self,
+        url,
+        capture_all=False,
+        capture_outlinks=False,
+        capture_screenshot=False,
+        force_get=False,
+        skip_first_archive=True,
+        outlinks_availability=False,
+        email_result=False,
+    ):
+        """
+        Save a single webpage to archive.org
+        """
+
+        save_url = f"https://web.archive.org/save/{url}"
+        # aiohttp only accepts str/bytes form values, so mirror how requests
+        # encodes booleans.
+        data = {
+            "url": url,
+            "capture_all": str(capture_all),
+            "capture_outlinks": str(capture_outlinks),
+            "force_get": str(force_get),
+            "skip_first_archive": str(skip_first_archive),
+            "capture_screenshot": str(capture_screenshot),
+            "outlinks_availability": str(outlinks_availability),
+            "email_result": str(email_result),
+        }
+        # No transport retries: save_pages retries the URL under the policy, so
+        # the two layers do not multiply.
+        status_code, text = await self._request(
+            "POST",
+            save_url,
+            retries=0,
+            data=data,
+            timeout=_client_timeout(SAVE_TIMEOUT),
+        )
+        if status_code in RETRY_STATUS_CODES:
+            raise TransientStatus(status_code)
+        if status_code == 200:
+            data = json.loads(text)
+            if data.get("status") is None and data.get("job_id"):
+                status = "submitted"
+            else:
+                status = data.get("status")
+
+            formatted_response = {
+                "url": url,
+                "job_id": data.get("job_id"),
+                "message": data.get("message"),
+                "status": status,
+                "full_response": data,
+            }
+            await self._record_history(url, data.get("job_id"), status)
+            return formatted_response
+
+        elif status_code == 401:
+            raise exceptions.ArchivooorException(
+                "Unauthorized - Please check if the keys are correct."
+            )
+        else:
+            formatted_response = {
+                "url": url,
+                "status": "error",
+                "message": f"HTTP {status_code}",
+                "status_code": status_code,
+                "full_response": text,
+            }
+            await self._record_history(url, None, "error")
+            return formatted_response
+
+    async def get_save_status(self, job_id: str, _retries: int = 0):
+        """
+        Given a job_id, get the save status of the job.
+        :param job_id: job_id
+        :return: save_status
+        """
+        url = f"https://web.archive.org/save/status/{job_id}?_t={int(time.time())}"
+        if _retries == 0:
+            self.retry_policy.budget.record_attempt()
+        status_code, text = await self._request(
+            "GET", url, timeout=_client_timeout(STATUS_TIMEOUT)
+        )
+        if status_code == 200:
+            data = json.loads(text)
+            if data.get("status") == "error":
+                if not self.retry_policy.allow_status_retry(_retries):
+                    logger.warning(
+                        "Giving up on status of job %s after %d retries",
+                        job_id,
+                        _retries,
+                    )
+                    return data
+                await asyncio.sleep(min(2**_retries, 30))
+                return await self.get_save_status(job_id=job_id, _retries=_retries + 1)
+            else:
+                return data
+        else:
+            return text
+
+    async def get_user_status_request(self):
+        """
+        Get the current number of active and available session of the user account.
+        """
+        url = f"https://web.archive.org/save/status/user?_t={int(time.time())}"
+        status_code, text = await self._request(
+            "GET", url, timeout=_client_timeout(STATUS_TIMEOUT)
+        )
+
+        if status_code == 200:
+            try:
+                return json.loads(text)
+            except Exception as exc:
+                if "Too Many Requests" in text:
+                    raise exceptions.ArchivooorException(
+                        "Too Many Requests - Please try again later."
+                    ) from exc
+                raise exc
+        elif status_code == 429:
+            raise exceptions.ArchivooorException(
+                "Too Many Requests - Please try again later."
+            )
+        elif status_code == 401:
+            raise exceptions.ArchivooorException(
+                "Unauthorized - Please check if the keys are correct."
+            )
+        else:
+            raise exceptions.ArchivooorException(
+                f"Unexpected error: {status_code} - {text}"
+            )
+
+    async def _write_history(self, write: Callable, *args, **kwargs) -> None:
+        """Apply a history write without blocking the event loop on SQLite."""
+        assert self._history is not None
+        if self._history.write_behind:
+            # Only queues the row for the writer thread.
+            write(*args, **kwargs)
+        else:
+            await asyncio.to_thread(write, *args, **kwargs)
+
+    async def _record_history(
+        self, url: str, job_id: Optional[str], status: str
+    ) -> None:
+        if not self._history:
+            return
+        try:
+            await self._write_history(
+                self._history.record_submission, url, job_id, status
+            )
+        except Exception:
+            logger.debug("Failed to record history for %s", url, exc_info=True)
+
+    async def _poll_and_update(
+        self, job_id: str, max_polls: int = 30, poll_interval: int = 6
+    ) -> None:
+        try:
+            for _ in range(max_polls):
+                data = await self.get_save_status(job_id)
+                if isinstance(data, dict) and data.get("status") in TERMINAL_STATUSES:
+                    if self._history:
+                        await self._write_history(
+                            self._history.update_completion,
+                            job_id=job_id,
+                            status=data["status"],
+                            original_url=data.get("original_url"),
+                            timestamp=data.get("timestamp"),
+                            duration_sec=data.get("duration_sec"),
+                            status_ext=data.get("status_ext"),
+                        )
+                    return
+                await asyncio.sleep(poll_interval)
+        except Exception:
+            logger.debug("Poll failed for job %s", job_id, exc_info=True)
@@ -1,10 +1,163 @@
 """Command line interface for the archivooor package."""
 
+import collections
+import csv
+import gzip
+import io
+import itertools
 import json
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+from typing import Optional
 
 import click
+import requests
+
+from archivooor import archiver, concurrency, exceptions, key_utils
+from archivooor.canonical import TRAILING_SLASH_POLICIES, Canonicalizer, iter_unique
+from archivooor.sitemap_cache import SitemapCache
+from archivooor.work_queue import WorkQueue
+
+# Seconds between progress lines of long-running commands.
+PROGRESS_INTERVAL = 5.0
+EXPORT_COLUMNS = (
+    "id",
+    "url",
+    "job_id",
+    "submitted_at",
+    "status",
+    "original_url",
+    "timestamp",
+    "duration_sec",
+    "status_ext",
+    "completed_at",
+)
+
+
+class Duration(click.ParamType):
+    """A duration such as ``90``, ``90s``, ``15m``, ``2h`` or ``7d``."""
+
+    name = "duration"
+    _UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, timedelta):
+            return value
+        match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(value))
+        if not match:
+            self.fail(f"{value!r} is not a duration like 90s, 15m or 2h", param, ctx)
+        return timedelta(seconds=float(match.group(1)) * self._UNITS[match.group(2)])
+
+
+DURATION = Duration()
+
+
+class Cursor(click.ParamType):
+    """An export cursor ``SUBMITTED_AT,ID`` as printed by ``history export``."""
+
+    name = "cursor"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, tuple):
+            return value
+        submitted_at, _, row_id = str(value).rpartition(",")
+        if not submitted_at or not row_id.isdigit():
+            self.fail(f"{value!r} is not a cursor like SUBMITTED_AT,ID", param, ctx)
+        return submitted_at, int(row_id)
+
+
+CURSOR = Cursor()
+
+
+class Progress:
+    """Prints throughput and, when the total is known, an ETA to stderr."""
+
+    def __init__(
+        self,
+        total=None,
+        interval=PROGRESS_INTERVAL,
+        clock=time.monotonic,
+        show_counts=False,
+        unit="URL",
+    ):
+        self.total = total
+        self.show_counts = show_counts
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self.counts: collections.Counter = collections.Counter()
+        self._clock = clock
+        self._started = clock()
+        self._last_report = self._started
+
+    def update(self, status) -> None:
+        self.done += 1
+        self.counts[status] += 1
+        now = self._clock()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            click.echo(self.line(counts=self.show_counts), err=True)
+
+    def line(self, counts=False) -> str:
+        elapsed = self._clock() - self._started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        text = f"{self.done} {self.unit}s, {rate:.1f} {self.unit}/s"
+        if self.total:
+            text = f"{self.done}/{self.total} {self.unit}s, {rate:.1f} {self.unit}/s"
+            if rate > 0:
+                remaining = max(self.total - self.done, 0) / rate
+                text += f", ETA {_format_seconds(remaining)}"
+        if counts and self.counts:
+            summary = ", ".join(f"{k}: {v}" for k, v in sorted(self.counts.items()))
+            text += f" ({summary})"
+        return text
+
+
+def _read_urls(fp):
+    """
+    Yield the URLs of a newline-delimited file object opened in binary mode, which
+    may be gzip-compressed, skipping blank lines and ``#`` comments. Errors reading
+    or decoding the file are raised as a ClickException.
+    """
+    try:
+        if not hasattr(fp, "peek"):
+            fp = io.BufferedReader(fp)
+        if fp.peek(2)[:2] == b"\x1f\x8b":
+            fp = gzip.GzipFile(fileobj=fp)
+        for line in io.TextIOWrapper(fp, encoding="utf-8"):
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+    except (OSError, UnicodeDecodeError) as e:
+        raise click.ClickException(f"Failed to read URLs: {e}")
+
+
+def _write_result(output, response, output_format, verbose) -> None:
+    """Write one submission result and flush it, so the output can be tailed."""
+    if output_format == "jsonl":
+        text = json.dumps(response, default=str)
+    elif verbose:
+        text = "\n".join(f"{key}: {value}" for key, value in response.items())
+    else:
+        text = f"status: {response.get('status')}\njob_id: {response.get('job_id')}"
+    # click.echo flushes, and writes to stdout when output is None.
+    click.echo(text, file=output)
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
 
-from archivooor import archiver, exceptions, key_utils
+
+def _format_duration(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds:.1f}s"
 
 
 @click.group(
@@ -41,64 +194,374 @@ def cli(ctx, no_history):
 
 @cli.command(name="save")
 @click.argument("urls", nargs=-1)
+@click.option(
+    "-i",
+    "--input",
+    "input_file",
+    default=None,
+    type=click.File("rb"),
+    help="Read newline-delimited URLs (optionally gzipped) from FILE, or - for stdin",
+)
+@click.option(
+    "--resume",
+    "run_id",
+    default=None,
+    metavar="RUN_ID",
+    help="Continue an interrupted run with the URLs it had not submitted yet",
+)
+@click.option(
+    "-o",
+    "--output",
+    default=None,
+    type=click.File("w", lazy=False),
+    help="Write results to FILE instead of stdout",
+)
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="text",
+    show_default=True,
+    type=click.Choice(["text", "jsonl"]),
+    help="Result format; jsonl writes one JSON object per line",
+)
+@click.option(
+    "--no-full-response",
+    is_flag=True,
+    help="Leave the raw API response out of the results",
+)
 @click.option("-v", "--verbose", is_flag=True, help="Enables verbose mode")
-def save(urls, verbose):
+@click.option(
+    "--adaptive",
+    is_flag=True,
+    help="Adapt the number of concurrent submissions to the free capture sessions",
+)
+@click.option(
+    "--max-concurrency",
+    default=concurrency.DEFAULT_MAXIMUM,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Upper bound for the number of concurrent submissions with --adaptive",
+)
+@click.option(
+    "--max-retries",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Retries per URL after a failed submission [default: 3]",
+)
+@click.option(
+    "--retry-budget",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Max ratio of retries to first attempts per minute [default: 0.2]",
+)
+@click.option(
+    "--deadline",
+    default=None,
+    type=DURATION,
+    help="Stop starting submissions that cannot finish within this time, e.g. 15m",
+)
+@click.option(
+    "--skip-if-archived-within",
+    "skip_within",
+    default=None,
+    type=DURATION,
+    help="Skip URLs archived successfully within this time, e.g. 7d",
+)
+@click.option(
+    "--canonicalize/--no-canonicalize",
+    default=False,
+    show_default=True,
+    help="Rewrite URLs to a canonical form and drop duplicates before submitting",
+)
+@click.option(
+    "--trailing-slash",
+    default="keep",
+    show_default=True,
+    type=click.Choice(TRAILING_SLASH_POLICIES),
+    help="What canonicalization does with the trailing slash of paths",
+)
+def save(
+    urls,
+    input_file,
+    run_id,
+    output,
+    output_format,
+    no_full_response,
+    verbose,
+    adaptive,
+    max_concurrency,
+    max_retries,
+    retry_budget,
+    deadline,
+    skip_within,
+    canonicalize,
+    trailing_slash,
+):
     """Save 1 or multiple URLS to the Wayback Machine.
 
-    Multiple URLs can be passed as space-separated arguments.
+    Multiple URLs can be passed as space-separated arguments, or read from a
+    file with --input. Results are written and flushed as soon as each URL is
+    submitted, and a summary of the counts per status goes to stderr every few
+    seconds. With --canonicalize, URLs are rewritten first (lowercase host, no
+    default port, tracking parameters or fragment, sorted query), so variants
+    of a page are submitted once.
+
+    Every run is tracked in a durable queue and its RUN_ID is printed to
+    stderr; if the process dies, --resume RUN_ID submits the URLs that were
+    left over. A run is removed from the queue once nothing is left to
+    submit or retry, and after a week otherwise.
 
     Example:
 
     \b
         $ archivooor save https://www.example.com https://www.example.org
+        $ zcat urls.txt.gz | archivooor save --input - --format jsonl -o out.jsonl
+        $ archivooor save --resume 3f2a9c1b7d4e
     """
-    if not urls:
+    if not urls and input_file is None and run_id is None:
         click.echo(save.get_help(click.Context(save)))
         return
+    if run_id is not None and (urls or input_file is not None):
+        raise click.UsageError("--resume cannot be combined with URLs or --input")
+
+    archive = click.get_current_context().obj
+    if skip_within is not None and archive.history is None:
+        raise click.ClickException(
+            "--skip-if-archived-within needs history (--no-history)"
+        )
+
+    work_queue = WorkQueue()
+    work_queue.prune()
+    if run_id is not None:
+        if not work_queue.has_run(run_id):
+            work_queue.close()
+            raise click.ClickException(f"Unknown run {run_id}")
+        work_queue.resume(run_id)
+        pages = work_queue.iter_run(run_id)
+    else:
+        run_id = work_queue.create_run()
+        new_pages = iter(urls)
+        if input_file is not None:
+            new_pages = itertools.chain(new_pages, _read_urls(input_file))
+        if canonicalize:
+            new_pages = iter_unique(new_pages, Canonicalizer(trailing_slash))
+        pages = work_queue.iter_run(run_id, new_pages)
+    click.echo(f"run_id: {run_id}", err=True)
+
+    if max_retries is not None:
+        archive.retry_policy.max_retries = max_retries
+    if retry_budget is not None:
+        archive.retry_policy.budget.ratio = retry_budget
+    controller = None
+    if adaptive:
+        controller = archive.use_adaptive_concurrency(
+            concurrency.AdaptiveConcurrency(
+                initial=min(concurrency.DEFAULT_INITIAL, max_concurrency),
+                maximum=max_concurrency,
+            )
+        )
 
+    progress = Progress(show_counts=True)
     try:
-        responses = click.get_current_context().obj.save_pages(
-            pages=list(urls),
+        for response in archive.iter_save_pages(
+            pages,
             capture_all=True,
             capture_outlinks=True,
             force_get=True,
             capture_screenshot=True,
             skip_first_archive=True,
             outlinks_availability=True,
+            deadline=deadline,
+            skip_if_archived_within=skip_within,
+        ):
+            if no_full_response:
+                response.pop("full_response", None)
+            _write_result(output, response, output_format, verbose)
+            work_queue.record_result(run_id, response)
+            progress.update(response.get("status"))
+    except exceptions.ArchivooorException as e:
+        raise click.ClickException(str(e))
+    finally:
+        left = work_queue.counts(run_id)
+        if not any(left.get(state) for state in ("pending", "in_flight", "failed")):
+            work_queue.delete_run(run_id)
+        work_queue.close()
+    if left.get("pending") or left.get("in_flight"):
+        click.echo(
+            f"{left.get('pending', 0) + left.get('in_flight', 0)} URLs left, "
+            f"continue with: archivooor save --resume {run_id}",
+            err=True,
+        )
+    if verbose and controller is not None:
+        click.echo(
+            f"concurrency_target: {controller.limit}", err=output_format != "text"
         )
+    if output_format == "jsonl" or output is not None:
+        click.echo(progress.line(counts=True), err=True)
+
+
+@cli.command(name="sitemap")
+@click.argument("location", nargs=1)
+@click.option("-v", "--verbose", is_flag=True, help="Print the result of every URL")
+@click.option(
+    "--limit",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Submit at most this many pages",
+)
+@click.option(
+    "--concurrency",
+    "max_workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of concurrent submissions [default: 5]",
+)
+@click.option(
+    "--since-last-run",
+    is_flag=True,
+    help="Skip pages whose <lastmod> is not newer than their last successful capture",
+)
+@click.option(
+    "--no-cache", is_flag=True, help="Download the sitemap even if it is cached"
+)
+@click.option(
+    "--deadline",
+    default=None,
+    type=DURATION,
+    help="Stop starting submissions that cannot finish within this time, e.g. 15m",
+)
+@click.option(
+    "--skip-if-archived-within",
+    "skip_within",
+    default=None,
+    type=DURATION,
+    help="Skip URLs archived successfully within this time, e.g. 7d",
+)
+@click.option(
+    "--canonicalize/--no-canonicalize",
+    default=False,
+    show_default=True,
+    help="Rewrite URLs to a canonical form and drop duplicates before submitting",
+)
+@click.option(
+    "--trailing-slash",
+    default="keep",
+    show_default=True,
+    type=click.Choice(TRAILING_SLASH_POLICIES),
+    help="What canonicalization does with the trailing slash of paths",
+)
+def sitemap(
+    location,
+    verbose,
+    limit,
+    max_workers,
+    since_last_run,
+    no_cache,
+    deadline,
+    skip_within,
+    canonicalize,
+    trailing_slash,
+):
+    """Save the pages of a sitemap to the Wayback Machine.
+
+    LOCATION is the URL or local path of a sitemap or sitemap index. Pages are
+    submitted while the sitemap is still being read.
+
+    Example:
+
+    \b
+        $ archivooor sitemap https://www.example.com/sitemap.xml --limit 1000
+    """
+    archive = click.get_current_context().obj
+    if since_last_run and archive.history is None:
+        raise click.ClickException("--since-last-run needs history (--no-history)")
+    if skip_within is not None and archive.history is None:
+        raise click.ClickException(
+            "--skip-if-archived-within needs history (--no-history)"
+        )
+    if max_workers is not None:
+        archive.set_max_workers(max_workers)
+
+    cache = None if no_cache else SitemapCache()
+    source = archiver.Sitemap(
+        location,
+        stream=True,
+        cache=cache,
+        canonicalizer=Canonicalizer(trailing_slash) if canonicalize else None,
+    )
+    pages = source.iter_pages(
+        since_last_run=archive.history if since_last_run else None
+    )
+    if limit is not None:
+        pages = itertools.islice(pages, limit)
+
+    progress = Progress(total=limit)
+    try:
+        for response in archive.iter_save_pages(
+            pages,
+            capture_all=True,
+            capture_outlinks=True,
+            force_get=True,
+            capture_screenshot=True,
+            skip_first_archive=True,
+            outlinks_availability=True,
+            deadline=deadline,
+            skip_if_archived_within=skip_within,
+        ):
+            progress.update(response.get("status"))
+            if verbose:
+                click.echo(
+                    f"{response.get('status')} {response.get('url')} "
+                    f"{response.get('job_id') or response.get('message') or ''}".rstrip()
+                )
     except exceptions.ArchivooorException as e:
         raise click.ClickException(str(e))
-    if verbose:
-        for response in responses:
-            for key, value in response.items():
-                click.echo(f"{key}: {value}")
-    else:
-        for response in responses:
-            click.echo(
-                f"status: {response.get('status')}\njob_id: {response.get('job_id')}"
-            )
+    except (OSError, requests.RequestException, ET.ParseError, ValueError) as e:
+        raise click.ClickException(f"Failed to read sitemap {location}: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
+
+    click.echo(progress.line(), err=True)
+    counts = progress.counts
+    if since_last_run:
+        counts["skipped"] += source.skipped
+    for status, count in sorted(counts.items()):
+        click.echo(f"{status}: {count}")
 
 
 @cli.command(name="job")
-@click.argument("job_id", nargs=1)
+@click.argument("job_ids", nargs=-1, required=True)
 @click.option("-v", "--verbose", is_flag=True, help="Enables verbose mode")
-def job(job_id, verbose):
-    """Get the status of a job by JOB_ID.
+def job(job_ids, verbose):
+    """Get the status of one or more jobs by JOB_ID.
 
     JOB_ID is the unique identifier of the job returned by the save command.
+    Several ids are looked up together in batched requests.
     """
+    archive = click.get_current_context().obj
     try:
-        job_response = click.get_current_context().obj.get_save_status(job_id=job_id)
+        if len(job_ids) == 1:
+            responses = {job_ids[0]: archive.get_save_status(job_id=job_ids[0])}
+        else:
+            responses = archive.get_save_statuses(job_ids)
     except exceptions.ArchivooorException as e:
         raise click.ClickException(str(e))
-    if verbose:
-        for key, value in job_response.items():
-            click.echo(f"{key}: {value}")
-    else:
-        click.echo(f"status: {job_response.get('status')}")
-        click.echo(f"original_url: {job_response.get('original_url')}")
-        outlinks = job_response.get("outlinks")
-        click.echo(f"outlinks_saved: {len(outlinks) if outlinks else 0}")
+    for job_id in dict.fromkeys(job_ids):
+        job_response = responses.get(job_id)
+        if len(job_ids) > 1:
+            click.echo(f"job_id: {job_id}")
+        if not isinstance(job_response, dict):
+            click.echo(f"error: {job_response}")
+        elif verbose:
+            for key, value in job_response.items():
+                click.echo(f"{key}: {value}")
+        else:
+            click.echo(f"status: {job_response.get('status')}")
+            click.echo(f"original_url: {job_response.get('original_url')}")
+            outlinks = job_response.get("outlinks")
+            click.echo(f"outlinks_saved: {len(outlinks) if outlinks else 0}")
 
 
 @cli.command(name="stats")
@@ -190,6 +653,231 @@ def history(ctx, url, status, since, limit, as_json):
         click.echo(f"{u:<50} {jid:<46} {st:<10} {sub:<20} {ts:<20}")
 
 
+@history.command(name="stats")
+@click.option(
+    "--by",
+    default="day",
+    show_default=True,
+    type=click.Choice(["day", "domain"]),
+    help="Group submissions per day or per domain",
+)
+@click.option("--since", default=None, help="Only count days since ISO 8601 date")
+@click.option("--domain", default=None, help="Only count submissions of DOMAIN")
+@click.option("--limit", default=30, show_default=True, type=int, help="Max rows")
+@click.option("--json", "as_json", is_flag=True, help="Output as JSON")
+@click.pass_context
+def history_stats(ctx, by, since, domain, limit, as_json):
+    """Show success rate, errors and durations of past submissions.
+
+    The numbers come from rollups kept up to date as submissions are recorded,
+    so they are fast even on a large history. p50/p95 durations are estimates.
+    """
+    archive = ctx.obj
+    if archive.history is None:
+        raise click.ClickException("History tracking is disabled (--no-history)")
+
+    rows = archive.history.stats(by=by, since=since, domain=domain, limit=limit)
+
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+
+    if not rows:
+        click.echo("No submissions found.")
+        return
+
+    header = (
+        f"{by.capitalize():<40} {'Total':>8} {'Success':>8} {'Errors':>8} "
+        f"{'Rate':>7} {'p50':>7} {'p95':>7}  Top error"
+    )
+    click.echo(header)
+    click.echo("-" * len(header))
+    for row in rows:
+        key = row[by] if len(row[by]) <= 39 else row[by][:38] + "…"
+        rate = row["success_rate"]
+        top_error = next(iter(row["errors"].items()), None)
+        click.echo(
+            f"{key:<40} {row['total']:>8} {row['statuses'].get('success', 0):>8} "
+            f"{row['statuses'].get('error', 0):>8} "
+            f"{'-' if rate is None else f'{rate:.1%}':>7} "
+            f"{_format_duration(row['p50']):>7} {_format_duration(row['p95']):>7}  "
+            f"{f'{top_error[0]} ({top_error[1]})' if top_error else ''}".rstrip()
+        )
+
+
+@history.command(name="export")
+@click.option(
+    "-f",
+    "--format",
+    "output_format",
+    default="jsonl",
+    show_default=True,
+    type=click.Choice(["jsonl", "csv"]),
+    help="Export format",
+)
+@click.option(
+    "-o",
+    "--output",
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write to FILE instead of stdout; appended to with --after",
+)
+@click.option("--url", default=None, help="Filter by URL (substring match)")
+@click.option(
+    "--status",
+    default=None,
+    type=click.Choice(["submitted", "success", "error", "failed"]),
+    help="Filter by status",
+)
+@click.option("--since", default=None, help="Export entries since ISO 8601 date")
+@click.option(
+    "--after",
+    default=None,
+    type=CURSOR,
+    help="Resume after the cursor printed by an earlier export",
+)
+@click.pass_context
+def history_export(ctx, output_format, output, url, status, since, after):
+    """Export the history, oldest first.
+
+    Rows are streamed page by page, so memory use stays flat however large
+    the history is. The cursor of the last exported row is printed to stderr;
+    pass it to --after to continue an interrupted export.
+
+    Example:
+
+    \b
+        $ archivooor history export -f csv -o history.csv
+        $ archivooor history export -f csv -o history.csv --after 2026-05-01T10:00:00+00:00,4711
+    """
+    archive = ctx.obj
+    if archive.history is None:
+        raise click.ClickException("History tracking is disabled (--no-history)")
+
+    cursor = after
+    with click.open_file(output or "-", "a" if after else "w", encoding="utf-8") as out:
+        writer = None
+        if output_format == "csv":
+            writer = csv.DictWriter(
+                out,
+                fieldnames=EXPORT_COLUMNS,
+                extrasaction="ignore",
+                lineterminator="\n",
+            )
+            if after is None:
+                writer.writeheader()
+        try:
+            for row in archive.history.iter_rows(
+                url=url, status=status, since=since, after=after
+            ):
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    out.write(json.dumps(row) + "\n")
+                cursor = (row["submitted_at"], row["id"])
+        finally:
+            if cursor is not None:
+                click.echo(f"cursor: {cursor[0]},{cursor[1]}", err=True)
+
+
+@history.command(name="prune")
+@click.option(
+    "--older-than",
+    default=None,
+    type=DURATION,
+    help="Delete entries submitted longer ago than this, e.g. 90d",
+)
+@click.option(
+    "--keep-latest",
+    default=None,
+    type=click.IntRange(min=0),
+    help="Delete all but the latest N entries of each URL",
+)
+@click.option(
+    "--terminal-only",
+    is_flag=True,
+    help="Delete entries that never reached success, error or failed",
+)
+@click.option(
+    "--archive",
+    "archive_path",
+    default=None,
+    type=click.Path(dir_okay=False, writable=True),
+    help="Move the deleted entries into this SQLite file",
+)
+@click.confirmation_option(prompt="Delete matching history?")
+@click.pass_context
+def history_prune(ctx, older_than, keep_latest, terminal_only, archive_path):
+    """Apply retention rules to the history and shrink its database.
+
+    An entry is deleted when it matches every given rule. Entries are deleted
+    in small batches, so submissions running at the same time are not held
+    up, and the freed space is returned to the file system.
+
+    Example:
+
+    \b
+        $ archivooor history prune --older-than 180d --keep-latest 1 --yes
+    """
+    archive = ctx.obj
+    if archive.history is None:
+        raise click.ClickException("History tracking is disabled (--no-history)")
+    if older_than is None and keep_latest is None and not terminal_only:
+        raise click.UsageError(
+            "Give at least one of --older-than, --keep-latest or --terminal-only"
+        )
+
+    count = archive.history.prune(
+        older_than=older_than,
+        keep_latest=keep_latest,
+        terminal_only=terminal_only,
+        archive_path=archive_path,
+    )
+    click.echo(f"Deleted {count} entries.")
+
+
+@history.command(name="reconcile")
+@click.option(
+    "--concurrency",
+    "max_workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of concurrent status requests [default: 5]",
+)
+@click.option("-v", "--verbose", is_flag=True, help="Print the outcome of every job")
+@click.pass_context
+def history_reconcile(ctx, max_workers, verbose):
+    """Resolve entries still marked as submitted.
+
+    Entries stay "submitted" when archivooor exits before their job finished.
+    This checks the status of every such job in batches, within the rate
+    limit, and records the final outcome. Jobs that are still running stay
+    pending; run the command again later for those.
+    """
+    archive = ctx.obj
+    if archive.history is None:
+        raise click.ClickException("History tracking is disabled (--no-history)")
+    if max_workers is not None:
+        archive.set_max_workers(max_workers)
+
+    total = archive.history.count_pending_jobs()
+    if not total:
+        click.echo("No pending jobs.")
+        return
+    progress = Progress(total=total, show_counts=True, unit="job")
+    try:
+        for result in archive.iter_reconcile():
+            progress.update(result["status"])
+            if verbose:
+                click.echo(f"{result['status']} {result['job_id']}")
+    except (exceptions.ArchivooorException, requests.RequestException) as e:
+        raise click.ClickException(f"{e} (finished jobs so far were recorded)")
+    finally:
+        click.echo(progress.line(), err=True)
+    for status, count in sorted(progress.counts.items()):
+        click.echo(f"{status}: {count}")
+
+
 @history.command(name="clear")
 @click.confirmation_option(prompt="Delete all history?")
 @click.pass_context
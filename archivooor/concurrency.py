@@ -0,0 +1,142 @@
+"""Adaptive control of the number of in-flight save submissions."""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INITIAL = 5
+DEFAULT_MINIMUM = 1
+DEFAULT_MAXIMUM = 50
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for the number of concurrent submissions.
+
+    The limit grows by ``increase`` after every window of ``limit`` successful
+    submissions while the account reports free capture sessions, and is multiplied
+    by ``decrease_factor`` when a 429 or server error is observed. Samples of the
+    user-status endpoint cap the limit to the sessions the account actually has.
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL,
+        minimum: int = DEFAULT_MINIMUM,
+        maximum: int = DEFAULT_MAXIMUM,
+        increase: int = 1,
+        decrease_factor: float = 0.5,
+        sample_interval: float = 30.0,
+        cooldown: float = 5.0,
+    ):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("expected 1 <= minimum <= initial <= maximum")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be between 0 and 1")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.sample_interval = sample_interval
+        self.cooldown = cooldown
+
+        self._limit = initial
+        self._in_flight = 0
+        self._successes = 0
+        self._available: Optional[int] = None
+        self._last_decrease = float("-inf")
+        self._last_sample = float("-inf")
+        self._sampling = False
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency target."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self._limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self._successes < self._limit:
+                return
+            self._successes = 0
+            if self._available is not None and self._available <= 0:
+                return
+            self._set_limit(self._limit + self.increase, "capacity available")
+
+    def record_throttle(self) -> None:
+        with self._cond:
+            now = time.monotonic()
+            # One decrease per cooldown, otherwise every request that was already
+            # in flight when the service started throttling would halve the limit.
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._successes = 0
+            self._set_limit(int(self._limit * self.decrease_factor), "throttled")
+
+    def update_from_user_status(self, user_status: dict) -> None:
+        """Apply a response of the ``/save/status/user`` endpoint."""
+        available = user_status.get("available")
+        processing = user_status.get("processing")
+        if not isinstance(available, int):
+            return
+        with self._cond:
+            self._available = available
+            if isinstance(processing, int):
+                capacity = available + processing
+                if capacity < self._limit:
+                    self._set_limit(capacity, "account session limit")
+
+    def maybe_sample(self, fetch_user_status: Callable[[], dict]) -> None:
+        """Sample the user status if ``sample_interval`` elapsed, from one thread at a time."""
+        with self._cond:
+            now = time.monotonic()
+            if self._sampling or now - self._last_sample < self.sample_interval:
+                return
+            self._sampling = True
+            self._last_sample = now
+        try:
+            self.update_from_user_status(fetch_user_status())
+        except Exception:
+            logger.debug("Failed to sample user status", exc_info=True)
+        finally:
+            with self._cond:
+                self._sampling = False
+
+    def _set_limit(self, value: int, reason: str) -> None:
+        value = max(self.minimum, min(self.maximum, value))
+        if value == self._limit:
+            return
+        logger.info("Concurrency target %d -> %d (%s)", self._limit, value, reason)
+        self._limit = value
+        self._cond.notify_all()
@@ -2,16 +2,46 @@
 
 from __future__ import annotations
 
+import atexit
+import collections
 import logging
 import os
+import queue
 import sqlite3
 import threading
-from datetime import datetime, timezone
-from typing import Optional
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from archivooor.bloom import BloomFilter
+from archivooor.poller import TERMINAL_STATUSES
 
 logger = logging.getLogger(__name__)
 
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 3
+# Write-behind mode: rows per transaction and longest wait for a batch to fill.
+WRITE_BATCH_SIZE = 500
+WRITE_FLUSH_INTERVAL = 0.05
+# Rows fetched per query by iter_rows.
+EXPORT_PAGE_SIZE = 1000
+# Rows deleted per transaction by prune, and free pages released after each.
+PRUNE_BATCH_SIZE = 1000
+VACUUM_PAGES = 1000
+# Statuses of rows that will not change any more: the final statuses of a save
+# job, and failed for submissions that never got one.
+SETTLED_STATUSES = (*TERMINAL_STATUSES, "failed")
+_PENDING_JOBS_SQL = (
+    f"job_id IS NOT NULL AND status NOT IN ({', '.join('?' * len(SETTLED_STATUSES))})"
+)
+
+_INSERT_SQL = (
+    "INSERT INTO submissions (url, job_id, submitted_at, status) VALUES (?, ?, ?, ?)"
+)
+_UPDATE_SQL = """\
+UPDATE submissions
+SET status = ?, original_url = ?, timestamp = ?,
+    duration_sec = ?, status_ext = ?, completed_at = ?
+WHERE job_id = ?"""
 
 _SCHEMA_SQL = """\
 CREATE TABLE IF NOT EXISTS submissions (
@@ -31,6 +61,140 @@ CREATE INDEX IF NOT EXISTS idx_submissions_status ON submissions (status);
 CREATE INDEX IF NOT EXISTS idx_submissions_submitted_at ON submissions (submitted_at);
 """
 
+# Trigram index over submissions.url, kept in sync by triggers, so substring
+# searches on url do not scan the table.
+_URL_INDEX_SQL = """CREATE VIRTUAL TABLE IF NOT EXISTS submissions_url_fts USING fts5 (
+    url, content = 'submissions', content_rowid = 'id', tokenize = 'trigram'
+);
+CREATE TRIGGER IF NOT EXISTS submissions_url_fts_insert
+AFTER INSERT ON submissions BEGIN
+    INSERT INTO submissions_url_fts (rowid, url) VALUES (new.id, new.url);
+END;
+CREATE TRIGGER IF NOT EXISTS submissions_url_fts_delete
+AFTER DELETE ON submissions BEGIN
+    INSERT INTO submissions_url_fts (submissions_url_fts, rowid, url)
+    VALUES ('delete', old.id, old.url);
+END;
+CREATE TRIGGER IF NOT EXISTS submissions_url_fts_update
+AFTER UPDATE OF url ON submissions BEGIN
+    INSERT INTO submissions_url_fts (submissions_url_fts, rowid, url)
+    VALUES ('delete', old.id, old.url);
+    INSERT INTO submissions_url_fts (rowid, url) VALUES (new.id, new.url);
+END;
+INSERT INTO submissions_url_fts (submissions_url_fts) VALUES ('rebuild');
+"""
+
+# Upper edges in seconds of the duration histogram buckets of the rollups; the
+# last bucket is open-ended and -1 stands for "no duration".
+DURATION_BUCKETS = (1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300)
+
+
+def _day_sql(row: str) -> str:
+    return f"substr({row}.submitted_at, 1, 10)"
+
+
+def _domain_sql(row: str) -> str:
+    rest = (
+        f"substr({row}.url, CASE instr({row}.url, '://') WHEN 0 THEN 1 "
+        f"ELSE instr({row}.url, '://') + 3 END)"
+    )
+    # The host ends at the first of "/", "?" or "#", if any.
+    end = ", ".join(f"instr({rest} || '{c}', '{c}')" for c in "/?#")
+    return f"lower(substr({rest}, 1, min({end}) - 1))"
+
+
+def _bucket_sql(row: str) -> str:
+    whens = " ".join(
+        f"WHEN {row}.duration_sec < {edge} THEN {i}"
+        for i, edge in enumerate(DURATION_BUCKETS)
+    )
+    return (
+        f"CASE WHEN {row}.duration_sec IS NULL THEN -1 {whens} "
+        f"ELSE {len(DURATION_BUCKETS)} END"
+    )
+
+
+def _rollup_key_sql(row: str) -> str:
+    return (
+        f"{_day_sql(row)}, {_domain_sql(row)}, {row}.status, "
+        f"COALESCE({row}.status_ext, ''), {_bucket_sql(row)}"
+    )
+
+
+def _rollup_match_sql(row: str) -> str:
+    return (
+        f"day = {_day_sql(row)} AND domain = {_domain_sql(row)} "
+        f"AND status = {row}.status AND status_ext = COALESCE({row}.status_ext, '') "
+        f"AND bucket = {_bucket_sql(row)}"
+    )
+
+
+_ROLLUP_COLUMNS = "day, domain, status, status_ext, bucket"
+
+# Submission counts per day, domain, status, status_ext and duration bucket,
+# kept up to date by triggers so stats never scan submissions.
+_ROLLUPS_SQL = f"""\
+CREATE TABLE IF NOT EXISTS submission_rollups (
+    day         TEXT    NOT NULL,
+    domain      TEXT    NOT NULL,
+    status      TEXT    NOT NULL,
+    status_ext  TEXT    NOT NULL,
+    bucket      INTEGER NOT NULL,
+    count       INTEGER NOT NULL,
+    PRIMARY KEY ({_ROLLUP_COLUMNS})
+);
+CREATE INDEX IF NOT EXISTS idx_submission_rollups_domain
+    ON submission_rollups (domain, day);
+CREATE TRIGGER IF NOT EXISTS submission_rollups_insert
+AFTER INSERT ON submissions BEGIN
+    INSERT INTO submission_rollups ({_ROLLUP_COLUMNS}, count)
+    VALUES ({_rollup_key_sql("new")}, 1)
+    ON CONFLICT ({_ROLLUP_COLUMNS}) DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS submission_rollups_delete
+AFTER DELETE ON submissions BEGIN
+    UPDATE submission_rollups SET count = count - 1
+    WHERE {_rollup_match_sql("old")};
+END;
+CREATE TRIGGER IF NOT EXISTS submission_rollups_update
+AFTER UPDATE OF url, submitted_at, status, status_ext, duration_sec ON submissions
+BEGIN
+    UPDATE submission_rollups SET count = count - 1
+    WHERE {_rollup_match_sql("old")};
+    INSERT INTO submission_rollups ({_ROLLUP_COLUMNS}, count)
+    VALUES ({_rollup_key_sql("new")}, 1)
+    ON CONFLICT ({_ROLLUP_COLUMNS}) DO UPDATE SET count = count + 1;
+END;
+INSERT INTO submission_rollups ({_ROLLUP_COLUMNS}, count)
+SELECT {_rollup_key_sql("submissions")}, COUNT(*) FROM submissions
+GROUP BY 1, 2, 3, 4, 5;
+"""
+
+_COLUMNS = (
+    "id, url, job_id, submitted_at, status, original_url, timestamp, "
+    "duration_sec, status_ext, completed_at"
+)
+
+# Where prune moves rows when given an archive file.
+_ARCHIVE_SCHEMA_SQL = """\
+CREATE TABLE IF NOT EXISTS archive.submissions (
+    id            INTEGER PRIMARY KEY,
+    url           TEXT    NOT NULL,
+    job_id        TEXT,
+    submitted_at  TEXT    NOT NULL,
+    status        TEXT    NOT NULL,
+    original_url  TEXT,
+    timestamp     TEXT,
+    duration_sec  REAL,
+    status_ext    TEXT,
+    completed_at  TEXT
+)"""
+
+# Script that brings the database to each schema version, starting from 1.
+_MIGRATIONS = (_SCHEMA_SQL, _URL_INDEX_SQL, _ROLLUPS_SQL)
+# Substrings shorter than a trigram cannot use the index.
+_MIN_INDEXED_SEARCH = 3
+
 
 def _default_db_path() -> str:
     try:
@@ -43,39 +207,90 @@ def _default_db_path() -> str:
 
 
 class HistoryDB:
-    def __init__(self, db_path: Optional[str] = None):
+    """
+    Submission history in a SQLite database.
+
+    With ``write_behind=True`` ``record_submission`` and ``update_completion`` only
+    queue their rows; a single writer thread applies them with ``executemany`` in
+    one transaction per ``batch_size`` rows or ``flush_interval`` seconds, so the
+    threads submitting URLs never wait on SQLite. Pending rows are written by
+    ``flush``, ``close`` and at interpreter exit, and by reads before they run.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        write_behind: bool = False,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL,
+    ):
         self.db_path = db_path or _default_db_path()
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         self._local = threading.local()
         conn = self._get_connection()
         self._init_db(conn)
 
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        if write_behind:
+            self._writer = threading.Thread(
+                target=self._write_loop, name="archivooor-history", daemon=True
+            )
+            self._writer.start()
+            atexit.register(self.flush)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of writes queued but not yet committed."""
+        return self._queue.unfinished_tasks
+
     def _get_connection(self) -> sqlite3.Connection:
         conn = getattr(self._local, "conn", None)
         if conn is None:
             conn = sqlite3.connect(self.db_path, timeout=10)
             conn.row_factory = sqlite3.Row
+            # Only takes effect on a new database, so it has to come before the
+            # switch to WAL writes the header; prune converts older databases.
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
             conn.execute("PRAGMA journal_mode=WAL")
             self._local.conn = conn
         return conn
 
     def _init_db(self, conn: sqlite3.Connection) -> None:
         (version,) = conn.execute("PRAGMA user_version").fetchone()
-        if version < SCHEMA_VERSION:
-            conn.executescript(_SCHEMA_SQL)
-            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
-            conn.commit()
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            try:
+                conn.executescript(
+                    f"BEGIN;\n{_MIGRATIONS[target - 1]}"
+                    f"PRAGMA user_version = {target};\nCOMMIT;"
+                )
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if target == 1:
+                    raise
+                # SQLite built without FTS5 (or older than 3.34): stay on the
+                # previous version and search urls by scanning.
+                logger.warning("Could not migrate history to v%d: %s", target, e)
+                break
+            version = target
+        self._url_index = version >= 2
+        self._rollups = version >= 3
 
     def record_submission(
         self, url: str, job_id: Optional[str], status: str
     ) -> Optional[int]:
-        conn = self._get_connection()
+        """Insert a submission; returns its row id, or None if it was queued."""
         now = datetime.now(timezone.utc).isoformat()
+        if self.write_behind:
+            self._queue.put((_INSERT_SQL, (url, job_id, now, status)))
+            return None
+        conn = self._get_connection()
         try:
-            cur = conn.execute(
-                "INSERT INTO submissions (url, job_id, submitted_at, status) VALUES (?, ?, ?, ?)",
-                (url, job_id, now, status),
-            )
+            cur = conn.execute(_INSERT_SQL, (url, job_id, now, status))
             conn.commit()
             return cur.lastrowid
         except sqlite3.IntegrityError:
@@ -91,18 +306,119 @@ class HistoryDB:
         duration_sec: Optional[float] = None,
         status_ext: Optional[str] = None,
     ) -> None:
-        conn = self._get_connection()
         now = datetime.now(timezone.utc).isoformat()
-        conn.execute(
-            """\
-            UPDATE submissions
-            SET status = ?, original_url = ?, timestamp = ?,
-                duration_sec = ?, status_ext = ?, completed_at = ?
-            WHERE job_id = ?""",
-            (status, original_url, timestamp, duration_sec, status_ext, now, job_id),
+        params = (
+            status,
+            original_url,
+            timestamp,
+            duration_sec,
+            status_ext,
+            now,
+            job_id,
         )
+        if self.write_behind:
+            self._queue.put((_UPDATE_SQL, params))
+            return
+        conn = self._get_connection()
+        conn.execute(_UPDATE_SQL, params)
         conn.commit()
 
+    def update_completions(self, completions: Iterable[dict]) -> int:
+        """
+        Apply several completions, each a dict of update_completion arguments, in
+        one transaction; returns how many were applied.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        params = [
+            (
+                completion["status"],
+                completion.get("original_url"),
+                completion.get("timestamp"),
+                completion.get("duration_sec"),
+                completion.get("status_ext"),
+                now,
+                completion["job_id"],
+            )
+            for completion in completions
+        ]
+        if not params:
+            return 0
+        if self.write_behind:
+            for item in params:
+                self._queue.put((_UPDATE_SQL, item))
+            return len(params)
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(_UPDATE_SQL, params)
+        return len(params)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued write is committed; False if ``timeout`` expired."""
+        if self._writer is None or not self._writer.is_alive():
+            return self._queue.unfinished_tasks == 0
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _write_loop(self) -> None:
+        conn = self._get_connection()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                conn.close()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write_batch(conn, batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                conn.close()
+                return
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: list) -> None:
+        # Consecutive statements of the same kind go into one executemany, so an
+        # update still runs after the insert of its job.
+        groups: list[tuple[str, list]] = []
+        for sql, params in batch:
+            if groups and groups[-1][0] == sql:
+                groups[-1][1].append(params)
+            else:
+                groups.append((sql, [params]))
+        try:
+            with conn:
+                for sql, rows in groups:
+                    conn.executemany(sql, rows)
+        except sqlite3.IntegrityError:
+            # A duplicate job_id fails the whole batch; fall back to one row at a
+            # time so only the duplicate is dropped.
+            for sql, params in batch:
+                try:
+                    with conn:
+                        conn.execute(sql, params)
+                except sqlite3.IntegrityError:
+                    logger.debug("Duplicate job_id in %s", params)
+        except sqlite3.Error:
+            logger.warning("Failed to write %d history rows", len(batch), exc_info=True)
+
     def query(
         self,
         url: Optional[str] = None,
@@ -110,10 +426,102 @@ class HistoryDB:
         since: Optional[str] = None,
         limit: int = 20,
     ) -> list[dict]:
+        self.flush()
+        clauses, params = self._filters(url, status, since)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM submissions{where} ORDER BY submitted_at DESC LIMIT ?"
+        params.append(limit)
+        rows = self._get_connection().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def iter_rows(
+        self,
+        url: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        after: Optional[tuple[str, int]] = None,
+        page_size: int = EXPORT_PAGE_SIZE,
+    ) -> Iterator[dict]:
+        """
+        Lazily yield the matching rows oldest first, ``page_size`` at a time.
+
+        Pages are fetched with keyset pagination on ``(submitted_at, id)``, which
+        the submitted_at index covers, so every page costs the same however deep
+        into the history it is and no read transaction stays open between pages.
+        Pass the ``(submitted_at, id)`` of the last row seen as ``after`` to
+        continue from there.
+        """
+        self.flush()
+        clauses, params = self._filters(url, status, since)
+        conn = self._get_connection()
+        while True:
+            page_clauses = list(clauses)
+            page_params = list(params)
+            if after is not None:
+                page_clauses.append("(submitted_at, id) > (?, ?)")
+                page_params.extend(after)
+            where = f" WHERE {' AND '.join(page_clauses)}" if page_clauses else ""
+            # Pinned to the submitted_at index: with another index (on status,
+            # say) every page would sort all the matching rows.
+            rows = conn.execute(
+                "SELECT * FROM submissions INDEXED BY idx_submissions_submitted_at"
+                f"{where} ORDER BY submitted_at, id LIMIT ?",
+                [*page_params, page_size],
+            ).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < page_size:
+                return
+            after = (rows[-1]["submitted_at"], rows[-1]["id"])
+
+    def count_pending_jobs(self) -> int:
+        """Number of submissions with a job_id that never reached a terminal status."""
+        self.flush()
+        (count,) = (
+            self._get_connection()
+            .execute(
+                f"SELECT COUNT(*) FROM submissions WHERE {_PENDING_JOBS_SQL}",
+                SETTLED_STATUSES,
+            )
+            .fetchone()
+        )
+        return count
+
+    def iter_pending_jobs(self, page_size: int = EXPORT_PAGE_SIZE) -> Iterator[str]:
+        """
+        Lazily yield the job_id of each submission that never reached a terminal
+        status, oldest first, paging on id so rows completed meanwhile are fine.
+        """
+        self.flush()
         conn = self._get_connection()
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                f"""\
+                SELECT id, job_id FROM submissions
+                WHERE id > ? AND {_PENDING_JOBS_SQL}
+                ORDER BY id LIMIT ?""",
+                [last_id, *SETTLED_STATUSES, page_size],
+            ).fetchall()
+            for row in rows:
+                yield row["job_id"]
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def _filters(
+        self, url: Optional[str], status: Optional[str], since: Optional[str]
+    ) -> tuple[list[str], list[object]]:
         clauses: list[str] = []
         params: list[object] = []
-        if url:
+        if url and self._url_index and len(url) >= _MIN_INDEXED_SEARCH:
+            clauses.append(
+                "id IN (SELECT rowid FROM submissions_url_fts"
+                " WHERE submissions_url_fts MATCH ?)"
+            )
+            # A quoted phrase matches the substring literally.
+            params.append('"{}"'.format(url.replace('"', '""')))
+        elif url:
             clauses.append("url LIKE ?")
             params.append(f"%{url}%")
         if status:
@@ -122,20 +530,332 @@ class HistoryDB:
         if since:
             clauses.append("submitted_at >= ?")
             params.append(since)
+        return clauses, params
+
+    def stats(
+        self,
+        by: str = "day",
+        since: Optional[str] = None,
+        domain: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Submission counts per status, success rate, errors per ``status_ext`` and
+        estimated p50/p95 ``duration_sec`` per day or per domain (``by``), newest
+        day or busiest domain first.
+
+        The figures come from the rollup table, so the cost depends on the number
+        of days and domains rather than on the number of submissions. ``since``
+        filters whole days; percentiles are interpolated within the histogram
+        buckets of ``DURATION_BUCKETS``.
+        """
+        if by not in ("day", "domain"):
+            raise ValueError("by must be 'day' or 'domain'")
+        self.flush()
+        source = "submission_rollups"
+        if not self._rollups:
+            source = (
+                f"(SELECT {_day_sql('submissions')} AS day, "
+                f"{_domain_sql('submissions')} AS domain, status, "
+                f"COALESCE(status_ext, '') AS status_ext, "
+                f"{_bucket_sql('submissions')} AS bucket, 1 AS count "
+                "FROM submissions)"
+            )
+        clauses: list[str] = []
+        params: list[object] = []
+        if since:
+            clauses.append("day >= ?")
+            params.append(since[:10])
+        if domain:
+            clauses.append("domain = ?")
+            params.append(domain.lower())
         where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
-        sql = f"SELECT * FROM submissions{where} ORDER BY submitted_at DESC LIMIT ?"
-        params.append(limit)
-        rows = conn.execute(sql, params).fetchall()
-        return [dict(row) for row in rows]
+        rows = (
+            self._get_connection()
+            .execute(
+                f"""\
+                SELECT {by} AS key, status, status_ext, bucket, SUM(count) AS n
+                FROM {source}{where}
+                GROUP BY key, status, status_ext, bucket
+                HAVING n > 0""",
+                params,
+            )
+            .fetchall()
+        )
+
+        groups: dict[str, dict] = {}
+        histograms: dict[str, list[int]] = {}
+        for row in rows:
+            key = row["key"]
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {
+                    by: key,
+                    "total": 0,
+                    "statuses": collections.Counter(),
+                    "errors": collections.Counter(),
+                }
+                histograms[key] = [0] * (len(DURATION_BUCKETS) + 1)
+            group["total"] += row["n"]
+            group["statuses"][row["status"]] += row["n"]
+            if row["status"] == "error":
+                group["errors"][row["status_ext"] or "unknown"] += row["n"]
+            if row["bucket"] >= 0:
+                histograms[key][row["bucket"]] += row["n"]
+
+        for key, group in groups.items():
+            statuses = group["statuses"]
+            finished = statuses["success"] + statuses["error"]
+            group["success_rate"] = statuses["success"] / finished if finished else None
+            group["p50"] = _percentile(histograms[key], 0.5)
+            group["p95"] = _percentile(histograms[key], 0.95)
+            group["statuses"] = dict(statuses)
+            group["errors"] = dict(group["errors"].most_common())
+
+        if by == "day":
+            ordered = sorted(groups.values(), key=lambda g: g["day"], reverse=True)
+        else:
+            ordered = sorted(groups.values(), key=lambda g: (-g["total"], g["domain"]))
+        return ordered[:limit] if limit is not None else ordered
+
+    def last_successes(self, urls: list[str]) -> dict[str, str]:
+        """
+        Map each of ``urls`` that was archived successfully to the time of its
+        latest successful capture (completion time, else submission time).
+        """
+        self.flush()
+        conn = self._get_connection()
+        captured: dict[str, str] = {}
+        unique_urls = list(dict.fromkeys(urls))
+        # Stay below SQLite's limit on bound parameters.
+        for i in range(0, len(unique_urls), 500):
+            chunk = unique_urls[i : i + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = conn.execute(
+                f"""\
+                SELECT url, MAX(COALESCE(completed_at, submitted_at))
+                FROM submissions
+                WHERE status = 'success' AND url IN ({placeholders})
+                GROUP BY url""",
+                chunk,
+            ).fetchall()
+            captured.update((url, at) for url, at in rows)
+        return captured
+
+    def count_successes_since(self, since: str) -> int:
+        """Number of successful submissions completed at or after ``since``."""
+        self.flush()
+        (count,) = (
+            self._get_connection()
+            .execute(
+                """\
+                SELECT COUNT(*) FROM submissions
+                WHERE status = 'success'
+                  AND COALESCE(completed_at, submitted_at) >= ?""",
+                (since,),
+            )
+            .fetchone()
+        )
+        return count
+
+    def iter_successes_since(self, since: str) -> Iterator[str]:
+        """Lazily yield the URL of each successful submission completed at or after ``since``."""
+        self.flush()
+        cur = self._get_connection().execute(
+            """\
+            SELECT url FROM submissions
+            WHERE status = 'success' AND COALESCE(completed_at, submitted_at) >= ?""",
+            (since,),
+        )
+        for (url,) in cur:
+            yield url
+
+    def archived_since(self, url: str, since: str) -> bool:
+        """Whether ``url`` was archived successfully at or after ``since``."""
+        row = (
+            self._get_connection()
+            .execute(
+                """\
+                SELECT 1 FROM submissions
+                WHERE url = ? AND status = 'success'
+                  AND COALESCE(completed_at, submitted_at) >= ?
+                LIMIT 1""",
+                (url, since),
+            )
+            .fetchone()
+        )
+        return row is not None
 
     def clear(self) -> int:
+        self.flush()
         conn = self._get_connection()
         cur = conn.execute("DELETE FROM submissions")
         conn.commit()
+        _incremental_vacuum(conn)
         return cur.rowcount
 
+    def prune(
+        self,
+        older_than: Optional[timedelta] = None,
+        keep_latest: Optional[int] = None,
+        terminal_only: bool = False,
+        archive_path: Optional[str] = None,
+        batch_size: int = PRUNE_BATCH_SIZE,
+    ) -> int:
+        """
+        Delete the rows matching every given retention rule and return how many.
+
+        ``older_than`` selects rows submitted longer ago than that, ``keep_latest``
+        the rows of a URL beyond its ``keep_latest`` most recent ones, and
+        ``terminal_only`` the rows not in one of ``SETTLED_STATUSES``. Rows are
+        deleted ``batch_size`` per transaction so writers are never blocked for
+        long, and with ``archive_path`` they are first copied into the
+        ``submissions`` table of that SQLite file.
+
+        Freed pages are returned to the file system as the batches go and the
+        WAL is truncated at the end. A database created before auto_vacuum was
+        enabled is converted with one full VACUUM first.
+        """
+        if older_than is None and keep_latest is None and not terminal_only:
+            raise ValueError("prune needs at least one retention rule")
+        self.flush()
+        conn = self._get_connection()
+        self._enable_incremental_vacuum(conn)
+
+        clauses: list[str] = []
+        params: list[object] = []
+        if older_than is not None:
+            clauses.append("submitted_at < ?")
+            params.append((datetime.now(timezone.utc) - older_than).isoformat())
+        if keep_latest is not None:
+            clauses.append(
+                "id NOT IN (SELECT newer.id FROM submissions AS newer"
+                " WHERE newer.url = submissions.url"
+                " ORDER BY newer.submitted_at DESC, newer.id DESC LIMIT ?)"
+            )
+            params.append(keep_latest)
+        if terminal_only:
+            clauses.append(f"status NOT IN ({', '.join('?' * len(SETTLED_STATUSES))})")
+            params.extend(SETTLED_STATUSES)
+        select = (
+            f"SELECT id FROM submissions WHERE id > ? AND {' AND '.join(clauses)} "
+            "ORDER BY id LIMIT ?"
+        )
+
+        if archive_path is not None:
+            conn.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        try:
+            if archive_path is not None:
+                with conn:
+                    conn.execute(_ARCHIVE_SCHEMA_SQL)
+            deleted = 0
+            last_id = 0
+            while ids := [
+                row_id
+                for (row_id,) in conn.execute(
+                    select, [last_id, *params, batch_size]
+                ).fetchall()
+            ]:
+                last_id = ids[-1]
+                placeholders = ", ".join("?" * len(ids))
+                with conn:
+                    if archive_path is not None:
+                        conn.execute(
+                            f"INSERT OR IGNORE INTO archive.submissions ({_COLUMNS}) "
+                            f"SELECT {_COLUMNS} FROM main.submissions "
+                            f"WHERE id IN ({placeholders})",
+                            ids,
+                        )
+                    conn.execute(
+                        f"DELETE FROM main.submissions WHERE id IN ({placeholders})",
+                        ids,
+                    )
+                deleted += len(ids)
+                _incremental_vacuum(conn, VACUUM_PAGES)
+                logger.debug("Pruned %d history rows", deleted)
+        finally:
+            if archive_path is not None:
+                conn.execute("DETACH DATABASE archive")
+
+        if deleted and self._url_index:
+            # FTS5 keeps deleted entries until its segments are merged.
+            with conn:
+                conn.execute(
+                    "INSERT INTO submissions_url_fts (submissions_url_fts) "
+                    "VALUES ('optimize')"
+                )
+        _incremental_vacuum(conn)
+        conn.execute("PRAGMA main.wal_checkpoint(TRUNCATE)")
+        return deleted
+
+    def _enable_incremental_vacuum(self, conn: sqlite3.Connection) -> None:
+        (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+        if mode != 2:
+            logger.info("Enabling incremental vacuum on %s", self.db_path)
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
     def close(self) -> None:
+        """Commit queued writes, stop the writer thread and close this thread's connection."""
+        if self._writer is not None:
+            atexit.unregister(self.flush)
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+            self.write_behind = False
         conn = getattr(self._local, "conn", None)
         if conn is not None:
             conn.close()
             self._local.conn = None
+
+
+def _incremental_vacuum(conn: sqlite3.Connection, pages: int = 0) -> None:
+    """Release up to ``pages`` free pages (all of them if 0) to the file system."""
+    # The pragma frees one page per step, so it only runs to completion if its
+    # (empty) result is consumed.
+    conn.execute(f"PRAGMA main.incremental_vacuum({pages})").fetchall()
+
+
+def _percentile(histogram: list[int], q: float) -> Optional[float]:
+    """Estimate the ``q`` quantile of a duration histogram over DURATION_BUCKETS."""
+    total = sum(histogram)
+    if not total:
+        return None
+    target = q * total
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        if count and cumulative + count >= target:
+            low = DURATION_BUCKETS[i - 1] if i else 0
+            if i == len(DURATION_BUCKETS):
+                # Open-ended last bucket: its lower edge is the best estimate.
+                return float(low)
+            high = DURATION_BUCKETS[i]
+            return low + (high - low) * (target - cumulative) / count
+        cumulative += count
+    return None
+
+
+class RecentSuccesses:
+    """
+    Membership test for URLs archived successfully within ``within``.
+
+    The URLs are bulk-loaded into a Bloom filter once, so a URL that was not
+    archived recently costs no query; only filter hits are confirmed with an
+    indexed lookup.
+    """
+
+    def __init__(self, history: HistoryDB, within: timedelta, error_rate: float = 0.01):
+        self.history = history
+        self.since = (datetime.now(timezone.utc) - within).isoformat()
+        self._filter = BloomFilter(
+            history.count_successes_since(self.since), error_rate
+        )
+        for url in history.iter_successes_since(self.since):
+            self._filter.add(url)
+
+    def __contains__(self, url: object) -> bool:
+        return (
+            isinstance(url, str)
+            and url in self._filter
+            and self.history.archived_since(url, self.since)
+        )
@@ -0,0 +1,175 @@
+"""Background polling of save job statuses."""
+
+from __future__ import annotations
+
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from archivooor.retry import MAX_STATUS_RETRIES
+
+logger = logging.getLogger(__name__)
+
+MAX_POLLS = 30
+POLL_INTERVAL = 6.0
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_BATCH_SIZE = 100
+TERMINAL_STATUSES = ("success", "error")
+
+
+class PollScheduler:
+    """
+    Polls pending save jobs from a single loop over a min-heap of due times.
+
+    Each pending job costs one heap entry instead of a sleeping thread. Jobs that are
+    due together are checked with one ``fetch_statuses`` call of up to ``batch_size``
+    ids, on a small pool of ``max_concurrency`` threads, and ``on_complete`` is
+    called with the final status payload once a job succeeds or fails for good.
+    The loop runs on a daemon thread, so pending polls never keep the process
+    alive; ``wait_idle`` lets callers wait for them explicitly.
+    """
+
+    def __init__(
+        self,
+        fetch_statuses: Callable[[list[str]], dict],
+        on_complete: Callable[[str, dict], None],
+        poll_interval: float = POLL_INTERVAL,
+        max_polls: int = MAX_POLLS,
+        error_retries: int = MAX_STATUS_RETRIES,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_error_delay: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.fetch_statuses = fetch_statuses
+        self.on_complete = on_complete
+        self.poll_interval = poll_interval
+        self.max_polls = max_polls
+        self.error_retries = error_retries
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.max_error_delay = max_error_delay
+        self._clock = clock
+        # (due, tie-breaker, job_id, polls, errors)
+        self._heap: list[tuple[float, int, str, int, int]] = []
+        self._counter = itertools.count()
+        # Status checks in flight (bounded by max_concurrency), and the jobs
+        # they cover.
+        self._checks = 0
+        self._checking = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def __len__(self) -> int:
+        """Number of jobs still being tracked."""
+        with self._cond:
+            return len(self._heap) + self._checking
+
+    def add(self, job_id: str, delay: Optional[float] = None) -> None:
+        """Start tracking ``job_id``; the first check happens after ``delay`` seconds."""
+        self._push(job_id, self.poll_interval if delay is None else delay, 0, 0)
+        self._ensure_started()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is pending; False if ``timeout`` expired first."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._heap and not self._checking, timeout=timeout
+            )
+
+    def close(self) -> None:
+        """Stop polling; jobs that are still pending are dropped."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def _push(self, job_id: str, delay: float, polls: int, errors: int) -> None:
+        with self._cond:
+            heapq.heappush(
+                self._heap,
+                (self._clock() + delay, next(self._counter), job_id, polls, errors),
+            )
+            self._cond.notify_all()
+
+    def _ensure_started(self) -> None:
+        with self._cond:
+            if self._thread is not None or self._closed:
+                return
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="archivooor-poll"
+            )
+            self._thread = threading.Thread(
+                target=self._run, name="archivooor-poller", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        assert self._pool is not None
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    if self._heap and self._checks < self.max_concurrency:
+                        wait = self._heap[0][0] - self._clock()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                now = self._clock()
+                due: list[tuple[str, int, int]] = []
+                while (
+                    self._heap
+                    and self._heap[0][0] <= now
+                    and len(due) < self.batch_size
+                ):
+                    due.append(heapq.heappop(self._heap)[2:])
+                self._checks += 1
+                self._checking += len(due)
+            try:
+                self._pool.submit(self._check, due)
+            except RuntimeError:
+                # The pool was shut down by close().
+                return
+
+    def _check(self, due: list[tuple[str, int, int]]) -> None:
+        try:
+            try:
+                statuses = self.fetch_statuses([job_id for job_id, _, _ in due])
+            except Exception:
+                logger.debug("Status check failed for %d jobs", len(due), exc_info=True)
+                statuses = {}
+            for job_id, polls, errors in due:
+                self._handle(job_id, statuses.get(job_id), polls + 1, errors)
+        finally:
+            with self._cond:
+                self._checks -= 1
+                self._checking -= len(due)
+                self._cond.notify_all()
+
+    def _handle(self, job_id: str, data: object, polls: int, errors: int) -> None:
+        status = data.get("status") if isinstance(data, dict) else None
+
+        if status == "error" and errors < self.error_retries:
+            # Errors can be transient; back off like get_save_status does.
+            self._push(job_id, min(2**errors, self.max_error_delay), polls, errors + 1)
+            return
+        if isinstance(data, dict) and status in TERMINAL_STATUSES:
+            try:
+                self.on_complete(job_id, data)
+            except Exception:
+                logger.debug("Failed to record completion of %s", job_id, exc_info=True)
+            return
+        if polls >= self.max_polls:
+            logger.debug("Giving up polling job %s after %d polls", job_id, polls)
+            return
+        self._push(job_id, self.poll_interval, polls, errors)
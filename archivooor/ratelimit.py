@@ -0,0 +1,181 @@
+"""Process-wide rate limiting of requests to the Wayback Machine."""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAVE_PER_MINUTE = 60
+DEFAULT_STATUS_PER_MINUTE = 300
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header (seconds or HTTP date) into seconds to wait."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class DeadlineExceeded(Exception):
+    """No token can be handed out before the deadline of the calling thread."""
+
+
+# Anchored to the request path, so that a page URL containing /save/status is
+# still a save.
+_STATUS_PATH_RE = re.compile(r"^(?:https?://[^/]+)?/save/status(?:[/?]|$)")
+
+
+def endpoint_for(url: str) -> str:
+    """Classify a request URL (or path) as a ``save`` or ``status`` request."""
+    return "status" if _STATUS_PATH_RE.match(url) else "save"
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at ``per_minute`` tokens per minute.
+
+    ``per_minute=None`` disables the rate limit but still honours :meth:`pause`.
+    """
+
+    def __init__(
+        self,
+        per_minute: Optional[float],
+        burst: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        if per_minute is not None and per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60 if per_minute else None
+        # Ten seconds worth of requests by default.
+        self.capacity = burst or (max(1, int(per_minute / 6)) if per_minute else 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._paused_until = float("-inf")
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` and restart empty afterwards."""
+        with self._lock:
+            until = self._clock() + seconds
+            if until > self._paused_until:
+                self._paused_until = until
+                self._tokens = 0.0
+                self._updated = until
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available, otherwise return the seconds to wait."""
+        with self._lock:
+            now = self._clock()
+            wait = self._paused_until - now
+            if wait > 0:
+                return wait
+            if self.rate is None:
+                return 0.0
+            elapsed = max(now - self._updated, 0.0)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = max(now, self._updated)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, deadline_at: Optional[float] = None) -> None:
+        """
+        Wait for a token. With ``deadline_at`` (a value of the bucket's clock), raise
+        DeadlineExceeded instead of waiting past it or returning after it.
+        """
+        while (wait := self.try_acquire()) > 0:
+            if deadline_at is not None and self._clock() + wait > deadline_at:
+                raise DeadlineExceeded(f"no token for {wait:.1f}s")
+            self._sleep(wait)
+        if deadline_at is not None and self._clock() >= deadline_at:
+            raise DeadlineExceeded("deadline passed while waiting for a token")
+
+
+class RateLimiter:
+    """
+    Token buckets for the save and status endpoints, shared by every worker thread.
+
+    A Retry-After on any response pauses all buckets, so the other workers stop
+    sending into the same 429 instead of each discovering it on its own.
+    """
+
+    def __init__(
+        self,
+        save_per_minute: Optional[float] = DEFAULT_SAVE_PER_MINUTE,
+        status_per_minute: Optional[float] = DEFAULT_STATUS_PER_MINUTE,
+    ):
+        self.buckets = {
+            "save": TokenBucket(save_per_minute),
+            "status": TokenBucket(status_per_minute),
+        }
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def deadline(self, deadline_at: Optional[float]) -> Iterator[None]:
+        """
+        Within the block, :meth:`acquire` in this thread raises DeadlineExceeded
+        rather than hand out a token after ``deadline_at`` (``time.monotonic()``).
+        """
+        previous = getattr(self._local, "deadline_at", None)
+        self._local.deadline_at = deadline_at
+        try:
+            yield
+        finally:
+            self._local.deadline_at = previous
+
+    def acquire(self, url: str) -> None:
+        self.buckets[endpoint_for(url)].acquire(
+            getattr(self._local, "deadline_at", None)
+        )
+
+    def try_acquire(self, url: str) -> float:
+        """Non-blocking :meth:`acquire` for callers that wait on their own, like asyncio."""
+        return self.buckets[endpoint_for(url)].try_acquire()
+
+    def pause(self, seconds: float) -> None:
+        logger.info("Rate limited, pausing all requests for %.1fs", seconds)
+        for bucket in self.buckets.values():
+            bucket.pause(seconds)
+
+    def observe(self, status_code: int, retry_after: Optional[str]) -> None:
+        """Apply the Retry-After header of a throttled response."""
+        if status_code != 429 and status_code < 500:
+            return
+        seconds = parse_retry_after(retry_after)
+        if seconds:
+            self.pause(seconds)
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def default_limiter() -> RateLimiter:
+    """Return the limiter shared by every Archiver in the process."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+        return _default_limiter
@@ -0,0 +1,202 @@
+"""Retry policy, retry budget and per-URL retry scheduling for batch submissions."""
+
+from __future__ import annotations
+
+import collections
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+MAX_STATUS_RETRIES = 5
+DEFAULT_TRANSPORT_RETRIES = 2
+DEFAULT_BUDGET_RATIO = 0.2
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+
+class RetryScheduler:
+    """
+    Min-heap of URLs waiting out their backoff, keyed by the time of the next attempt.
+
+    Each URL backs off on its own (exponential with jitter), so a few stragglers never
+    hold up the rest of a batch.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._clock = clock
+        self._heap: list[tuple[float, int, str, int]] = []
+        # Tie-breaker so equal due times never compare URLs.
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def delay_for(self, attempt: int) -> float:
+        """Backoff before ``attempt`` (1 for the first retry), with equal jitter."""
+        delay = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return delay / 2 + random.random() * delay / 2
+
+    def schedule(self, url: str, attempt: int) -> float:
+        due = self._clock() + self.delay_for(attempt)
+        heapq.heappush(self._heap, (due, next(self._counter), url, attempt))
+        return due
+
+    def pop_due(self) -> Optional[tuple[str, int]]:
+        """Return ``(url, attempt)`` for the earliest retry whose backoff elapsed."""
+        if not self._heap or self._heap[0][0] > self._clock():
+            return None
+        _, _, url, attempt = heapq.heappop(self._heap)
+        return url, attempt
+
+    def drain(self) -> Iterator[tuple[str, int]]:
+        """Remove and return every scheduled ``(url, attempt)``, due or not."""
+        while self._heap:
+            _, _, url, attempt = heapq.heappop(self._heap)
+            yield url, attempt
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the earliest retry is due, or None if nothing is scheduled."""
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - self._clock(), 0.0)
+
+
+class RetryBudget:
+    """
+    Caps retries at ``ratio`` times the first attempts seen in a sliding window.
+
+    ``min_retries`` retries per window are always allowed so that small batches can
+    still retry; beyond that, retries stop once they would exceed the ratio. This is
+    what keeps an incident from multiplying the load on the service.
+    """
+
+    def __init__(
+        self,
+        ratio: Optional[float] = DEFAULT_BUDGET_RATIO,
+        window: float = 60.0,
+        min_retries: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if ratio is not None and ratio < 0:
+            raise ValueError("ratio must not be negative")
+        self.ratio = ratio
+        self.window = window
+        self.min_retries = min_retries
+        self._clock = clock
+        # [second, first attempts, retries] per second of the window.
+        self._buckets: collections.deque[list] = collections.deque()
+        self._attempts = 0
+        self._retries = 0
+        self._lock = threading.Lock()
+
+    def _current_bucket(self) -> list:
+        now = self._clock()
+        while self._buckets and self._buckets[0][0] <= now - self.window:
+            _, attempts, retries = self._buckets.popleft()
+            self._attempts -= attempts
+            self._retries -= retries
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+    def record_attempt(self) -> None:
+        with self._lock:
+            self._current_bucket()[1] += 1
+            self._attempts += 1
+
+    def try_spend(self) -> bool:
+        """Charge one retry against the budget; False if the budget is exhausted."""
+        with self._lock:
+            bucket = self._current_bucket()
+            if self.ratio is not None:
+                allowed = self.min_retries + self.ratio * self._attempts
+                if self._retries >= allowed:
+                    logger.info(
+                        "Retry budget exhausted (%d retries for %d attempts)",
+                        self._retries,
+                        self._attempts,
+                    )
+                    return False
+            bucket[2] += 1
+            self._retries += 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Single owner of every retry decision made on behalf of an Archiver.
+
+    It sets the number of retries per URL, per batch and per status check, the
+    transport-level retries urllib3 may make for status checks, and the
+    RetryBudget shared by all of them. Save requests get no transport retries,
+    so a URL is sent at most ``1 + max_retries`` times.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = MAX_RETRIES,
+        max_batch_retries: Optional[int] = None,
+        status_retries: int = MAX_STATUS_RETRIES,
+        transport_retries: int = DEFAULT_TRANSPORT_RETRIES,
+        budget: Optional[RetryBudget] = None,
+        base_delay: float = BASE_DELAY,
+        max_delay: float = MAX_DELAY,
+    ):
+        self.max_retries = max_retries
+        self.max_batch_retries = max_batch_retries
+        self.status_retries = status_retries
+        self.transport_retries = transport_retries
+        self.budget = budget if budget is not None else RetryBudget()
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def new_batch(self) -> RetryBatch:
+        return RetryBatch(self)
+
+    def allow_status_retry(self, retries: int) -> bool:
+        """Whether a status check that already retried ``retries`` times may retry."""
+        return retries < self.status_retries and self.budget.try_spend()
+
+
+class RetryBatch:
+    """Retry accounting and scheduling for one save_pages/iter_save_pages call."""
+
+    def __init__(self, policy: RetryPolicy):
+        self.policy = policy
+        self.retries = 0
+        self.scheduler = RetryScheduler(policy.base_delay, policy.max_delay)
+
+    def record_attempt(self) -> None:
+        self.policy.budget.record_attempt()
+
+    def deny_reason(self, attempt: int) -> Optional[str]:
+        """
+        Return None and charge the retry if a URL whose ``attempt`` just failed may be
+        retried, otherwise the reason it may not.
+        """
+        policy = self.policy
+        if attempt >= policy.max_retries:
+            return "max retries exceeded"
+        if policy.max_batch_retries is not None and (
+            self.retries >= policy.max_batch_retries
+        ):
+            return "batch retry limit reached"
+        if not policy.budget.try_spend():
+            return "retry budget exhausted"
+        self.retries += 1
+        return None
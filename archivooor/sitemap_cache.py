@@ -0,0 +1,234 @@
+"""On-disk cache of remote sitemaps, revalidated with conditional GETs."""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from archivooor import history
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Compressed bytes decompressed at a time when reading cached entries back.
+READ_CHUNK = 64 * 1024
+
+_SCHEMA_SQL = """\
+CREATE TABLE IF NOT EXISTS sitemaps (
+    url            TEXT    PRIMARY KEY,
+    etag           TEXT,
+    last_modified  TEXT,
+    root_tag       TEXT    NOT NULL,
+    entries        BLOB    NOT NULL,
+    size           INTEGER NOT NULL,
+    used_at        REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sitemaps_used_at ON sitemaps (used_at);
+"""
+
+
+def _default_cache_path() -> str:
+    return os.path.join(os.path.dirname(history._default_db_path()), "sitemap_cache.db")
+
+
+class SitemapCache:
+    """
+    Validators and parsed ``(loc, lastmod)`` entries of remote sitemaps, keyed by
+    sitemap URL.
+
+    Entries are compressed as they stream in and decompressed lazily when read
+    back, so a large sitemap is never held in memory as a list. The least
+    recently used sitemaps are evicted once they add up to more than
+    ``max_bytes``.
+    """
+
+    def __init__(
+        self, cache_path: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.cache_path = cache_path or _default_cache_path()
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._get_connection()
+        self._init_db(conn)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.cache_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            conn.executescript(_SCHEMA_SQL)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Return the cached entry for ``url`` and mark it as recently used; its
+        ``entries`` are a lazy iterator of ``(loc, lastmod)``.
+        """
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT etag, last_modified, root_tag, entries FROM sitemaps WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute(
+                "UPDATE sitemaps SET used_at = ? WHERE url = ?", (time.time(), url)
+            )
+        return {
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "root_tag": row["root_tag"],
+            "entries": _iter_blob(row["entries"]),
+        }
+
+    def writer(
+        self,
+        url: str,
+        root_tag: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> EntryWriter:
+        """Start caching a sitemap whose entries arrive one by one."""
+        return EntryWriter(self, url, root_tag, etag, last_modified)
+
+    def put(
+        self,
+        url: str,
+        root_tag: str,
+        entries: Iterable[tuple[str, Optional[str]]],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Store a freshly parsed sitemap, evicting old entries to stay under max_bytes."""
+        writer = self.writer(url, root_tag, etag, last_modified)
+        for loc, lastmod in entries:
+            writer.add(loc, lastmod)
+        writer.commit()
+
+    def _store(
+        self,
+        url: str,
+        root_tag: str,
+        blob: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> None:
+        conn = self._get_connection()
+        with self._write_lock, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sitemaps "
+                "(url, etag, last_modified, root_tag, entries, size, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, root_tag, blob, len(blob), time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM sitemaps"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT url, size FROM sitemaps ORDER BY used_at DESC"
+        ).fetchall()
+        kept = 0
+        evicted = []
+        for row in rows:
+            kept += row["size"]
+            if kept > self.max_bytes:
+                evicted.append((row["url"],))
+        conn.executemany("DELETE FROM sitemaps WHERE url = ?", evicted)
+        logger.debug("Evicted %d cached sitemaps", len(evicted))
+
+    def clear(self) -> int:
+        conn = self._get_connection()
+        with conn:
+            cur = conn.execute("DELETE FROM sitemaps")
+        return cur.rowcount
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class EntryWriter:
+    """
+    Compresses the ``(loc, lastmod)`` entries of one sitemap as they are added and
+    stores them on :meth:`commit`. Once the compressed entries outgrow the
+    cache, the rest is dropped and nothing is stored.
+    """
+
+    def __init__(
+        self,
+        cache: SitemapCache,
+        url: str,
+        root_tag: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ):
+        self.cache = cache
+        self.url = url
+        self.root_tag = root_tag
+        self.etag = etag
+        self.last_modified = last_modified
+        self._compressor = zlib.compressobj()
+        self._chunks: list[bytes] = []
+        self._size = 0
+        self._too_big = False
+
+    def add(self, loc: str, lastmod: Optional[str]) -> None:
+        if self._too_big:
+            return
+        chunk = self._compressor.compress(f"{loc}\t{lastmod or ''}\n".encode())
+        if chunk:
+            self._chunks.append(chunk)
+            self._size += len(chunk)
+            if self._size > self.cache.max_bytes:
+                self._too_big = True
+                self._chunks = []
+
+    def commit(self) -> None:
+        if not self._too_big:
+            self._chunks.append(self._compressor.flush())
+            self._size += len(self._chunks[-1])
+        if self._too_big or self._size > self.cache.max_bytes:
+            logger.debug("Not caching sitemap %s: over %d bytes", self.url, self._size)
+            return
+        blob = b"".join(self._chunks)
+        self._chunks = []
+        self.cache._store(self.url, self.root_tag, blob, self.etag, self.last_modified)
+
+
+def _iter_blob(blob: bytes) -> Iterator[tuple[str, Optional[str]]]:
+    decompressor = zlib.decompressobj()
+    pending = b""
+    for i in range(0, len(blob), READ_CHUNK):
+        pending += decompressor.decompress(blob[i : i + READ_CHUNK])
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield _entry_of(line)
+
+
+def _entry_of(line: bytes) -> tuple[str, Optional[str]]:
+    loc, _, lastmod = line.decode().partition("\t")
+    return loc, lastmod or None
@@ -0,0 +1,317 @@
+"""Crash-safe SQLite work queue for long submission runs."""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional
+
+from archivooor import history
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+ENQUEUE_CHUNK = 10000
+CLAIM_BATCH = 100
+# Result updates written per transaction, and the longest they stay buffered.
+RESULT_BATCH = 500
+RESULT_FLUSH_INTERVAL = 1.0
+# Attempts after which a failed URL is no longer picked up by a resumed run.
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60.0
+# Runs that were left unfinished are deleted after this long.
+RUN_RETENTION = timedelta(days=7)
+
+STATES = ("pending", "in_flight", "submitted", "skipped", "failed")
+
+_SCHEMA_SQL = """\
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      TEXT    PRIMARY KEY,
+    created_at  TEXT    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id           TEXT    NOT NULL REFERENCES runs (run_id),
+    url              TEXT    NOT NULL,
+    state            TEXT    NOT NULL DEFAULT 'pending',
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at  REAL    NOT NULL DEFAULT 0,
+    job_id           TEXT,
+    message          TEXT,
+    updated_at       TEXT,
+    UNIQUE (run_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_items_claim ON items (run_id, state, next_attempt_at);
+"""
+
+
+def _default_queue_path() -> str:
+    return os.path.join(os.path.dirname(history._default_db_path()), "queue.db")
+
+
+class WorkQueue:
+    """
+    Durable queue of the URLs of submission runs, so an interrupted run can resume.
+
+    Each URL of a run moves from ``pending`` to ``in_flight`` when it is claimed and
+    to ``submitted`` or ``failed`` once its result is recorded. Claims are atomic,
+    so several processes can work on one run. Results are written in batches; if
+    the process dies, the URLs whose result was not written yet are still
+    ``in_flight`` and :meth:`resume` sends them again.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or _default_queue_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._local = threading.local()
+        self._results: list[tuple] = []
+        self._results_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        conn = self._get_connection()
+        self._init_db(conn)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly below.
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version < SCHEMA_VERSION:
+            conn.executescript(_SCHEMA_SQL)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def create_run(self) -> str:
+        run_id = uuid.uuid4().hex[:12]
+        self._get_connection().execute(
+            "INSERT INTO runs (run_id, created_at) VALUES (?, ?)",
+            (run_id, datetime.now(timezone.utc).isoformat()),
+        )
+        return run_id
+
+    def has_run(self, run_id: str) -> bool:
+        row = (
+            self._get_connection()
+            .execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,))
+            .fetchone()
+        )
+        return row is not None
+
+    def delete_run(self, run_id: str) -> None:
+        """Remove a run and all of its URLs."""
+        self.flush()
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM items WHERE run_id = ?", (run_id,))
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, older_than: timedelta = RUN_RETENTION) -> int:
+        """Delete the runs created more than ``older_than`` ago; returns how many."""
+        cutoff = (datetime.now(timezone.utc) - older_than).isoformat()
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """                DELETE FROM items WHERE run_id IN
+                    (SELECT run_id FROM runs WHERE created_at < ?)""",
+                (cutoff,),
+            )
+            cur = conn.execute("DELETE FROM runs WHERE created_at < ?", (cutoff,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    def enqueue(self, run_id: str, urls: Iterable[str]) -> int:
+        """Add ``urls`` to a run, ``ENQUEUE_CHUNK`` rows per transaction; returns the count."""
+        conn = self._get_connection()
+        added = 0
+        it = iter(urls)
+        while chunk := list(itertools.islice(it, ENQUEUE_CHUNK)):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = conn.total_changes
+                conn.executemany(
+                    "INSERT OR IGNORE INTO items (run_id, url) VALUES (?, ?)",
+                    ((run_id, url) for url in chunk),
+                )
+                added += conn.total_changes - before
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim(
+        self, run_id: str, limit: int = CLAIM_BATCH, after_id: int = 0
+    ) -> list[tuple[int, str]]:
+        """
+        Atomically move up to ``limit`` due pending URLs with an id above ``after_id``
+        to in_flight, and return their ``(id, url)``.
+        """
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                """\
+                SELECT id, url FROM items
+                WHERE run_id = ? AND state = 'pending' AND next_attempt_at <= ?
+                  AND id > ?
+                ORDER BY id LIMIT ?""",
+                (run_id, time.time(), after_id, limit),
+            ).fetchall()
+            conn.executemany(
+                """\
+                UPDATE items SET state = 'in_flight', attempts = attempts + 1,
+                    updated_at = ?
+                WHERE id = ?""",
+                [(datetime.now(timezone.utc).isoformat(), row["id"]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [(row["id"], row["url"]) for row in rows]
+
+    def resume(self, run_id: str, max_attempts: int = MAX_ATTEMPTS) -> int:
+        """
+        Make a run claimable again: URLs left in_flight by a crash, and failed URLs
+        with fewer than ``max_attempts`` attempts, become pending. Failed URLs are
+        only claimed once their ``next_attempt_at`` has passed. Returns how many.
+        """
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                """\
+                UPDATE items SET state = 'pending'
+                WHERE run_id = ?
+                  AND (state = 'in_flight' OR (state = 'failed' AND attempts < ?))""",
+                (run_id, max_attempts),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cur.rowcount
+
+    def iter_run(
+        self, run_id: str, urls: Optional[Iterable[str]] = None
+    ) -> Iterator[str]:
+        """
+        Yield the URLs of a run as they are claimed.
+
+        ``urls`` are enqueued as the consumer pulls, in chunks that start at a single
+        URL and double up to ``ENQUEUE_CHUNK``, so the first submission starts as
+        soon as the first URL was read, even from a slow pipe. Claims only move
+        forward, so a URL put back to pending is left for the next resume.
+        """
+        last_id = 0
+        chunks: Iterator[list[str]] = iter(())
+        if urls is not None:
+            chunks = _growing_chunks(iter(urls))
+        for chunk in itertools.chain(chunks, [[]]):
+            if chunk:
+                self.enqueue(run_id, chunk)
+            while claimed := self.claim(run_id, after_id=last_id):
+                last_id = claimed[-1][0]
+                for _, url in claimed:
+                    yield url
+
+    def record_result(self, run_id: str, result: dict) -> None:
+        """Buffer the outcome of a submission returned by iter_save_pages."""
+        status = result.get("status")
+        now = datetime.now(timezone.utc).isoformat()
+        next_attempt_at = 0.0
+        if status in ("submitted", "skipped"):
+            state = status
+        elif status == "deadline":
+            # Never attempted; keep it for the next run.
+            state = "pending"
+        else:
+            state = "failed"
+            next_attempt_at = time.time() + RETRY_DELAY
+        with self._results_lock:
+            self._results.append(
+                (
+                    state,
+                    next_attempt_at,
+                    result.get("job_id"),
+                    result.get("message"),
+                    now,
+                    run_id,
+                    result.get("url"),
+                )
+            )
+            due = (
+                len(self._results) >= RESULT_BATCH
+                or time.monotonic() - self._last_flush >= RESULT_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered results in one transaction."""
+        with self._results_lock:
+            results, self._results = self._results, []
+            self._last_flush = time.monotonic()
+        if not results:
+            return
+        conn = self._get_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """\
+                UPDATE items SET state = ?, next_attempt_at = ?, job_id = ?,
+                    message = ?, updated_at = ?
+                WHERE run_id = ? AND url = ?""",
+                results,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def counts(self, run_id: str) -> dict[str, int]:
+        """Number of URLs of a run in each state."""
+        self.flush()
+        rows = (
+            self._get_connection()
+            .execute(
+                "SELECT state, COUNT(*) FROM items WHERE run_id = ? GROUP BY state",
+                (run_id,),
+            )
+            .fetchall()
+        )
+        return {state: count for state, count in rows}
+
+    def close(self) -> None:
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _growing_chunks(it: Iterator[str]) -> Iterator[list[str]]:
+    size = 1
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+        size = min(size * 2, ENQUEUE_CHUNK)
@@ -1,10 +1,17 @@
 import pytest
 import responses
 
+from archivooor import ratelimit
 from archivooor.archiver import Archiver
 from archivooor.history import HistoryDB
 
 
+@pytest.fixture(autouse=True)
+def fresh_rate_limiter(monkeypatch):
+    """Keep the process-wide limiter's tokens and pauses from leaking between tests."""
+    monkeypatch.setattr(ratelimit, "_default_limiter", None)
+
+
 @pytest.fixture
 def archiver():
     with responses.RequestsMock() as rsps:
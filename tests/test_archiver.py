@@ -1,23 +1,60 @@
+import concurrent.futures
+import contextlib
+import functools
 import json
 import re
+import threading
+import time
+from datetime import timedelta
 from unittest.mock import patch
 from urllib.parse import parse_qs
 
 import pytest
+import requests
 import responses
 from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.response import HTTPResponse
+from urllib3.util.retry import Retry
 
 from archivooor.archiver import (
     MAX_RETRIES,
     MAX_STATUS_RETRIES,
+    SAVE_TIMEOUT,
+    STATUS_TIMEOUT,
     Archiver,
     NetworkHandler,
 )
+from archivooor.canonical import Canonicalizer
+from archivooor.concurrency import AdaptiveConcurrency
 from archivooor.exceptions import ArchivooorException
 from archivooor.history import HistoryDB
+from archivooor.retry import RetryBudget, RetryPolicy, RetryScheduler
 
 SAVE_URL_RE = re.compile(r"https://web\.archive\.org/save/.*")
 STATUS_URL_RE = re.compile(r"https://web\.archive\.org/save/status/.*")
+SAVE_URL = "https://web.archive.org/save/"
+BATCH_STATUS_URL = "https://web.archive.org/save/status"
+
+
+def without_transport_retries(a):
+    for prefix in list(a.session.adapters):
+        a.session.mount(prefix, HTTPAdapter(max_retries=0))
+
+
+@contextlib.contextmanager
+def retries_due_once(event):
+    """Hold back scheduled retries until ``event`` is set, then make them all due."""
+
+    def clock():
+        return 10.0 if event.is_set() else 0.0
+
+    scheduler = functools.partial(RetryScheduler, clock=clock)
+    with (
+        patch("archivooor.retry.RetryScheduler", scheduler),
+        patch.object(RetryScheduler, "delay_for", return_value=1.0),
+    ):
+        yield
 
 
 class TestSavePage:
@@ -97,8 +134,8 @@ class TestSavePages:
         assert len(results) == 2
         assert all(r["status"] == "submitted" for r in results)
 
-    @patch("archivooor.archiver.time.sleep")
-    def test_retry_then_succeed(self, mock_sleep, archiver):
+    @patch("archivooor.retry.RetryScheduler.delay_for", return_value=0)
+    def test_retry_then_succeed(self, mock_delay, archiver):
         a, rsps = archiver
         rsps.post(SAVE_URL_RE, body=ConnectionError("fail"))
         rsps.post(SAVE_URL_RE, json={"job_id": "ok"}, status=200)
@@ -107,10 +144,10 @@ class TestSavePages:
 
         assert len(results) == 1
         assert results[0]["status"] == "submitted"
-        mock_sleep.assert_called_once_with(1)
+        mock_delay.assert_called_once_with(1)
 
-    @patch("archivooor.archiver.time.sleep")
-    def test_max_retries_returns_error_dicts(self, mock_sleep, archiver):
+    @patch("archivooor.retry.RetryScheduler.delay_for", return_value=0)
+    def test_max_retries_returns_error_dicts(self, mock_delay, archiver):
         a, rsps = archiver
         for _ in range(MAX_RETRIES + 1):
             rsps.post(SAVE_URL_RE, body=ConnectionError("fail"))
@@ -120,10 +157,73 @@ class TestSavePages:
         assert len(results) == 1
         assert results[0]["status"] == "failed"
         assert results[0]["message"] == "max retries exceeded"
-        assert mock_sleep.call_count == MAX_RETRIES
+        assert mock_delay.call_count == MAX_RETRIES
 
-    @patch("archivooor.archiver.time.sleep")
-    def test_partial_failure_retries_only_failures(self, mock_sleep, archiver):
+    def test_retry_does_not_block_other_urls(self, archiver):
+        a, rsps = archiver
+        order = []
+        b_started = threading.Event()
+
+        def callback(request):
+            url = request.url.replace("https://web.archive.org/save/", "")
+            order.append(url)
+            if url == "https://b.com":
+                b_started.set()
+            if url == "https://a.com" and order.count(url) == 1:
+                raise ConnectionError("fail")
+            return (200, {}, json.dumps({"job_id": f"id-{url}"}))
+
+        rsps.add_callback(responses.POST, SAVE_URL_RE, callback=callback)
+
+        with retries_due_once(b_started):
+            results = a.iter_save_pages(["https://a.com", "https://b.com"], 1)
+            first = next(results)
+            rest = list(results)
+
+        assert first["url"] == "https://b.com"
+        assert [r["url"] for r in rest] == ["https://a.com"]
+
+    def test_due_retry_with_full_window_does_not_spin(self, archiver):
+        a, rsps = archiver
+        c_started = threading.Event()
+        release = threading.Event()
+        timeouts = []
+
+        def callback(request):
+            url = request.url.replace("https://web.archive.org/save/", "")
+            if url == "https://a.com" and not c_started.is_set():
+                raise ConnectionError("fail")
+            if url == "https://c.com":
+                c_started.set()
+            release.wait(5)
+            return (200, {}, json.dumps({"job_id": f"id-{url}"}))
+
+        def wait(fs, timeout=None, return_when=concurrent.futures.ALL_COMPLETED):
+            timeouts.append(timeout)
+            # The first wait ends with a.com failing. From then on b.com and c.com
+            # fill the window and a.com's retry is due: either the loop blocks on
+            # them or it spins, and either way they are let through.
+            if len(timeouts) > 1 and (timeout is None or len(timeouts) >= 20):
+                c_started.wait(5)
+                release.set()
+            return real_wait(fs, timeout=timeout, return_when=return_when)
+
+        rsps.add_callback(responses.POST, SAVE_URL_RE, callback=callback)
+        a.retry_policy.max_retries = 1
+        real_wait = concurrent.futures.wait
+
+        with retries_due_once(c_started), patch("concurrent.futures.wait", wait):
+            results = list(
+                a.iter_save_pages(
+                    ["https://a.com", "https://b.com", "https://c.com"], 2
+                )
+            )
+
+        assert len(results) == 3
+        assert len(timeouts) < 20
+
+    @patch("archivooor.retry.RetryScheduler.delay_for", return_value=0)
+    def test_partial_failure_retries_only_failures(self, mock_delay, archiver):
         a, rsps = archiver
         url_a = "https://a.com"
         url_b = "https://b.com"
@@ -147,6 +247,222 @@ class TestSavePages:
         assert statuses[url_b] == "submitted"
 
 
+class TestRetryPolicy:
+    def test_transport_retries_follow_policy(self):
+        a = Archiver(
+            "k", "s", track_history=False, retry_policy=RetryPolicy(transport_retries=1)
+        )
+        retry = a.session.get_adapter("https://").max_retries
+        assert retry.total == 1
+        assert retry.budget is a.retry_policy.budget
+
+    def test_save_attempts_do_not_multiply(self):
+        posts = []
+
+        def busy(pool, conn, method, url, **kwargs):
+            posts.append(url)
+            return HTTPResponse(body=b"busy", status=503, request_method=method)
+
+        a = Archiver(
+            "k", "s", track_history=False, retry_policy=RetryPolicy(base_delay=0)
+        )
+        with (
+            patch.object(HTTPConnectionPool, "_make_request", busy),
+            patch.object(Retry, "sleep"),
+        ):
+            results = a.save_pages(["https://a.com"])
+
+        assert results[0]["message"] == "max retries exceeded"
+        assert len(posts) == 1 + MAX_RETRIES
+
+    def test_status_checks_keep_transport_retries(self):
+        a = Archiver("k", "s", track_history=False)
+        assert a.session.get_adapter(f"{SAVE_URL}https://a.com").max_retries.total == 0
+        status_adapter = a.session.get_adapter(f"{BATCH_STATUS_URL}/abc")
+        assert status_adapter.max_retries.total == a.retry_policy.transport_retries
+
+    @patch("archivooor.retry.RetryScheduler.delay_for", return_value=0)
+    def test_budget_exhausted_stops_retries(self, mock_delay, archiver):
+        a, rsps = archiver
+        a.retry_policy = RetryPolicy(budget=RetryBudget(ratio=0, min_retries=1))
+        for _ in range(2):
+            rsps.post(SAVE_URL_RE, body=ConnectionError("fail"))
+
+        results = a.save_pages(["https://a.com"])
+
+        assert results == [
+            {
+                "url": "https://a.com",
+                "status": "failed",
+                "message": "retry budget exhausted",
+            }
+        ]
+
+    @patch("archivooor.archiver.time.sleep")
+    def test_status_retries_follow_policy(self, mock_sleep, archiver):
+        a, rsps = archiver
+        a.retry_policy = RetryPolicy(status_retries=1)
+        for _ in range(2):
+            rsps.get(STATUS_URL_RE, json={"status": "error", "message": "stuck"})
+
+        assert a.get_save_status("job123")["status"] == "error"
+        assert mock_sleep.call_count == 1
+
+
+class TestIterSavePages:
+    def test_yields_results(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+        rsps.post(SAVE_URL_RE, json={"job_id": "2"}, status=200)
+
+        results = list(a.iter_save_pages(iter(["https://a.com", "https://b.com"])))
+
+        assert {r["url"] for r in results} == {"https://a.com", "https://b.com"}
+
+    def test_canonicalizer_dedupes(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+
+        results = list(
+            a.iter_save_pages(
+                ["http://Example.com/a/", "http://example.com/a/?utm_source=x"],
+                canonicalizer=Canonicalizer(),
+            )
+        )
+
+        assert [r["url"] for r in results] == ["http://example.com/a/"]
+        assert len(rsps.calls) == 1
+
+    def test_reads_input_lazily(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+
+        def endless():
+            i = 0
+            while True:
+                yield f"https://{i}.com"
+                i += 1
+
+        first = next(a.iter_save_pages(endless(), max_in_flight=1))
+
+        assert first["url"] == "https://0.com"
+
+    def test_bounded_in_flight(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+        consumed = []
+
+        def source():
+            for i in range(10):
+                consumed.append(i)
+                yield f"https://{i}.com"
+
+        results = a.iter_save_pages(source(), max_in_flight=3)
+        next(results)
+
+        assert len(consumed) <= 3
+        results.close()
+
+    def test_invalid_window(self, archiver):
+        a, _ = archiver
+        with pytest.raises(ValueError):
+            next(a.iter_save_pages(["https://a.com"], max_in_flight=0))
+
+
+class TestTimeoutsAndDeadline:
+    def test_requests_pass_timeouts(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+        rsps.get(STATUS_URL_RE, json={"status": "success"})
+
+        with patch.object(a.session, "request", wraps=a.session.request) as request:
+            a.save_page("https://a.com")
+            a.get_save_status("job1")
+
+        timeouts = [call.kwargs["timeout"] for call in request.call_args_list]
+        assert timeouts == [SAVE_TIMEOUT, STATUS_TIMEOUT]
+
+    def test_expired_deadline_returns_deadline_entries(self, archiver):
+        a, rsps = archiver
+
+        results = a.save_pages(["https://a.com", "https://b.com"], deadline=0)
+
+        assert [r["status"] for r in results] == ["deadline", "deadline"]
+        assert [r["url"] for r in results] == ["https://a.com", "https://b.com"]
+
+    def test_deadline_accepts_timedelta(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+
+        results = a.save_pages(["https://a.com"], deadline=timedelta(minutes=5))
+
+        assert results[0]["status"] == "submitted"
+
+    def test_pending_retry_after_deadline(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, body=ConnectionError("fail"))
+
+        with patch("archivooor.retry.RetryScheduler.delay_for", return_value=60):
+            results = a.save_pages(["https://a.com"], deadline=0.5)
+
+        assert results == [
+            {
+                "url": "https://a.com",
+                "status": "deadline",
+                "message": "deadline reached before submission",
+            }
+        ]
+
+    def test_paused_limiter_does_not_post_after_deadline(self, archiver):
+        a, rsps = archiver
+        a.rate_limiter.pause(6)
+        started = time.monotonic()
+
+        results = a.save_pages(
+            ["https://a.com", "https://b.com", "https://c.com"], deadline=1.0
+        )
+
+        assert [r["status"] for r in results] == ["deadline"] * 3
+        assert len(rsps.calls) == 0
+        assert time.monotonic() - started < 2
+
+    def test_gives_up_on_submissions_running_past_deadline(self, archiver):
+        a, _ = archiver
+        release = threading.Event()
+
+        def stuck(url, **kwargs):
+            release.wait()
+            return {"url": url, "status": "submitted"}
+
+        try:
+            with (
+                patch.object(a, "save_page", side_effect=stuck),
+                patch("archivooor.archiver.DEADLINE_GRACE", 0),
+            ):
+                results = a.save_pages(["https://a.com"], deadline=0.2)
+        finally:
+            release.set()
+
+        assert results == [
+            {
+                "url": "https://a.com",
+                "status": "deadline",
+                "message": "no response before the deadline",
+            }
+        ]
+
+    def test_timeout_capped_by_deadline(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+
+        with patch.object(a, "save_page", wraps=a.save_page) as save_page:
+            a.save_pages(["https://a.com"], deadline=5)
+
+        connect, read = save_page.call_args.kwargs["timeout"]
+        assert connect <= 5
+        assert read <= 5
+
+
 class TestGetSaveStatus:
     def test_success(self, archiver):
         a, rsps = archiver
@@ -189,6 +505,56 @@ class TestGetSaveStatus:
         assert result == "Bad Request"
 
 
+class TestGetSaveStatuses:
+    def test_keyed_by_job_id(self, archiver):
+        a, rsps = archiver
+        rsps.post(
+            BATCH_STATUS_URL,
+            json=[
+                {"job_id": "j1", "status": "success"},
+                {"job_id": "j2", "status": "pending"},
+            ],
+        )
+
+        result = a.get_save_statuses(["j1", "j2", "j1"])
+
+        assert result == {
+            "j1": {"job_id": "j1", "status": "success"},
+            "j2": {"job_id": "j2", "status": "pending"},
+        }
+        assert parse_qs(rsps.calls[0].request.body) == {"job_ids": ["j1,j2"]}
+
+    def test_chunks(self, archiver):
+        a, rsps = archiver
+        bodies = []
+
+        def callback(request):
+            ids = parse_qs(request.body)["job_ids"][0].split(",")
+            bodies.append(ids)
+            return (
+                200,
+                {},
+                json.dumps([{"job_id": i, "status": "success"} for i in ids]),
+            )
+
+        rsps.add_callback(responses.POST, BATCH_STATUS_URL, callback=callback)
+
+        result = a.get_save_statuses([f"j{i}" for i in range(5)], chunk_size=2)
+
+        assert len(result) == 5
+        assert sorted(len(b) for b in bodies) == [1, 2, 2]
+
+    def test_non_200(self, archiver):
+        a, rsps = archiver
+        rsps.post(BATCH_STATUS_URL, body="Bad Request", status=400)
+
+        assert a.get_save_statuses(["j1"]) == {"j1": "Bad Request"}
+
+    def test_empty(self, archiver):
+        a, _ = archiver
+        assert a.get_save_statuses([]) == {}
+
+
 class TestGetUserStatusRequest:
     def test_200(self, archiver):
         a, rsps = archiver
@@ -200,7 +566,7 @@ class TestGetUserStatusRequest:
 
     def test_429_raises(self, archiver):
         a, rsps = archiver
-        a.session.mount("https://", HTTPAdapter(max_retries=0))
+        without_transport_retries(a)
         rsps.get(STATUS_URL_RE, status=429)
 
         with pytest.raises(ArchivooorException, match="Too Many Requests"):
@@ -215,7 +581,7 @@ class TestGetUserStatusRequest:
 
     def test_500_raises(self, archiver):
         a, rsps = archiver
-        a.session.mount("https://", HTTPAdapter(max_retries=0))
+        without_transport_retries(a)
         rsps.get(STATUS_URL_RE, body="server error", status=500)
 
         with pytest.raises(ArchivooorException, match="Unexpected error"):
@@ -244,6 +610,36 @@ class TestNetworkHandler:
         assert nh.executor._max_workers == 5
 
 
+class TestAdaptiveConcurrency:
+    def test_option_grows_executor(self):
+        a = Archiver("k", "s", track_history=False, adaptive_concurrency=True)
+        assert a.concurrency is not None
+        assert a.executor._max_workers == a.concurrency.maximum
+
+    def test_error_status_backs_off(self, archiver):
+        a, rsps = archiver
+        controller = a.use_adaptive_concurrency(
+            AdaptiveConcurrency(initial=4, maximum=8)
+        )
+        a.retry_policy.max_retries = 0
+        rsps.get(STATUS_URL_RE, json={"available": 5, "processing": 0})
+        rsps.post(SAVE_URL_RE, body="busy", status=503)
+
+        a.save_pages(["https://a.com"])
+
+        assert controller.limit == 2
+
+    def test_samples_user_status(self, archiver):
+        a, rsps = archiver
+        controller = a.use_adaptive_concurrency(AdaptiveConcurrency(initial=4))
+        rsps.get(STATUS_URL_RE, json={"available": 0, "processing": 2})
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+
+        a.save_pages(["https://a.com"])
+
+        assert controller.limit == 2
+
+
 class TestArchiverWithHistory:
     @pytest.fixture
     def archiver_with_history(self, tmp_path):
@@ -281,21 +677,115 @@ class TestArchiverWithHistory:
             a = Archiver("test_access", "test_secret", track_history=False)
             assert a.history is None
 
+    def test_skip_if_archived_within(self, archiver_with_history):
+        a, rsps = archiver_with_history
+        a.history.record_submission("https://a.com", "old", "submitted")
+        a.history.update_completion("old", status="success")
+        rsps.post(SAVE_URL_RE, json={"job_id": "new"}, status=200)
+
+        results = a.save_pages(
+            ["https://a.com", "https://b.com"],
+            skip_if_archived_within=timedelta(days=1),
+        )
+
+        by_url = {r["url"]: r for r in results}
+        assert by_url["https://a.com"]["status"] == "skipped"
+        assert by_url["https://b.com"]["status"] == "submitted"
+        assert len(rsps.calls) == 1
+
+    def test_skip_if_archived_within_needs_history(self, archiver):
+        a, _ = archiver
+        with pytest.raises(ValueError):
+            a.save_pages(["https://a.com"], skip_if_archived_within=timedelta(days=1))
+
+    def test_iter_reconcile(self, archiver_with_history):
+        a, rsps = archiver_with_history
+        a.set_max_workers(1)
+        for i in range(5):
+            a.history.record_submission(f"https://{i}.com", f"j{i}", "submitted")
+        a.history.update_completion("j4", status="success")
+        rsps.post(
+            BATCH_STATUS_URL,
+            json=[
+                {"job_id": "j0", "status": "success", "duration_sec": 3.0},
+                {"job_id": "j1", "status": "pending"},
+            ],
+        )
+        rsps.post(BATCH_STATUS_URL, body="Too busy", status=400)
+
+        results = list(a.iter_reconcile(chunk_size=2))
+
+        assert [(r["job_id"], r["status"]) for r in results] == [
+            ("j0", "success"),
+            ("j1", "pending"),
+            ("j2", "unknown"),
+            ("j3", "unknown"),
+        ]
+        assert len(rsps.calls) == 2
+        assert "job_ids=j0%2Cj1" in rsps.calls[0].request.body
+        rows = {row["job_id"]: row for row in a.history.query()}
+        assert rows["j0"]["status"] == "success"
+        assert rows["j0"]["duration_sec"] == 3.0
+        assert rows["j1"]["status"] == "submitted"
+        assert a.history.count_pending_jobs() == 3
+
+    @pytest.mark.parametrize(
+        "failure",
+        [
+            {"body": requests.exceptions.ConnectionError("reset")},
+            {"body": "not json"},
+        ],
+    )
+    def test_iter_reconcile_continues_after_failed_request(
+        self, archiver_with_history, failure
+    ):
+        a, rsps = archiver_with_history
+        a.set_max_workers(1)
+        for i in range(4):
+            a.history.record_submission(f"https://{i}.com", f"j{i}", "submitted")
+        rsps.post(BATCH_STATUS_URL, **failure)
+        rsps.post(
+            BATCH_STATUS_URL,
+            json=[
+                {"job_id": "j2", "status": "success"},
+                {"job_id": "j3", "status": "error"},
+            ],
+        )
+
+        results = list(a.iter_reconcile(chunk_size=2))
+
+        assert [(r["job_id"], r["status"]) for r in results] == [
+            ("j0", "unknown"),
+            ("j1", "unknown"),
+            ("j2", "success"),
+            ("j3", "error"),
+        ]
+        assert a.history.count_pending_jobs() == 2
+
+    def test_iter_reconcile_needs_history(self, archiver):
+        a, _ = archiver
+        with pytest.raises(ValueError):
+            list(a.iter_reconcile())
+
     def test_save_pages_triggers_poll(self, archiver_with_history):
         a, rsps = archiver_with_history
-        rsps.post(SAVE_URL_RE, json={"job_id": "poll1"}, status=200)
-        rsps.get(
-            STATUS_URL_RE,
-            json={
-                "status": "success",
-                "original_url": "https://example.com",
-                "timestamp": "20260425120000",
-                "duration_sec": 2.5,
-            },
+        rsps.post(
+            BATCH_STATUS_URL,
+            json=[
+                {
+                    "job_id": "poll1",
+                    "status": "success",
+                    "original_url": "https://example.com",
+                    "timestamp": "20260425120000",
+                    "duration_sec": 2.5,
+                }
+            ],
         )
+        rsps.post(SAVE_URL_RE, json={"job_id": "poll1"}, status=200)
 
+        a.poller.poll_interval = 0
         a.save_pages(["https://example.com"])
-        a.executor.shutdown(wait=True)
+        assert a.poller.wait_idle(timeout=5)
 
         rows = a.history.query()
         assert len(rows) == 1
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import threading
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from archivooor.archiver import MAX_RETRIES, MAX_STATUS_RETRIES
+from archivooor.exceptions import ArchivooorException
+from archivooor.ratelimit import default_limiter
+from archivooor.retry import RetryPolicy
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestServer  # noqa: E402
+
+from archivooor.async_archiver import AsyncArchiver  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeTransport:
+    """Replays queued (status, body) pairs in place of ``AsyncArchiver._request``."""
+
+    def __init__(self):
+        self.replies = []
+        self.calls = []
+
+    def add(self, status=200, payload=None, body="", exc=None):
+        text = json.dumps(payload) if payload is not None else body
+        self.replies.append((status, text, exc))
+
+    async def __call__(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        status, text, exc = self.replies.pop(0)
+        if exc is not None:
+            raise exc
+        return status, text
+
+
+@pytest.fixture
+def async_archiver():
+    a = AsyncArchiver("test_access", "test_secret", track_history=False)
+    transport = FakeTransport()
+    with patch.object(a, "_request", transport):
+        yield a, transport
+
+
+class TestAsyncSavePage:
+    def test_success_with_job_id(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(payload={"job_id": "abc"})
+
+        result = run(a.save_page("https://example.com"))
+
+        assert result["status"] == "submitted"
+        assert result["job_id"] == "abc"
+        assert result["url"] == "https://example.com"
+
+    def test_sends_form_params(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(payload={"job_id": "abc"})
+
+        run(a.save_page("https://example.com", capture_all=True))
+
+        method, url, kwargs = transport.calls[0]
+        assert method == "POST"
+        assert url == "https://web.archive.org/save/https://example.com"
+        assert kwargs["data"]["capture_all"] == "True"
+        assert kwargs["data"]["email_result"] == "False"
+
+    def test_non_200(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(status=400, body="Bad Request")
+
+        result = run(a.save_page("https://example.com"))
+
+        assert result["status"] == "error"
+        assert result["status_code"] == 400
+        assert result["full_response"] == "Bad Request"
+
+    def test_401_raises(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(status=401)
+
+        with pytest.raises(ArchivooorException, match="Unauthorized"):
+            run(a.save_page("https://example.com"))
+
+
+class TestAsyncSavePages:
+    def test_all_succeed(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(payload={"job_id": "1"})
+        transport.add(payload={"job_id": "2"})
+
+        results = run(a.save_pages(["https://a.com", "https://b.com"]))
+
+        assert len(results) == 2
+        assert all(r["status"] == "submitted" for r in results)
+
+    @patch("archivooor.async_archiver.asyncio.sleep", new_callable=AsyncMock)
+    def test_max_retries_returns_error_dicts(self, mock_sleep, async_archiver):
+        a, transport = async_archiver
+        for _ in range(MAX_RETRIES + 1):
+            transport.add(exc=aiohttp.ClientConnectionError("fail"))
+
+        results = run(a.save_pages(["https://a.com"]))
+
+        assert len(results) == 1
+        assert results[0]["status"] == "failed"
+        assert results[0]["message"] == "max retries exceeded"
+        assert mock_sleep.await_count == MAX_RETRIES
+
+    @patch("archivooor.async_archiver.asyncio.sleep", new_callable=AsyncMock)
+    def test_retries_follow_retry_policy(self, mock_sleep):
+        a = AsyncArchiver(
+            "a", "s", track_history=False, retry_policy=RetryPolicy(max_retries=1)
+        )
+        transport = FakeTransport()
+        for _ in range(2):
+            transport.add(exc=aiohttp.ClientConnectionError("fail"))
+
+        with patch.object(a, "_request", transport):
+            results = run(a.save_pages(["https://a.com"]))
+
+        assert results[0]["message"] == "max retries exceeded"
+        assert len(transport.calls) == 2
+        assert mock_sleep.await_count == 1
+
+    def test_unauthorized_propagates(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(status=401)
+
+        with pytest.raises(ArchivooorException):
+            run(a.save_pages(["https://a.com"]))
+
+
+class TestAsyncStatus:
+    @patch("archivooor.async_archiver.asyncio.sleep", new_callable=AsyncMock)
+    def test_get_save_status_max_retries(self, mock_sleep, async_archiver):
+        a, transport = async_archiver
+        for _ in range(MAX_STATUS_RETRIES + 1):
+            transport.add(payload={"status": "error", "message": "stuck"})
+
+        result = run(a.get_save_status("job123"))
+
+        assert result["status"] == "error"
+        assert mock_sleep.await_count == MAX_STATUS_RETRIES
+
+    def test_get_save_status_non_200(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(status=400, body="Bad Request")
+
+        assert run(a.get_save_status("job123")) == "Bad Request"
+
+    def test_get_user_status_request(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(payload={"available": 5, "processing": 1})
+
+        assert run(a.get_user_status_request()) == {"available": 5, "processing": 1}
+
+    def test_get_user_status_429_raises(self, async_archiver):
+        a, transport = async_archiver
+        transport.add(status=429)
+
+        with pytest.raises(ArchivooorException, match="Too Many Requests"):
+            run(a.get_user_status_request())
+
+    def test_save_pages_polls_into_history(self, tmp_path):
+        a = AsyncArchiver("test_access", "test_secret", db_path=str(tmp_path / "h.db"))
+        transport = FakeTransport()
+        transport.add(payload={"job_id": "poll1"})
+        transport.add(payload={"status": "success", "timestamp": "20260425120000"})
+
+        async def go():
+            async with a:
+                await a.save_pages(["https://example.com"])
+
+        with patch.object(a, "_request", transport):
+            run(go())
+
+        rows = a.history.query()
+        assert rows[0]["status"] == "success"
+        assert rows[0]["timestamp"] == "20260425120000"
+
+    def test_synchronous_history_is_written_off_the_loop(self, tmp_path):
+        a = AsyncArchiver(
+            "a", "s", db_path=str(tmp_path / "h.db"), history_write_behind=False
+        )
+        threads = []
+        record = a.history.record_submission
+
+        def recording(*args):
+            threads.append(threading.current_thread())
+            return record(*args)
+
+        transport = FakeTransport()
+        transport.add(payload={"job_id": "j1"})
+        with (
+            patch.object(a, "_request", transport),
+            patch.object(a.history, "record_submission", recording),
+        ):
+            run(a.save_page("https://example.com"))
+
+        assert threads and threading.main_thread() not in threads
+        assert a.history.query()[0]["job_id"] == "j1"
+
+
+class TestAsyncTransport:
+    def test_concurrency_is_bounded(self):
+        in_flight = {"now": 0, "peak": 0}
+
+        async def handler(request):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            await asyncio.sleep(0.02)
+            in_flight["now"] -= 1
+            return web.json_response({"job_id": "x"})
+
+        async def go():
+            app = web.Application()
+            app.router.add_post("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with AsyncArchiver(
+                    "a", "s", max_concurrency=2, track_history=False
+                ) as a:
+                    await asyncio.gather(
+                        *(
+                            a._request("POST", str(server.make_url("/")))
+                            for _ in range(6)
+                        )
+                    )
+
+        run(go())
+
+        assert in_flight["peak"] == 2
+
+    def test_requests_take_tokens_from_shared_limiter(self):
+        async def handler(request):
+            return web.json_response({"job_id": "x"})
+
+        async def go(a):
+            app = web.Application()
+            app.router.add_post("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                async with a:
+                    url = str(server.make_url("/save/x"))
+                    await asyncio.gather(*(a._request("POST", url) for _ in range(3)))
+
+        a = AsyncArchiver("a", "s", track_history=False)
+        bucket = a.rate_limiter.buckets["save"]
+        tokens = bucket._tokens
+
+        run(go(a))
+
+        assert a.rate_limiter is default_limiter()
+        assert bucket._tokens == pytest.approx(tokens - 3, abs=0.1)
+
+    def test_save_attempts_do_not_multiply(self):
+        posts = []
+
+        async def handler(request):
+            posts.append(request.path)
+            return web.Response(status=503, text="busy")
+
+        async def go(a):
+            app = web.Application()
+            app.router.add_post("/{tail:.*}", handler)
+            async with TestServer(app) as server:
+                request = a._request
+
+                async def to_server(method, url, **kwargs):
+                    return await request(
+                        method, str(server.make_url("/save")), **kwargs
+                    )
+
+                async with a:
+                    with patch.object(a, "_request", to_server):
+                        return await a.save_pages(["https://a.com"])
+
+        a = AsyncArchiver(
+            "a", "s", track_history=False, retry_policy=RetryPolicy(base_delay=0)
+        )
+        results = run(go(a))
+
+        assert results[0]["message"] == "max retries exceeded"
+        assert len(posts) == 1 + MAX_RETRIES
+
+    def test_retry_after_is_honoured(self):
+        attempts = []
+
+        async def handler(request):
+            attempts.append(request.headers["Authorization"])
+            if len(attempts) == 1:
+                return web.Response(status=503, headers={"Retry-After": "0"})
+            return web.json_response({"ok": True})
+
+        async def go():
+            app = web.Application()
+            app.router.add_get("/", handler)
+            async with TestServer(app) as server:
+                async with AsyncArchiver("a", "s", track_history=False) as a:
+                    return await a._request("GET", str(server.make_url("/")))
+
+        status, text = run(go())
+
+        assert status == 200
+        assert json.loads(text) == {"ok": True}
+        assert attempts == ["LOW a:s", "LOW a:s"]
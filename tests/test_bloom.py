@@ -0,0 +1,31 @@
+import pytest
+
+from archivooor.bloom import BloomFilter
+
+
+class TestBloomFilter:
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        urls = [f"https://example.com/{i}" for i in range(1000)]
+        for url in urls:
+            bloom.add(url)
+
+        assert all(url in bloom for url in urls)
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"https://example.com/{i}")
+
+        false_positives = sum(f"https://example.org/{i}" in bloom for i in range(10000))
+
+        assert false_positives < 300
+
+    def test_empty(self):
+        bloom = BloomFilter(0)
+
+        assert "https://example.com" not in bloom
+
+    def test_invalid_error_rate(self):
+        with pytest.raises(ValueError):
+            BloomFilter(10, error_rate=1)
@@ -0,0 +1,88 @@
+import pytest
+
+from archivooor.canonical import Canonicalizer, SeenSet, iter_unique
+
+
+class TestCanonicalizer:
+    @pytest.mark.parametrize(
+        "url, expected",
+        [
+            ("HTTP://Example.COM/a/", "http://example.com/a/"),
+            ("https://example.com:443/a", "https://example.com/a"),
+            ("http://example.com:8080/a", "http://example.com:8080/a"),
+            (
+                "https://example.com/a?utm_source=x&b=2&a=1",
+                "https://example.com/a?a=1&b=2",
+            ),
+            ("https://example.com/a?fbclid=1#top", "https://example.com/a"),
+            ("https://example.com/", "https://example.com/"),
+            ("https://user@Example.com/a", "https://user@example.com/a"),
+            ("https://[::1]:443/a", "https://[::1]/a"),
+            ("https://example.com/a?q=a%20b&x=", "https://example.com/a?q=a%20b&x="),
+            ("  https://example.com/a \n", "https://example.com/a"),
+            ("ftp://Example.com/a/", "ftp://Example.com/a/"),
+            ("not a url", "not a url"),
+            ("http://example.com:bad/", "http://example.com:bad/"),
+        ],
+    )
+    def test_default(self, url, expected):
+        assert Canonicalizer()(url) == expected
+
+    def test_variants_collapse(self):
+        canonicalize = Canonicalizer("strip")
+        urls = {
+            canonicalize(url)
+            for url in (
+                "https://Example.com/a/",
+                "https://example.com/a",
+                "https://example.com/a?utm_source=x",
+            )
+        }
+        assert urls == {"https://example.com/a"}
+
+    def test_trailing_slash_kept_by_default(self):
+        assert Canonicalizer()("https://a.com/b/") == "https://a.com/b/"
+        assert Canonicalizer()("https://a.com/b") == "https://a.com/b"
+
+    def test_trailing_slash_strip(self):
+        canonicalize = Canonicalizer("strip")
+        assert canonicalize("https://a.com/b/") == "https://a.com/b"
+        assert canonicalize("https://a.com/") == "https://a.com"
+
+    def test_trailing_slash_add(self):
+        canonicalize = Canonicalizer("add")
+        assert canonicalize("https://a.com/b") == "https://a.com/b/"
+        assert canonicalize("https://a.com") == "https://a.com/"
+        assert canonicalize("https://a.com/b.html") == "https://a.com/b.html"
+
+    def test_options(self):
+        canonicalize = Canonicalizer(
+            strip_tracking=False,
+            extra_params=["Session"],
+            sort_query=False,
+            strip_fragment=False,
+        )
+        assert (
+            canonicalize("https://a.com/?z=1&utm_source=x&session=2#f")
+            == "https://a.com/?z=1&utm_source=x#f"
+        )
+
+    def test_invalid_policy(self):
+        with pytest.raises(ValueError):
+            Canonicalizer("sometimes")
+
+
+class TestSeenSet:
+    def test_add(self):
+        seen = SeenSet()
+        assert seen.add("https://a.com")
+        assert not seen.add("https://a.com")
+        assert "https://a.com" in seen
+        assert "https://b.com" not in seen
+        assert len(seen) == 1
+
+
+def test_iter_unique():
+    urls = ["https://a.com/x/", "https://A.com/x/", "", "https://a.com/y"]
+
+    assert list(iter_unique(urls)) == ["https://a.com/x/", "https://a.com/y"]
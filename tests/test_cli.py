@@ -1,9 +1,26 @@
+import csv
+import gzip
+import json
+from datetime import timedelta
 from unittest.mock import MagicMock, patch
 
+import pytest
+import requests
 from click.testing import CliRunner
 
-from archivooor.cli import cli
+from archivooor import history as history_module
+from archivooor.cli import Progress, cli
 from archivooor.history import HistoryDB
+from archivooor.work_queue import WorkQueue
+
+
+@pytest.fixture(autouse=True)
+def app_dir(tmp_path, monkeypatch):
+    """Keep the databases the CLI opens by default out of the user's app dir."""
+    monkeypatch.setattr(
+        history_module, "_default_db_path", lambda: str(tmp_path / "app" / "history.db")
+    )
+    return tmp_path / "app"
 
 
 @patch("archivooor.cli.key_utils")
@@ -24,7 +41,7 @@ class TestCli:
     def test_save_default_output(self, mock_archiver_cls, mock_key_utils):
         mock_key_utils.get_credentials.return_value = ("ak", "sk")
         mock_arch = MagicMock()
-        mock_arch.save_pages.return_value = [
+        mock_arch.iter_save_pages.return_value = [
             {"url": "https://a.com", "status": "submitted", "job_id": "j1"}
         ]
         mock_archiver_cls.return_value = mock_arch
@@ -37,7 +54,7 @@ class TestCli:
     def test_save_verbose_output(self, mock_archiver_cls, mock_key_utils):
         mock_key_utils.get_credentials.return_value = ("ak", "sk")
         mock_arch = MagicMock()
-        mock_arch.save_pages.return_value = [
+        mock_arch.iter_save_pages.return_value = [
             {
                 "url": "https://a.com",
                 "status": "submitted",
@@ -53,6 +70,342 @@ class TestCli:
         assert "status: submitted" in result.output
         assert "job_id: j1" in result.output
 
+    def test_save_adaptive(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.return_value = []
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli, ["save", "--adaptive", "--max-concurrency", "3", "https://a.com"]
+        )
+
+        assert result.exit_code == 0
+        (controller,), _ = mock_arch.use_adaptive_concurrency.call_args
+        assert controller.maximum == 3
+        assert controller.limit == 3
+
+    def test_save_retry_options(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.return_value = []
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli,
+            ["save", "--max-retries", "1", "--retry-budget", "0.5", "https://a.com"],
+        )
+
+        assert result.exit_code == 0
+        assert mock_arch.retry_policy.max_retries == 1
+        assert mock_arch.retry_policy.budget.ratio == 0.5
+
+    def test_save_deadline(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.return_value = []
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli, ["save", "--deadline", "15m", "https://a.com"]
+        )
+
+        assert result.exit_code == 0
+        assert mock_arch.iter_save_pages.call_args.kwargs["deadline"] == timedelta(
+            minutes=15
+        )
+
+    def test_save_skip_if_archived_within(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.return_value = []
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli, ["save", "--skip-if-archived-within", "7d", "https://a.com"]
+        )
+
+        assert result.exit_code == 0
+        kwargs = mock_arch.iter_save_pages.call_args.kwargs
+        assert kwargs["skip_if_archived_within"] == timedelta(days=7)
+
+    def test_save_skip_needs_history(self, mock_archiver_cls, mock_key_utils, app_dir):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.history = None
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli,
+            [
+                "--no-history",
+                "save",
+                "--skip-if-archived-within",
+                "7d",
+                "https://a.com",
+            ],
+        )
+
+        assert result.exit_code != 0
+        assert "needs history" in result.output
+        assert "run_id" not in result.output
+        assert not (app_dir / "queue.db").exists()
+
+    def test_save_invalid_deadline(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_archiver_cls.return_value = MagicMock()
+
+        result = self._runner().invoke(
+            cli, ["save", "--deadline", "soon", "https://a.com"]
+        )
+
+        assert result.exit_code != 0
+        assert "not a duration" in result.output
+
+    def test_save_input_file(self, mock_archiver_cls, mock_key_utils, tmp_path):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = fake_iter_save_pages
+        mock_archiver_cls.return_value = mock_arch
+        path = tmp_path / "urls.txt.gz"
+        path.write_bytes(
+            gzip.compress(b"# header\nhttps://a.com/1\n\n  https://a.com/2  \n")
+        )
+
+        result = self._runner().invoke(
+            cli, ["save", "https://a.com/0", "--input", str(path)]
+        )
+
+        assert result.exit_code == 0, result.output
+        assert result.output.count("status: submitted") == 3
+        assert "job_id: job-2" in result.output
+
+    def test_save_input_stdin(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        submitted = []
+
+        def consume(urls, **kwargs):
+            for url in urls:
+                submitted.append(url)
+                yield {"url": url, "status": "submitted", "job_id": "j"}
+
+        mock_arch.iter_save_pages.side_effect = consume
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli, ["save", "-i", "-"], input="https://a.com/1\n#skip\nhttps://a.com/2"
+        )
+
+        assert result.exit_code == 0, result.output
+        assert submitted == ["https://a.com/1", "https://a.com/2"]
+
+    def test_save_undecodable_input(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = lambda urls, **kw: (
+            {"url": url, "status": "submitted"} for url in urls
+        )
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli, ["save", "-i", "-"], input=b"https://a.com/1\n\xff\xfe\n"
+        )
+
+        assert result.exit_code != 0
+        assert "Failed to read URLs" in result.output
+
+    def test_save_network_error_is_not_an_input_error(
+        self, mock_archiver_cls, mock_key_utils
+    ):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = requests.ConnectionError("reset")
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["save", "-i", "-"], input="https://a.com")
+
+        assert isinstance(result.exception, requests.ConnectionError)
+        assert "Failed to read URLs" not in result.output
+
+    @pytest.mark.parametrize(
+        "args, expected",
+        [
+            (
+                [],
+                ["https://A.com/1/", "https://a.com/1?utm_source=x", "https://a.com/2"],
+            ),
+            (
+                ["--canonicalize"],
+                ["https://a.com/1/", "https://a.com/1", "https://a.com/2"],
+            ),
+            (
+                ["--canonicalize", "--trailing-slash", "strip"],
+                ["https://a.com/1", "https://a.com/2"],
+            ),
+        ],
+    )
+    def test_save_canonicalizes(
+        self, mock_archiver_cls, mock_key_utils, args, expected
+    ):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        submitted = []
+
+        def consume(urls, **kwargs):
+            for url in urls:
+                submitted.append(url)
+                yield {"url": url, "status": "submitted", "job_id": "j"}
+
+        mock_arch.iter_save_pages.side_effect = consume
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(
+            cli,
+            ["save", *args, "-i", "-"],
+            input="https://A.com/1/\nhttps://a.com/1?utm_source=x\nhttps://a.com/2",
+        )
+
+        assert result.exit_code == 0, result.output
+        assert submitted == expected
+        assert "left" not in result.output
+
+    def test_save_jsonl_output(self, mock_archiver_cls, mock_key_utils, tmp_path):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.return_value = iter(
+            [
+                {
+                    "url": "https://a.com",
+                    "status": "submitted",
+                    "job_id": "j1",
+                    "full_response": {"job_id": "j1"},
+                },
+                {"url": "https://b.com", "status": "failed", "message": "boom"},
+            ]
+        )
+        mock_archiver_cls.return_value = mock_arch
+        out = tmp_path / "results.jsonl"
+
+        result = self._runner().invoke(
+            cli,
+            [
+                "save",
+                "https://a.com",
+                "https://b.com",
+                "--format",
+                "jsonl",
+                "--output",
+                str(out),
+                "--no-full-response",
+            ],
+        )
+
+        assert result.exit_code == 0, result.output
+        lines = [json.loads(line) for line in out.read_text().splitlines()]
+        assert lines == [
+            {"url": "https://a.com", "status": "submitted", "job_id": "j1"},
+            {"url": "https://b.com", "status": "failed", "message": "boom"},
+        ]
+        assert "(failed: 1, submitted: 1)" in result.output
+
+    def test_save_jsonl_to_stdout_keeps_full_response(
+        self, mock_archiver_cls, mock_key_utils
+    ):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.return_value = iter(
+            [{"url": "https://a.com", "status": "submitted", "full_response": {}}]
+        )
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["save", "https://a.com", "-f", "jsonl"])
+
+        (line,) = [x for x in result.output.splitlines() if x.startswith("{")]
+        assert json.loads(line) == {
+            "url": "https://a.com",
+            "status": "submitted",
+            "full_response": {},
+        }
+        assert "1 URLs" in result.output
+
+    def test_save_prints_run_id_and_deletes_finished_run(
+        self, mock_archiver_cls, mock_key_utils, app_dir
+    ):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = fake_iter_save_pages
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["save", "https://a.com/1"])
+
+        assert result.exit_code == 0, result.output
+        run_id = result.output.split("run_id: ")[1].split()[0]
+        queue = WorkQueue(db_path=str(app_dir / "queue.db"))
+        assert not queue.has_run(run_id)
+        queue.close()
+
+    def test_save_keeps_run_with_failures(
+        self, mock_archiver_cls, mock_key_utils, app_dir
+    ):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = lambda urls, **kw: (
+            {"url": url, "status": "failed", "message": "boom"} for url in urls
+        )
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["save", "https://a.com/1"])
+
+        run_id = result.output.split("run_id: ")[1].split()[0]
+        queue = WorkQueue(db_path=str(app_dir / "queue.db"))
+        assert queue.counts(run_id) == {"failed": 1}
+        queue.close()
+
+    def test_save_resume(self, mock_archiver_cls, mock_key_utils, app_dir):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        queue = WorkQueue(db_path=str(app_dir / "queue.db"))
+        run_id = queue.create_run()
+        queue.enqueue(run_id, ["https://a.com/1", "https://a.com/2"])
+        queue.claim(run_id, limit=1)
+        queue.close()
+        submitted = []
+
+        def consume(urls, **kwargs):
+            for url in urls:
+                submitted.append(url)
+                yield {"url": url, "status": "submitted", "job_id": "j"}
+
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = consume
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["save", "--resume", run_id])
+
+        assert result.exit_code == 0, result.output
+        assert submitted == ["https://a.com/1", "https://a.com/2"]
+
+    def test_save_resume_unknown_run(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_archiver_cls.return_value = MagicMock()
+
+        result = self._runner().invoke(cli, ["save", "--resume", "nope"])
+
+        assert result.exit_code != 0
+        assert "Unknown run nope" in result.output
+
+    def test_save_reports_leftovers(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = lambda urls, **kw: (
+            {"url": url, "status": "deadline"} for url in urls
+        )
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["save", "https://a.com/1"])
+
+        assert "1 URLs left, continue with: archivooor save --resume" in result.output
+
     def test_job_output(self, mock_archiver_cls, mock_key_utils):
         mock_key_utils.get_credentials.return_value = ("ak", "sk")
         mock_arch = MagicMock()
@@ -69,6 +422,22 @@ class TestCli:
         assert "original_url: https://a.com" in result.output
         assert "outlinks_saved: 1" in result.output
 
+    def test_job_several_ids_batched(self, mock_archiver_cls, mock_key_utils):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.get_save_statuses.return_value = {
+            "j1": {"status": "success", "original_url": "https://a.com"},
+            "j2": {"status": "pending", "original_url": "https://b.com"},
+        }
+        mock_archiver_cls.return_value = mock_arch
+
+        result = self._runner().invoke(cli, ["job", "j1", "j2"])
+
+        mock_arch.get_save_statuses.assert_called_once_with(("j1", "j2"))
+        mock_arch.get_save_status.assert_not_called()
+        assert "job_id: j1\nstatus: success" in result.output
+        assert "job_id: j2\nstatus: pending" in result.output
+
     def test_stats_output(self, mock_archiver_cls, mock_key_utils):
         mock_key_utils.get_credentials.return_value = ("ak", "sk")
         mock_arch = MagicMock()
@@ -138,6 +507,140 @@ class TestHistoryCli:
         assert "submitted" in result.output
         db.close()
 
+    def test_history_stats(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        db.record_submission("https://example.com/a", "job1", "submitted")
+        db.record_submission("https://example.com/b", "job2", "submitted")
+        db.update_completion("job1", status="success", duration_sec=3.0)
+        db.update_completion("job2", status="error", status_ext="error:blocked")
+
+        mock_arch = MagicMock()
+        mock_arch.history = db
+
+        with (
+            patch("archivooor.cli.key_utils") as mk,
+            patch("archivooor.cli.archiver.Archiver", return_value=mock_arch),
+        ):
+            mk.get_credentials.return_value = ("ak", "sk")
+            result = self._runner().invoke(cli, ["history", "stats", "--by", "domain"])
+
+        assert result.exit_code == 0, result.output
+        assert "example.com" in result.output
+        assert "50.0%" in result.output
+        assert "error:blocked (1)" in result.output
+        db.close()
+
+    def _invoke_history(self, db, args):
+        mock_arch = MagicMock()
+        mock_arch.history = db
+        with (
+            patch("archivooor.cli.key_utils") as mk,
+            patch("archivooor.cli.archiver.Archiver", return_value=mock_arch),
+        ):
+            mk.get_credentials.return_value = ("ak", "sk")
+            return self._runner().invoke(cli, ["history", *args])
+
+    def test_history_export_jsonl(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        db.record_submission("https://a.com", "job1", "submitted")
+        db.record_submission("https://b.com", "job2", "submitted")
+
+        result = self._invoke_history(db, ["export"])
+
+        assert result.exit_code == 0, result.output
+        rows = [
+            json.loads(line) for line in result.output.splitlines() if line[0] == "{"
+        ]
+        assert [row["url"] for row in rows] == ["https://a.com", "https://b.com"]
+        assert f"cursor: {rows[-1]['submitted_at']},{rows[-1]['id']}" in result.output
+        db.close()
+
+    def test_history_export_csv_resume(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        db.record_submission("https://a.com", "job1", "submitted")
+        out = tmp_path / "history.csv"
+
+        first = self._invoke_history(db, ["export", "-f", "csv", "-o", str(out)])
+        cursor = first.output.strip().split("cursor: ")[-1]
+        db.record_submission("https://b.com", "job2", "submitted")
+        second = self._invoke_history(
+            db, ["export", "-f", "csv", "-o", str(out), "--after", cursor]
+        )
+
+        assert second.exit_code == 0, second.output
+        with open(out, newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [row["url"] for row in rows] == ["https://a.com", "https://b.com"]
+        db.close()
+
+    def test_history_export_invalid_cursor(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+
+        result = self._invoke_history(db, ["export", "--after", "nonsense"])
+
+        assert result.exit_code != 0
+        assert "not a cursor" in result.output
+        db.close()
+
+    def test_history_prune(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        db.record_submission("https://a.com", "job1", "submitted")
+        db.record_submission("https://a.com", "job2", "submitted")
+
+        result = self._invoke_history(db, ["prune", "--keep-latest", "1", "--yes"])
+
+        assert result.exit_code == 0, result.output
+        assert "Deleted 1 entries." in result.output
+        assert len(db.query()) == 1
+        db.close()
+
+    def test_history_prune_needs_rule(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+
+        result = self._invoke_history(db, ["prune", "--yes"])
+
+        assert result.exit_code != 0
+        assert "at least one" in result.output
+        db.close()
+
+    def test_history_reconcile(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        db.record_submission("https://a.com", "job1", "submitted")
+        db.record_submission("https://b.com", "job2", "submitted")
+        mock_arch = MagicMock()
+        mock_arch.history = db
+        mock_arch.iter_reconcile.return_value = iter(
+            [
+                {"job_id": "job1", "status": "success"},
+                {"job_id": "job2", "status": "pending"},
+            ]
+        )
+
+        with (
+            patch("archivooor.cli.key_utils") as mk,
+            patch("archivooor.cli.archiver.Archiver", return_value=mock_arch),
+        ):
+            mk.get_credentials.return_value = ("ak", "sk")
+            result = self._runner().invoke(
+                cli, ["history", "reconcile", "--concurrency", "8", "-v"]
+            )
+
+        assert result.exit_code == 0, result.output
+        assert "success job1" in result.output
+        assert "2/2 jobs" in result.output
+        assert "pending: 1" in result.output
+        mock_arch.set_max_workers.assert_called_once_with(8)
+        db.close()
+
+    def test_history_reconcile_nothing_pending(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+
+        result = self._invoke_history(db, ["reconcile"])
+
+        assert result.exit_code == 0, result.output
+        assert "No pending jobs." in result.output
+        db.close()
+
     def test_history_json_output(self, tmp_path):
         db = HistoryDB(db_path=str(tmp_path / "h.db"))
         db.record_submission("https://example.com", "job1", "submitted")
@@ -207,3 +710,142 @@ class TestHistoryCli:
 
         assert result.exit_code != 0
         assert "disabled" in result.output
+
+
+SITEMAP_XML = """\
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://a.com/1</loc></url>
+  <url><loc>https://a.com/2</loc></url>
+  <url><loc>https://a.com/3</loc></url>
+</urlset>"""
+
+
+def fake_iter_save_pages(urls, **kwargs):
+    assert not isinstance(urls, list)
+    for url in urls:
+        yield {"url": url, "status": "submitted", "job_id": f"job-{url[-1]}"}
+
+
+@patch("archivooor.cli.SitemapCache")
+@patch("archivooor.cli.key_utils")
+@patch("archivooor.cli.archiver.Archiver")
+class TestSitemapCommand:
+    def _invoke(self, mock_archiver_cls, mock_key_utils, tmp_path, *args):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = fake_iter_save_pages
+        mock_archiver_cls.return_value = mock_arch
+        path = tmp_path / "sitemap.xml"
+        path.write_text(SITEMAP_XML)
+        result = CliRunner().invoke(cli, ["sitemap", str(path), *args])
+        return mock_arch, result
+
+    def test_streams_pages_into_submission(
+        self, mock_archiver_cls, mock_key_utils, mock_cache_cls, tmp_path
+    ):
+        mock_arch, result = self._invoke(
+            mock_archiver_cls, mock_key_utils, tmp_path, "-v"
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "submitted https://a.com/1 job-1" in result.output
+        assert "submitted: 3" in result.output
+        assert "3 URLs" in result.output
+        mock_cache_cls.assert_called_once_with()
+
+    def test_limit_and_concurrency(
+        self, mock_archiver_cls, mock_key_utils, mock_cache_cls, tmp_path
+    ):
+        mock_arch, result = self._invoke(
+            mock_archiver_cls,
+            mock_key_utils,
+            tmp_path,
+            "--limit",
+            "2",
+            "--concurrency",
+            "12",
+        )
+
+        assert result.exit_code == 0, result.output
+        assert "submitted: 2" in result.output
+        assert "2/2 URLs" in result.output
+        mock_arch.set_max_workers.assert_called_once_with(12)
+
+    def test_no_cache(
+        self, mock_archiver_cls, mock_key_utils, mock_cache_cls, tmp_path
+    ):
+        _, result = self._invoke(
+            mock_archiver_cls, mock_key_utils, tmp_path, "--no-cache"
+        )
+
+        assert result.exit_code == 0, result.output
+        mock_cache_cls.assert_not_called()
+
+    def test_since_last_run_reports_skipped(
+        self, mock_archiver_cls, mock_key_utils, mock_cache_cls, tmp_path
+    ):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.history = db
+        mock_arch.iter_save_pages.side_effect = fake_iter_save_pages
+        mock_archiver_cls.return_value = mock_arch
+        path = tmp_path / "sitemap.xml"
+        path.write_text(
+            SITEMAP_XML.replace(
+                "<loc>https://a.com/1</loc>",
+                "<loc>https://a.com/1</loc><lastmod>2020-01-01</lastmod>",
+            )
+        )
+        db.record_submission("https://a.com/1", "j1", "submitted")
+        db.update_completion("j1", status="success")
+
+        result = CliRunner().invoke(cli, ["sitemap", str(path), "--since-last-run"])
+
+        assert result.exit_code == 0, result.output
+        assert "submitted: 2" in result.output
+        assert "skipped: 1" in result.output
+        db.close()
+
+    def test_missing_sitemap(
+        self, mock_archiver_cls, mock_key_utils, mock_cache_cls, tmp_path
+    ):
+        mock_key_utils.get_credentials.return_value = ("ak", "sk")
+        mock_arch = MagicMock()
+        mock_arch.iter_save_pages.side_effect = fake_iter_save_pages
+        mock_archiver_cls.return_value = mock_arch
+
+        result = CliRunner().invoke(cli, ["sitemap", str(tmp_path / "missing.xml")])
+
+        assert result.exit_code != 0
+        assert "Failed to read sitemap" in result.output
+
+
+class TestProgress:
+    def test_eta_with_known_total(self):
+        now = [0.0]
+        progress = Progress(total=100, interval=1000, clock=lambda: now[0])
+        for _ in range(10):
+            progress.update("submitted")
+        now[0] = 5.0
+
+        assert progress.line() == "10/100 URLs, 2.0 URL/s, ETA 45s"
+
+    def test_throughput_without_total(self):
+        now = [0.0]
+        progress = Progress(interval=1000, clock=lambda: now[0])
+        progress.update("submitted")
+        now[0] = 2.0
+
+        assert progress.line() == "1 URLs, 0.5 URL/s"
+
+    def test_counts_in_periodic_line(self):
+        now = [0.0]
+        progress = Progress(interval=1000, clock=lambda: now[0], show_counts=True)
+        progress.update("submitted")
+        progress.update("failed")
+        now[0] = 1.0
+
+        assert (
+            progress.line(counts=True) == "2 URLs, 2.0 URL/s (failed: 1, submitted: 1)"
+        )
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from archivooor.concurrency import AdaptiveConcurrency
+
+
+class TestAdaptiveConcurrency:
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            AdaptiveConcurrency(initial=10, maximum=5)
+
+    def test_grows_after_window_of_successes(self):
+        c = AdaptiveConcurrency(initial=2, maximum=10)
+        c.record_success()
+        assert c.limit == 2
+        c.record_success()
+        assert c.limit == 3
+
+    def test_does_not_exceed_maximum(self):
+        c = AdaptiveConcurrency(initial=3, maximum=3)
+        for _ in range(10):
+            c.record_success()
+        assert c.limit == 3
+
+    def test_throttle_backs_off_multiplicatively(self):
+        c = AdaptiveConcurrency(initial=8, maximum=10)
+        c.record_throttle()
+        assert c.limit == 4
+
+    def test_throttle_cooldown(self):
+        c = AdaptiveConcurrency(initial=8, maximum=10, cooldown=60)
+        c.record_throttle()
+        c.record_throttle()
+        assert c.limit == 4
+
+    def test_throttle_respects_minimum(self):
+        c = AdaptiveConcurrency(initial=2, minimum=2, maximum=10, cooldown=0)
+        c.record_throttle()
+        assert c.limit == 2
+
+    def test_no_growth_without_available_sessions(self):
+        c = AdaptiveConcurrency(initial=2, maximum=10)
+        c.update_from_user_status({"available": 0, "processing": 2})
+        c.record_success()
+        c.record_success()
+        assert c.limit == 2
+
+    def test_user_status_caps_limit(self):
+        c = AdaptiveConcurrency(initial=8, maximum=10)
+        c.update_from_user_status({"available": 1, "processing": 2})
+        assert c.limit == 3
+
+    def test_maybe_sample_respects_interval(self):
+        c = AdaptiveConcurrency(sample_interval=60)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return {"available": 5, "processing": 0}
+
+        c.maybe_sample(fetch)
+        c.maybe_sample(fetch)
+        assert len(calls) == 1
+
+    def test_maybe_sample_swallows_errors(self):
+        c = AdaptiveConcurrency()
+
+        def fetch():
+            raise RuntimeError("boom")
+
+        c.maybe_sample(fetch)
+        assert c.limit == 5
+
+    def test_slot_bounds_in_flight(self):
+        c = AdaptiveConcurrency(initial=2, maximum=2)
+        peak = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        def work():
+            with c.slot():
+                with lock:
+                    peak["now"] += 1
+                    peak["max"] = max(peak["max"], peak["now"])
+                time.sleep(0.01)
+                with lock:
+                    peak["now"] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert peak["max"] <= 2
+        assert c.in_flight == 0
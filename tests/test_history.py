@@ -1,10 +1,11 @@
 import sqlite3
 import threading
 import time
+from datetime import timedelta
 
 import pytest
 
-from archivooor.history import HistoryDB
+from archivooor.history import _SCHEMA_SQL, HistoryDB, RecentSuccesses, _percentile
 
 
 @pytest.fixture
@@ -116,15 +117,105 @@ class TestHistoryDB:
         assert not errors
         assert len(history_db.query(limit=100)) == 20
 
+    def test_last_successes(self, history_db):
+        history_db.record_submission("https://a.com", "j1", "submitted")
+        history_db.record_submission("https://a.com", "j2", "submitted")
+        history_db.record_submission("https://b.com", "j3", "submitted")
+        history_db.update_completion("j1", status="success")
+        history_db.update_completion("j2", status="success")
+        history_db.update_completion("j3", status="error")
+        latest = history_db.query(url="a.com", limit=1)[0]["completed_at"]
+
+        captured = history_db.last_successes(
+            ["https://a.com", "https://b.com", "https://c.com"]
+        )
+
+        assert captured == {"https://a.com": latest}
+
+    def test_archived_since(self, history_db):
+        history_db.record_submission("https://a.com", "j1", "submitted")
+        history_db.record_submission("https://b.com", "j2", "submitted")
+        history_db.update_completion("j1", status="success")
+        history_db.update_completion("j2", status="error")
+
+        since = "2000-01-01T00:00:00+00:00"
+        assert history_db.archived_since("https://a.com", since)
+        assert not history_db.archived_since("https://b.com", since)
+        assert not history_db.archived_since("https://a.com", "9999-01-01")
+        assert list(history_db.iter_successes_since(since)) == ["https://a.com"]
+        assert history_db.count_successes_since(since) == 1
+
+    def test_recent_successes(self, history_db):
+        history_db.record_submission("https://a.com", "j1", "submitted")
+        history_db.record_submission("https://b.com", "j2", "submitted")
+        history_db.update_completion("j1", status="success")
+
+        recent = RecentSuccesses(history_db, timedelta(days=1))
+
+        assert "https://a.com" in recent
+        assert "https://b.com" not in recent
+        assert "https://c.com" not in recent
+
+    def test_recent_successes_window(self, history_db):
+        history_db.record_submission("https://a.com", "j1", "submitted")
+        history_db.update_completion("j1", status="success")
+        conn = history_db._get_connection()
+        conn.execute("UPDATE submissions SET completed_at = '2000-01-01T00:00:00'")
+        conn.commit()
+
+        assert "https://a.com" not in RecentSuccesses(history_db, timedelta(days=1))
+
     def test_schema_version(self, tmp_path):
         db_path = str(tmp_path / "version.db")
         db = HistoryDB(db_path=db_path)
         conn = sqlite3.connect(db_path)
         (version,) = conn.execute("PRAGMA user_version").fetchone()
-        assert version == 1
+        assert version == 3
         conn.close()
         db.close()
 
+    def test_migrates_v1_database(self, tmp_path):
+        db_path = str(tmp_path / "v1.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(_SCHEMA_SQL)
+        conn.execute(
+            "INSERT INTO submissions (url, job_id, submitted_at, status) "
+            "VALUES ('https://old.example.com/page', 'j1', '2026-01-01', 'success')"
+        )
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        conn.close()
+
+        db = HistoryDB(db_path=db_path)
+        rows = db.query(url="old.example")
+        db.close()
+
+        assert [row["job_id"] for row in rows] == ["j1"]
+
+    def test_url_search_uses_index(self, history_db):
+        history_db.record_submission("https://a.com/Foo_bar", "j1", "submitted")
+        history_db.record_submission("https://b.com/x", "j2", "submitted")
+        history_db.record_submission('https://c.com/"q"', "j3", "submitted")
+
+        assert [r["job_id"] for r in history_db.query(url="foo_bar")] == ["j1"]
+        assert [r["job_id"] for r in history_db.query(url='"q"')] == ["j3"]
+        assert [r["job_id"] for r in history_db.query(url="b.")] == ["j2"]
+        plan = " ".join(
+            row[-1]
+            for row in history_db._get_connection().execute(
+                "EXPLAIN QUERY PLAN SELECT rowid FROM submissions_url_fts "
+                "WHERE submissions_url_fts MATCH 'foo'"
+            )
+        )
+        assert "VIRTUAL TABLE INDEX" in plan
+
+    def test_url_index_follows_deletes(self, history_db):
+        history_db.record_submission("https://a.com/page", "j1", "submitted")
+        history_db.clear()
+        history_db.record_submission("https://b.com/page", "j2", "submitted")
+
+        assert [r["job_id"] for r in history_db.query(url="page")] == ["j2"]
+
     def test_default_db_path(self):
         db = HistoryDB.__new__(HistoryDB)
         from archivooor.history import _default_db_path
@@ -132,3 +223,349 @@ class TestHistoryDB:
         path = _default_db_path()
         assert "archivooor" in path
         assert path.endswith("history.db")
+
+
+class TestWriteBehind:
+    @pytest.fixture
+    def wb_db(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "wb.db"), write_behind=True)
+        yield db
+        db.close()
+
+    def test_reads_see_queued_writes(self, wb_db):
+        assert wb_db.record_submission("https://a.com", "j1", "submitted") is None
+        wb_db.update_completion("j1", status="success", timestamp="20260425120000")
+
+        rows = wb_db.query()
+        assert rows[0]["status"] == "success"
+        assert rows[0]["timestamp"] == "20260425120000"
+        assert wb_db.queue_depth == 0
+
+    def test_batches_rows_into_one_transaction(self, tmp_path):
+        db = HistoryDB(
+            db_path=str(tmp_path / "wb.db"),
+            write_behind=True,
+            batch_size=1000,
+            flush_interval=0.5,
+        )
+        for i in range(50):
+            db.record_submission(f"https://{i}.com", f"job{i}", "submitted")
+
+        assert db.queue_depth > 0
+        assert db.flush(timeout=5)
+        assert db.queue_depth == 0
+        assert len(db.query(limit=100)) == 50
+        db.close()
+
+    def test_duplicate_only_drops_duplicate(self, wb_db):
+        wb_db.record_submission("https://a.com", "dup1", "submitted")
+        wb_db.record_submission("https://b.com", "dup1", "submitted")
+        wb_db.record_submission("https://c.com", "j2", "submitted")
+
+        urls = {row["url"] for row in wb_db.query()}
+        assert urls == {"https://a.com", "https://c.com"}
+
+    def test_close_flushes(self, tmp_path):
+        db_path = str(tmp_path / "wb.db")
+        db = HistoryDB(db_path=db_path, write_behind=True, flush_interval=10)
+        for i in range(5):
+            db.record_submission(f"https://{i}.com", f"job{i}", "submitted")
+        db.close()
+
+        conn = sqlite3.connect(db_path)
+        (count,) = conn.execute("SELECT COUNT(*) FROM submissions").fetchone()
+        conn.close()
+        assert count == 5
+
+    def test_concurrent_writers(self, wb_db):
+        threads = [
+            threading.Thread(
+                target=wb_db.record_submission,
+                args=(f"https://{i}.com", f"job{i}", "submitted"),
+            )
+            for i in range(20)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(wb_db.query(limit=100)) == 20
+
+
+class TestIterRows:
+    def _fill(self, db, n=5):
+        conn = db._get_connection()
+        # Two rows share each submitted_at so that ties are paged by id.
+        conn.executemany(
+            "INSERT INTO submissions (url, job_id, submitted_at, status) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (f"https://a.com/{i}", f"j{i}", f"2026-01-0{i // 2 + 1}", "success")
+                for i in range(n)
+            ],
+        )
+        conn.commit()
+
+    def test_pages_in_order(self, history_db):
+        self._fill(history_db)
+
+        rows = list(history_db.iter_rows(page_size=2))
+
+        assert [row["job_id"] for row in rows] == ["j0", "j1", "j2", "j3", "j4"]
+
+    def test_resume_after_cursor(self, history_db):
+        self._fill(history_db)
+        rows = history_db.iter_rows(page_size=2)
+        seen = [next(rows) for _ in range(3)]
+
+        rest = list(
+            history_db.iter_rows(
+                after=(seen[-1]["submitted_at"], seen[-1]["id"]), page_size=2
+            )
+        )
+
+        assert [row["job_id"] for row in rest] == ["j3", "j4"]
+
+    def test_filters(self, history_db):
+        self._fill(history_db)
+        history_db.record_submission("https://b.com/x", None, "error")
+
+        assert [r["url"] for r in history_db.iter_rows(status="error")] == [
+            "https://b.com/x"
+        ]
+        assert len(list(history_db.iter_rows(url="a.com", page_size=2))) == 5
+        assert len(list(history_db.iter_rows(since="2026-01-02"))) == 4
+
+    def test_is_lazy(self, history_db):
+        self._fill(history_db)
+        rows = history_db.iter_rows(page_size=2)
+        next(rows)
+
+        history_db.record_submission("https://c.com", None, "error")
+
+        assert [row["url"] for row in rows][-1] == "https://c.com"
+
+
+class TestStats:
+    def _fill(self, db):
+        db.record_submission("https://A.com/1", "j1", "submitted")
+        db.record_submission("https://a.com:8443/2?x=1", "j2", "submitted")
+        db.record_submission("https://b.com", "j3", "submitted")
+        db.record_submission("https://b.com/x", None, "error")
+        db.update_completion("j1", status="success", duration_sec=2.5)
+        db.update_completion("j2", status="success", duration_sec=12.0)
+        db.update_completion("j3", status="error", status_ext="error:timeout")
+
+    def test_by_domain(self, history_db):
+        self._fill(history_db)
+
+        stats = {row["domain"]: row for row in history_db.stats(by="domain")}
+
+        assert set(stats) == {"a.com", "a.com:8443", "b.com"}
+        assert stats["b.com"]["total"] == 2
+        assert stats["b.com"]["success_rate"] == 0
+        assert stats["b.com"]["errors"] == {"error:timeout": 1, "unknown": 1}
+        assert stats["a.com"]["success_rate"] == 1
+        assert 2 <= stats["a.com"]["p50"] <= 3
+
+    def test_by_day(self, history_db):
+        self._fill(history_db)
+
+        (today,) = history_db.stats()
+
+        assert today["total"] == 4
+        assert today["statuses"] == {"success": 2, "error": 2}
+        assert today["success_rate"] == 0.5
+        assert history_db.stats(since="9999-01-01") == []
+        assert history_db.stats(domain="B.com")[0]["total"] == 2
+
+    def test_rollups_follow_updates_and_deletes(self, history_db):
+        self._fill(history_db)
+        history_db.update_completion("j3", status="success", duration_sec=1.0)
+        assert history_db.stats()[0]["statuses"] == {"success": 3, "error": 1}
+
+        history_db.clear()
+
+        assert history_db.stats() == []
+        (count,) = (
+            history_db._get_connection()
+            .execute("SELECT COUNT(*) FROM submission_rollups WHERE count != 0")
+            .fetchone()
+        )
+        assert count == 0
+
+    def test_migration_backfills_rollups(self, tmp_path):
+        db_path = str(tmp_path / "v1.db")
+        conn = sqlite3.connect(db_path)
+        conn.executescript(_SCHEMA_SQL)
+        conn.execute(
+            "INSERT INTO submissions (url, submitted_at, status, duration_sec) "
+            "VALUES ('https://old.com/a', '2026-01-01T00:00:00', 'success', 4)"
+        )
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        conn.close()
+
+        db = HistoryDB(db_path=db_path)
+        (row,) = db.stats(by="domain")
+        db.close()
+
+        assert row["domain"] == "old.com"
+        assert row["statuses"] == {"success": 1}
+
+    def test_percentile(self):
+        assert _percentile([0] * 16, 0.5) is None
+        # Everything between 2s and 3s.
+        assert _percentile([0, 0, 4] + [0] * 13, 0.5) == 2.5
+        assert _percentile([0] * 15 + [1], 0.95) == 300.0
+
+
+class TestPrune:
+    def _insert(self, db, rows):
+        conn = db._get_connection()
+        conn.executemany(
+            "INSERT INTO submissions (url, submitted_at, status) VALUES (?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+
+    def _urls(self, db):
+        return sorted((row["url"], row["submitted_at"]) for row in db.iter_rows())
+
+    def test_new_database_uses_incremental_vacuum(self, history_db):
+        (mode,) = history_db._get_connection().execute("PRAGMA auto_vacuum").fetchone()
+        assert mode == 2
+
+    def test_older_than(self, history_db):
+        self._insert(
+            history_db,
+            [("https://a.com", "2000-01-01", "success")]
+            + [("https://b.com", "2000-01-02", "success")] * 4,
+        )
+        history_db.record_submission("https://c.com", None, "success")
+
+        deleted = history_db.prune(older_than=timedelta(days=1), batch_size=2)
+
+        assert deleted == 5
+        assert [url for url, _ in self._urls(history_db)] == ["https://c.com"]
+
+    def test_keep_latest(self, history_db):
+        self._insert(
+            history_db,
+            [
+                ("https://a.com", "2000-01-01", "success"),
+                ("https://a.com", "2000-01-03", "success"),
+                ("https://a.com", "2000-01-02", "error"),
+                ("https://b.com", "2000-01-01", "success"),
+            ],
+        )
+
+        assert history_db.prune(keep_latest=1, batch_size=1) == 2
+        assert self._urls(history_db) == [
+            ("https://a.com", "2000-01-03"),
+            ("https://b.com", "2000-01-01"),
+        ]
+
+    def test_rules_combine(self, history_db):
+        self._insert(
+            history_db,
+            [
+                ("https://a.com", "2000-01-01", "submitted"),
+                ("https://a.com", "2000-01-02", "success"),
+            ],
+        )
+        history_db.record_submission("https://b.com", None, "submitted")
+
+        deleted = history_db.prune(older_than=timedelta(days=1), terminal_only=True)
+
+        assert deleted == 1
+        assert ("https://a.com", "2000-01-01") not in self._urls(history_db)
+        assert len(self._urls(history_db)) == 2
+
+    def test_needs_a_rule(self, history_db):
+        with pytest.raises(ValueError):
+            history_db.prune()
+
+    def test_archive(self, history_db, tmp_path):
+        self._insert(history_db, [("https://a.com", "2000-01-01", "success")] * 3)
+        archive_path = str(tmp_path / "archive.db")
+
+        history_db.prune(older_than=timedelta(days=1), archive_path=archive_path)
+
+        conn = sqlite3.connect(archive_path)
+        (count,) = conn.execute("SELECT COUNT(*) FROM submissions").fetchone()
+        conn.close()
+        assert count == 3
+        assert history_db.query() == []
+        assert history_db.query(url="a.com") == []
+        assert history_db.stats() == []
+
+    def test_converts_and_shrinks_old_database(self, tmp_path):
+        db_path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA auto_vacuum = NONE")
+        conn.executescript(_SCHEMA_SQL)
+        conn.executemany(
+            "INSERT INTO submissions (url, submitted_at, status) VALUES (?, ?, ?)",
+            [
+                (f"https://a.com/{'x' * 200}{i}", "2000-01-01", "success")
+                for i in range(2000)
+            ],
+        )
+        conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        conn.close()
+        db = HistoryDB(db_path=db_path)
+        conn = db._get_connection()
+        (pages_before,) = conn.execute("PRAGMA page_count").fetchone()
+
+        db.prune(older_than=timedelta(days=1))
+
+        (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+        (pages_after,) = conn.execute("PRAGMA page_count").fetchone()
+        (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+        db.close()
+        assert mode == 2
+        assert free == 0
+        assert pages_after < pages_before / 10
+
+
+class TestPendingJobs:
+    def test_iter_and_count(self, history_db):
+        history_db.record_submission("https://a.com", "j1", "submitted")
+        history_db.record_submission("https://b.com", "j2", "submitted")
+        history_db.record_submission("https://c.com", None, "submitted")
+        history_db.record_submission("https://d.com", "j3", "submitted")
+        history_db.update_completion("j2", status="success")
+
+        assert history_db.count_pending_jobs() == 2
+        assert list(history_db.iter_pending_jobs(page_size=1)) == ["j1", "j3"]
+
+    def test_update_completions(self, history_db):
+        history_db.record_submission("https://a.com", "j1", "submitted")
+        history_db.record_submission("https://b.com", "j2", "submitted")
+
+        applied = history_db.update_completions(
+            [
+                {"job_id": "j1", "status": "success", "duration_sec": 2.0},
+                {"job_id": "j2", "status": "error", "status_ext": "error:x"},
+            ]
+        )
+
+        assert applied == 2
+        rows = {row["job_id"]: row for row in history_db.query()}
+        assert rows["j1"]["status"] == "success"
+        assert rows["j1"]["duration_sec"] == 2.0
+        assert rows["j2"]["status_ext"] == "error:x"
+        assert rows["j2"]["completed_at"] is not None
+        assert history_db.update_completions([]) == 0
+
+    def test_update_completions_write_behind(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "wb.db"), write_behind=True)
+        db.record_submission("https://a.com", "j1", "submitted")
+
+        db.update_completions([{"job_id": "j1", "status": "success"}])
+
+        assert db.query()[0]["status"] == "success"
+        db.close()
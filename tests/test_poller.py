@@ -0,0 +1,163 @@
+import threading
+import time
+
+from archivooor.poller import PollScheduler
+
+
+class FakeStatuses:
+    def __init__(self, replies):
+        self.replies = {job: list(statuses) for job, statuses in replies.items()}
+        self.calls = []
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, job_ids):
+        statuses = {}
+        with self.lock:
+            self.batches.append(list(job_ids))
+            for job_id in job_ids:
+                self.calls.append(job_id)
+                reply = self.replies[job_id].pop(0)
+                if isinstance(reply, Exception):
+                    raise reply
+                statuses[job_id] = reply
+        return statuses
+
+
+def make_poller(fetch, **kwargs):
+    completed = {}
+    kwargs.setdefault("poll_interval", 0)
+    poller = PollScheduler(fetch, completed.__setitem__, **kwargs)
+    return poller, completed
+
+
+class TestPollScheduler:
+    def test_polls_until_terminal(self):
+        fetch = FakeStatuses(
+            {"j1": [{"status": "pending"}, {"status": "success", "timestamp": "1"}]}
+        )
+        poller, completed = make_poller(fetch)
+
+        poller.add("j1")
+
+        assert poller.wait_idle(timeout=5)
+        assert completed == {"j1": {"status": "success", "timestamp": "1"}}
+        assert fetch.calls == ["j1", "j1"]
+        poller.close()
+
+    def test_gives_up_after_max_polls(self):
+        fetch = FakeStatuses({"j1": [{"status": "pending"}] * 3})
+        poller, completed = make_poller(fetch, max_polls=3)
+
+        poller.add("j1")
+
+        assert poller.wait_idle(timeout=5)
+        assert completed == {}
+        assert len(fetch.calls) == 3
+        poller.close()
+
+    def test_error_rechecked_before_final(self):
+        fetch = FakeStatuses(
+            {"j1": [{"status": "error"}, {"status": "error"}, {"status": "error"}]}
+        )
+        poller, completed = make_poller(fetch, error_retries=2, max_error_delay=0)
+
+        poller.add("j1")
+
+        assert poller.wait_idle(timeout=5)
+        assert completed["j1"]["status"] == "error"
+        assert len(fetch.calls) == 3
+        poller.close()
+
+    def test_fetch_exceptions_are_retried(self):
+        fetch = FakeStatuses({"j1": [RuntimeError("boom"), {"status": "success"}]})
+        poller, completed = make_poller(fetch)
+
+        poller.add("j1")
+
+        assert poller.wait_idle(timeout=5)
+        assert completed["j1"]["status"] == "success"
+        poller.close()
+
+    def test_many_jobs_bounded_threads(self):
+        jobs = {f"j{i}": [{"status": "success"}] for i in range(200)}
+        fetch = FakeStatuses(jobs)
+        poller, completed = make_poller(fetch, max_concurrency=2)
+        before = threading.active_count()
+
+        for job_id in jobs:
+            poller.add(job_id)
+
+        assert threading.active_count() <= before + 3
+        assert poller.wait_idle(timeout=10)
+        assert len(completed) == 200
+        poller.close()
+
+    def test_due_time_respected(self):
+        fetch = FakeStatuses({"j1": [{"status": "success"}]})
+        poller, completed = make_poller(fetch)
+
+        poller.add("j1", delay=3600)
+
+        assert not poller.wait_idle(timeout=0.1)
+        assert len(poller) == 1
+        assert fetch.calls == []
+        poller.close()
+
+    def test_due_jobs_are_batched(self):
+        jobs = {f"j{i}": [{"status": "success"}] for i in range(5)}
+        fetch = FakeStatuses(jobs)
+        poller, completed = make_poller(fetch, batch_size=2, max_concurrency=1)
+
+        with poller._cond:
+            for job_id in jobs:
+                poller.add(job_id, delay=0)
+
+        assert poller.wait_idle(timeout=5)
+        assert len(completed) == 5
+        assert all(len(batch) <= 2 for batch in fetch.batches)
+        assert len(fetch.batches) < 5
+        poller.close()
+
+    def test_batches_are_checked_concurrently(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def fetch(job_ids):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return {job_id: {"status": "success"} for job_id in job_ids}
+
+        poller, completed = make_poller(fetch, batch_size=10, max_concurrency=4)
+
+        with poller._cond:
+            for i in range(40):
+                poller.add(f"j{i}", delay=0)
+
+        assert poller.wait_idle(timeout=5)
+        assert len(completed) == 40
+        assert peak > 1
+        poller.close()
+
+    def test_missing_job_in_batch_is_repolled(self):
+        fetch = FakeStatuses({"j1": [{"status": "success"}]})
+        calls = []
+
+        def flaky(job_ids):
+            calls.append(job_ids)
+            return {} if len(calls) == 1 else fetch(job_ids)
+
+        poller, completed = make_poller(flaky)
+
+        poller.add("j1")
+
+        assert poller.wait_idle(timeout=5)
+        assert completed["j1"]["status"] == "success"
+        assert len(calls) == 2
+        poller.close()
@@ -0,0 +1,158 @@
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from archivooor.archiver import Archiver, NetworkHandler, _RateLimitedAdapter
+from archivooor.ratelimit import (
+    DeadlineExceeded,
+    RateLimiter,
+    TokenBucket,
+    default_limiter,
+    endpoint_for,
+    parse_retry_after,
+)
+
+SAVE_URL_RE = re.compile(r"https://web\.archive\.org/save/.*")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after("7") == 7.0
+
+    def test_http_date(self):
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        seconds = parse_retry_after(format_datetime(when, usegmt=True))
+        assert 25 <= seconds <= 30
+
+    @pytest.mark.parametrize("value", [None, "", "soon"])
+    def test_invalid(self, value):
+        assert parse_retry_after(value) is None
+
+
+class TestTokenBucket:
+    def test_burst_then_waits(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, burst=2, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire()
+        bucket.acquire()
+        assert clock.sleeps == []
+
+        bucket.acquire()
+        assert clock.sleeps == [pytest.approx(1.0)]
+
+    def test_pause_blocks_and_empties(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, burst=5, clock=clock, sleep=clock.sleep)
+
+        bucket.pause(10)
+        bucket.acquire()
+
+        assert clock.now == pytest.approx(11.0)
+
+    def test_unlimited_still_paused(self):
+        clock = FakeClock()
+        bucket = TokenBucket(None, clock=clock, sleep=clock.sleep)
+
+        bucket.acquire()
+        bucket.pause(3)
+        bucket.acquire()
+
+        assert clock.sleeps == [3]
+
+    def test_try_acquire_returns_wait_without_sleeping(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, burst=1, clock=clock, sleep=clock.sleep)
+
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == pytest.approx(1.0)
+        assert clock.sleeps == []
+
+    def test_acquire_never_waits_past_deadline(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, burst=1, clock=clock, sleep=clock.sleep)
+        bucket.pause(10)
+
+        with pytest.raises(DeadlineExceeded):
+            bucket.acquire(deadline_at=5)
+        assert clock.sleeps == []
+
+        bucket.acquire(deadline_at=20)
+        assert clock.now == pytest.approx(11.0)
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+
+class TestRateLimiter:
+    def test_endpoint_classification(self):
+        assert endpoint_for("https://web.archive.org/save/https://a.com") == "save"
+        assert endpoint_for("https://web.archive.org/save/status/abc") == "status"
+        assert endpoint_for("/save/status/user?_t=1") == "status"
+        assert endpoint_for("https://web.archive.org/save/status") == "status"
+
+    def test_page_url_containing_status_path_is_a_save(self):
+        page = "https://example.com/save/status/x"
+        assert endpoint_for(f"https://web.archive.org/save/{page}") == "save"
+        assert endpoint_for(f"/save/{page}") == "save"
+
+    def test_retry_after_pauses_all_buckets(self):
+        limiter = RateLimiter()
+        limiter.observe(429, "30")
+        for bucket in limiter.buckets.values():
+            assert bucket._paused_until > 0
+
+    def test_success_does_not_pause(self):
+        limiter = RateLimiter()
+        limiter.observe(200, "30")
+        assert all(b._paused_until < 0 for b in limiter.buckets.values())
+
+    def test_default_is_shared(self):
+        assert default_limiter() is default_limiter()
+        assert Archiver("a", "s", track_history=False).rate_limiter is default_limiter()
+
+
+class TestArchiverRateLimiting:
+    def test_every_request_takes_a_token(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, json={"job_id": "1"}, status=200)
+        acquired = []
+        a.rate_limiter.acquire = acquired.append
+
+        a.save_page("https://a.com")
+
+        assert acquired == ["https://web.archive.org/save/https://a.com"]
+
+    def test_retry_after_on_response_pauses(self, archiver):
+        a, rsps = archiver
+        rsps.post(SAVE_URL_RE, status=429, headers={"Retry-After": "120"})
+        paused = []
+        a.rate_limiter.pause = paused.append
+
+        with pytest.raises(requests.HTTPError):
+            a.save_page("https://a.com")
+
+        assert paused == [120.0]
+
+    def test_handler_without_limiter_keeps_urllib3_retry_after(self):
+        adapter = NetworkHandler().session.get_adapter("https://")
+        assert type(adapter) is HTTPAdapter
+        assert adapter.max_retries.respect_retry_after_header is True
@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+from archivooor.retry import RetryBudget, RetryPolicy, RetryScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRetryScheduler:
+    def test_delay_is_exponential_and_capped(self):
+        s = RetryScheduler(base_delay=1, max_delay=30)
+        with patch("archivooor.retry.random.random", return_value=1.0):
+            assert [s.delay_for(n) for n in (1, 2, 3, 10)] == [1, 2, 4, 30]
+
+    def test_delay_is_jittered(self):
+        s = RetryScheduler(base_delay=4)
+        with patch("archivooor.retry.random.random", return_value=0.0):
+            assert s.delay_for(1) == 2
+
+    def test_pop_due_respects_backoff(self):
+        clock = FakeClock()
+        s = RetryScheduler(clock=clock)
+        with patch.object(s, "delay_for", return_value=5):
+            s.schedule("https://a.com", 1)
+
+        assert s.pop_due() is None
+        assert s.next_due_in() == 5
+
+        clock.now = 5
+        assert s.pop_due() == ("https://a.com", 1)
+        assert len(s) == 0
+        assert s.next_due_in() is None
+
+    def test_earliest_due_first(self):
+        clock = FakeClock()
+        s = RetryScheduler(clock=clock)
+        with patch.object(s, "delay_for", side_effect=[10, 1, 1]):
+            s.schedule("https://late.com", 1)
+            s.schedule("https://early.com", 1)
+            s.schedule("https://early2.com", 1)
+
+        clock.now = 20
+        assert [s.pop_due()[0] for _ in range(3)] == [
+            "https://early.com",
+            "https://early2.com",
+            "https://late.com",
+        ]
+
+
+class TestRetryBudget:
+    def test_min_retries_always_allowed(self):
+        budget = RetryBudget(ratio=0.0, min_retries=2, clock=FakeClock())
+        assert budget.try_spend()
+        assert budget.try_spend()
+        assert not budget.try_spend()
+
+    def test_ratio_of_first_attempts(self):
+        budget = RetryBudget(ratio=0.2, min_retries=0, clock=FakeClock())
+        for _ in range(10):
+            budget.record_attempt()
+        assert budget.try_spend()
+        assert budget.try_spend()
+        assert not budget.try_spend()
+
+    def test_window_slides(self):
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.0, min_retries=1, window=60, clock=clock)
+        assert budget.try_spend()
+        assert not budget.try_spend()
+
+        clock.now = 61
+        assert budget.try_spend()
+
+    def test_unlimited(self):
+        budget = RetryBudget(ratio=None, min_retries=0, clock=FakeClock())
+        assert all(budget.try_spend() for _ in range(100))
+
+
+class TestRetryPolicy:
+    def test_per_url_limit(self):
+        batch = RetryPolicy(max_retries=1).new_batch()
+        assert batch.deny_reason(0) is None
+        assert batch.deny_reason(1) == "max retries exceeded"
+
+    def test_per_batch_limit(self):
+        batch = RetryPolicy(max_batch_retries=1).new_batch()
+        assert batch.deny_reason(0) is None
+        assert batch.deny_reason(0) == "batch retry limit reached"
+
+    def test_budget_limit(self):
+        policy = RetryPolicy(budget=RetryBudget(ratio=0, min_retries=0))
+        assert policy.new_batch().deny_reason(0) == "retry budget exhausted"
+
+    def test_status_retries(self):
+        policy = RetryPolicy(status_retries=1)
+        assert policy.allow_status_retry(0)
+        assert not policy.allow_status_retry(1)
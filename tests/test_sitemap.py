@@ -1,9 +1,30 @@
+import contextlib
+import gzip
+import threading
+import time
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+
 import pytest
 import responses
 
 from archivooor.archiver import Sitemap
+from archivooor.canonical import Canonicalizer
+from archivooor.history import HistoryDB
 from tests.conftest import SAMPLE_SITEMAPINDEX_XML, SAMPLE_URLSET_XML
 
+NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+def urlset(*pages):
+    entries = "".join(f"<url><loc>https://example.com/{p}</loc></url>" for p in pages)
+    return f'<urlset xmlns="{NS}">{entries}</urlset>'
+
+
+def sitemapindex(*children):
+    entries = "".join(f"<sitemap><loc>{c}</loc></sitemap>" for c in children)
+    return f'<sitemapindex xmlns="{NS}">{entries}</sitemapindex>'
+
 
 class TestLoadSitemap:
     def test_local_file_with_file_prefix(self, tmp_path):
@@ -77,14 +98,31 @@ class TestExtractPages:
 
         assert len(pages) == 2
 
-    def test_sitemapindex_raises(self, tmp_path):
+    def test_canonicalizer_dedupes_variants(self, tmp_path):
+        f = tmp_path / "sitemap.xml"
+        f.write_text(urlset("a/", "a/?utm_source=x", "b").replace("example", "Example"))
+
+        sm = Sitemap(str(f), canonicalizer=Canonicalizer())
+
+        assert sm.extract_pages_from_sitemap() == [
+            "https://example.com/a/",
+            "https://example.com/b",
+        ]
+
+    @responses.activate
+    def test_sitemapindex_expands_children(self, tmp_path):
         f = tmp_path / "sitemap.xml"
         f.write_text(SAMPLE_SITEMAPINDEX_XML)
+        responses.get("https://example.com/sitemap1.xml", body=urlset("a", "b"))
+        responses.get("https://example.com/sitemap2.xml", body=urlset("b", "c"))
 
-        sm = Sitemap(str(f))
+        pages = Sitemap(str(f)).extract_pages_from_sitemap()
 
-        with pytest.raises(NotImplementedError):
-            sm.extract_pages_from_sitemap()
+        assert sorted(pages) == [
+            "https://example.com/a",
+            "https://example.com/b",
+            "https://example.com/c",
+        ]
 
     @pytest.mark.parametrize(
         "url, expected",
@@ -99,3 +137,306 @@ class TestExtractPages:
         s.location = url
         s.LOCAL_PREFIX = "file://"
         assert s._sitemap_is_local() is expected
+
+
+class TestStreamingSitemap:
+    def test_nothing_loaded_up_front(self, tmp_path):
+        f = tmp_path / "sitemap.xml"
+        f.write_text(SAMPLE_URLSET_XML)
+
+        sm = Sitemap(str(f), stream=True)
+
+        assert sm.content is None
+        assert sm.type is None
+
+    def test_local_file_in_document_order(self, tmp_path):
+        xml = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/b</loc></url>
+  <url><loc> https://example.com/a </loc></url>
+  <url><loc>https://example.com/b</loc></url>
+  <url><loc>https://example.com/c</loc></url>
+</urlset>"""
+        f = tmp_path / "sitemap.xml"
+        f.write_text(xml)
+
+        sm = Sitemap(f"file://{f}", stream=True)
+
+        assert list(sm.iter_pages()) == [
+            "https://example.com/b",
+            "https://example.com/a",
+            "https://example.com/c",
+        ]
+        assert sm.type == "urlset"
+
+    def test_is_lazy(self, tmp_path):
+        f = tmp_path / "sitemap.xml"
+        f.write_text(SAMPLE_URLSET_XML)
+
+        pages = Sitemap(str(f), stream=True).iter_pages()
+
+        assert next(pages) == "https://example.com/page1"
+
+    def test_elements_are_cleared(self, tmp_path):
+        body = "".join(
+            f"<url><loc>https://example.com/{i}</loc></url>" for i in range(2000)
+        )
+        f = tmp_path / "sitemap.xml"
+        f.write_text(
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+            f"{body}</urlset>"
+        )
+        roots = []
+        real_iterparse = ET.iterparse
+
+        def spy(source, events):
+            for event, elem in real_iterparse(source, events):
+                if not roots:
+                    roots.append(elem)
+                yield event, elem
+
+        sm = Sitemap(str(f), stream=True)
+        with patch("archivooor.archiver.ET.iterparse", spy):
+            pages = list(sm.iter_pages())
+
+        assert len(pages) == 2000
+        assert len(roots[0]) <= 1
+
+    @responses.activate
+    def test_remote_gzip_encoded_response(self):
+        url = "https://example.com/sitemap.xml"
+        responses.get(
+            url,
+            body=gzip.compress(SAMPLE_URLSET_XML.encode()),
+            headers={"Content-Encoding": "gzip"},
+        )
+
+        pages = Sitemap(url, stream=True).extract_pages_from_sitemap()
+
+        assert pages == [
+            "https://example.com/page1",
+            "https://example.com/page2",
+            "https://example.com/page3",
+        ]
+
+
+class TestSitemapIndex:
+    @responses.activate
+    def test_gzipped_children_are_streamed(self):
+        responses.get(
+            "https://example.com/index.xml",
+            body=sitemapindex(
+                "https://example.com/s1.xml.gz", "https://example.com/s2.xml"
+            ),
+        )
+        responses.get(
+            "https://example.com/s1.xml.gz",
+            body=gzip.compress(urlset("a", "b").encode()),
+            content_type="application/x-gzip",
+        )
+        responses.get("https://example.com/s2.xml", body=urlset("c"))
+
+        sm = Sitemap("https://example.com/index.xml", stream=True)
+        pages = list(sm.iter_pages())
+
+        assert sm.type == "sitemapindex"
+        assert sorted(pages) == [
+            "https://example.com/a",
+            "https://example.com/b",
+            "https://example.com/c",
+        ]
+
+    @responses.activate
+    def test_requests_use_timeout(self):
+        responses.get("https://example.com/s.xml", body=urlset("a"))
+
+        list(Sitemap("https://example.com/s.xml", timeout=(1, 2)).iter_pages())
+        list(
+            Sitemap(
+                "https://example.com/s.xml", stream=True, timeout=(1, 2)
+            ).iter_pages()
+        )
+
+        assert [call.request.req_kwargs["timeout"] for call in responses.calls] == [
+            (1, 2),
+            (1, 2),
+        ]
+
+    def test_stalled_child_times_out(self, tmp_path):
+        index = tmp_path / "index.xml"
+        index.write_text(sitemapindex("https://example.com/stalled.xml"))
+        release = threading.Event()
+
+        def stalled(self, location, depth, results, stop):
+            release.wait()
+
+        sm = Sitemap(str(index), stream=True, timeout=(0.05, 0.05))
+        try:
+            with patch.object(Sitemap, "_read_child", stalled):
+                with pytest.raises(TimeoutError):
+                    list(sm.iter_pages())
+        finally:
+            release.set()
+
+    def test_local_gzipped_sitemap(self, tmp_path):
+        f = tmp_path / "sitemap.xml.gz"
+        f.write_bytes(gzip.compress(urlset("a").encode()))
+
+        assert Sitemap(str(f)).extract_pages_from_sitemap() == ["https://example.com/a"]
+        assert list(Sitemap(str(f), stream=True).iter_pages()) == [
+            "https://example.com/a"
+        ]
+
+    @responses.activate
+    def test_nested_index_and_cycle(self, caplog):
+        index = "https://example.com/index.xml"
+        responses.get(index, body=sitemapindex("https://example.com/nested.xml"))
+        responses.get(
+            "https://example.com/nested.xml",
+            body=sitemapindex(index, "https://example.com/leaf.xml"),
+        )
+        responses.get("https://example.com/leaf.xml", body=urlset("a"))
+
+        pages = list(Sitemap(index, stream=True).iter_pages())
+
+        assert pages == ["https://example.com/a"]
+        assert "cycle" in caplog.text
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_max_depth(self, caplog):
+        index = "https://example.com/index.xml"
+        responses.get(
+            index,
+            body=sitemapindex(
+                "https://example.com/nested.xml", "https://example.com/top.xml"
+            ),
+        )
+        responses.get(
+            "https://example.com/nested.xml",
+            body=sitemapindex("https://example.com/leaf.xml"),
+        )
+        responses.get("https://example.com/top.xml", body=urlset("top"))
+
+        pages = list(Sitemap(index, stream=True, max_depth=1).iter_pages())
+
+        assert pages == ["https://example.com/top"]
+        assert "deeper than 1" in caplog.text
+
+    @responses.activate
+    def test_failed_child_is_skipped(self, caplog, capsys):
+        index = "https://example.com/index.xml"
+        responses.get(
+            index,
+            body=sitemapindex(
+                "https://example.com/gone.xml", "https://example.com/ok.xml"
+            ),
+        )
+        responses.get("https://example.com/gone.xml", status=404)
+        responses.get("https://example.com/ok.xml", body=urlset("ok"))
+
+        pages = list(Sitemap(index, stream=True).iter_pages())
+
+        assert pages == ["https://example.com/ok"]
+        assert "Failed to read sitemap https://example.com/gone.xml" in caplog.text
+        assert capsys.readouterr().out == ""
+
+    def test_children_fetched_concurrently(self, tmp_path):
+        children = []
+        for i in range(6):
+            child = tmp_path / f"s{i}.xml"
+            child.write_text(urlset(f"p{i}"))
+            children.append(f"file://{child}")
+        index = tmp_path / "index.xml"
+        index.write_text(sitemapindex(*children))
+        in_flight = {"now": 0, "peak": 0}
+        lock = threading.Lock()
+        real_open = Sitemap._open_stream
+
+        @contextlib.contextmanager
+        def slow_open(self, location=None, headers=None):
+            with lock:
+                in_flight["now"] += 1
+                in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            time.sleep(0.05)
+            try:
+                with real_open(self, location, headers) as opened:
+                    yield opened
+            finally:
+                with lock:
+                    in_flight["now"] -= 1
+
+        sm = Sitemap(str(index), max_workers=3)
+        with patch.object(Sitemap, "_open_stream", slow_open):
+            pages = sm.extract_pages_from_sitemap()
+
+        assert len(pages) == 6
+        assert in_flight["peak"] == 3
+
+    def test_consumer_can_stop_early(self, tmp_path):
+        children = []
+        for i in range(3):
+            child = tmp_path / f"s{i}.xml"
+            child.write_text(urlset(*(f"{i}-{n}" for n in range(3000))))
+            children.append(str(child))
+        index = tmp_path / "index.xml"
+        index.write_text(sitemapindex(*children))
+
+        pages = Sitemap(str(index), stream=True).iter_pages()
+        first = next(pages)
+        pages.close()
+
+        assert first.startswith("https://example.com/")
+
+
+class TestSinceLastRun:
+    XML = f"""\
+<urlset xmlns="{NS}">
+  <url><loc>https://example.com/new</loc><lastmod>2026-10-17</lastmod></url>
+  <url><loc>https://example.com/changed</loc><lastmod>2026-10-17T12:00:00Z</lastmod></url>
+  <url><loc>https://example.com/same</loc><lastmod>2026-10-01</lastmod></url>
+  <url><loc>https://example.com/undated</loc></url>
+  <url><loc>https://example.com/failed</loc><lastmod>2026-10-01</lastmod></url>
+</urlset>"""
+
+    @pytest.fixture
+    def history(self, tmp_path):
+        db = HistoryDB(db_path=str(tmp_path / "h.db"))
+        for url in ("changed", "same", "undated", "failed"):
+            db.record_submission(f"https://example.com/{url}", url, "submitted")
+        for url in ("changed", "same", "undated"):
+            db.update_completion(url, status="success")
+        db.update_completion("failed", status="error")
+        conn = db._get_connection()
+        conn.execute(
+            "UPDATE submissions SET completed_at = '2026-10-17T09:00:00+00:00'"
+        )
+        conn.commit()
+        yield db
+        db.close()
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_skips_pages_not_modified_since_capture(self, tmp_path, history, stream):
+        f = tmp_path / "sitemap.xml"
+        f.write_text(self.XML)
+        sm = Sitemap(str(f), stream=stream)
+
+        pages = list(sm.iter_pages(since_last_run=history))
+
+        assert pages == [
+            "https://example.com/new",
+            "https://example.com/changed",
+            "https://example.com/undated",
+            "https://example.com/failed",
+        ]
+        assert sm.skipped == 1
+
+    def test_iter_entries_reads_lastmod(self, tmp_path):
+        f = tmp_path / "sitemap.xml"
+        f.write_text(self.XML)
+
+        entries = list(Sitemap(str(f), stream=True).iter_entries())
+
+        assert entries[0] == ("https://example.com/new", "2026-10-17")
+        assert entries[3] == ("https://example.com/undated", None)
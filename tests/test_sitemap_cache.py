@@ -0,0 +1,156 @@
+import pytest
+import responses
+
+from archivooor import sitemap_cache
+from archivooor.archiver import Sitemap
+from archivooor.sitemap_cache import SitemapCache, _default_cache_path
+from tests.conftest import SAMPLE_URLSET_XML
+
+SITEMAP_URL = "https://example.com/sitemap.xml"
+PAGES = [
+    "https://example.com/page1",
+    "https://example.com/page2",
+    "https://example.com/page3",
+]
+ENTRIES = [(page, None) for page in PAGES]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = SitemapCache(cache_path=str(tmp_path / "cache.db"))
+    yield c
+    c.close()
+
+
+class TestSitemapCache:
+    def test_put_and_get(self, cache):
+        entries = [
+            ("https://example.com/a", "2026-10-17"),
+            ("https://example.com/b", None),
+        ]
+        cache.put(SITEMAP_URL, "{ns}urlset", entries, etag='"v1"')
+
+        entry = cache.get(SITEMAP_URL)
+        entry["entries"] = list(entry["entries"])
+
+        assert entry == {
+            "etag": '"v1"',
+            "last_modified": None,
+            "root_tag": "{ns}urlset",
+            "entries": entries,
+        }
+
+    def test_entries_stream_in_and_out(self, cache, monkeypatch):
+        monkeypatch.setattr(sitemap_cache, "READ_CHUNK", 16)
+        entries = [(f"https://example.com/{i}", str(i % 3 or "")) for i in range(500)]
+        writer = cache.writer(SITEMAP_URL, "urlset", etag='"v1"')
+        for loc, lastmod in entries:
+            writer.add(loc, lastmod)
+        writer.commit()
+
+        read = cache.get(SITEMAP_URL)["entries"]
+
+        assert next(read) == ("https://example.com/0", None)
+        assert list(read) == [(loc, lastmod or None) for loc, lastmod in entries[1:]]
+
+    def test_missing(self, cache):
+        assert cache.get(SITEMAP_URL) is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = SitemapCache(cache_path=str(tmp_path / "cache.db"), max_bytes=150)
+        locs = [(f"https://example.com/{i}", None) for i in range(10)]
+        cache.put("https://a.com/s.xml", "urlset", locs)
+        cache.put("https://b.com/s.xml", "urlset", locs)
+        cache.get("https://a.com/s.xml")
+        cache.put("https://c.com/s.xml", "urlset", locs)
+
+        assert cache.get("https://a.com/s.xml") is not None
+        assert cache.get("https://b.com/s.xml") is None
+        assert cache.get("https://c.com/s.xml") is not None
+        cache.close()
+
+    def test_entry_larger_than_cache_is_skipped(self, tmp_path):
+        cache = SitemapCache(cache_path=str(tmp_path / "cache.db"), max_bytes=10)
+        cache.put(SITEMAP_URL, "urlset", ENTRIES)
+
+        assert cache.get(SITEMAP_URL) is None
+        cache.close()
+
+    def test_clear(self, cache):
+        cache.put(SITEMAP_URL, "urlset", ENTRIES)
+
+        assert cache.clear() == 1
+        assert cache.get(SITEMAP_URL) is None
+
+    def test_default_path_next_to_history(self):
+        assert "archivooor" in _default_cache_path()
+        assert _default_cache_path().endswith("sitemap_cache.db")
+
+
+class TestConditionalGet:
+    @responses.activate
+    def test_not_modified_uses_cache(self, cache):
+        responses.get(
+            SITEMAP_URL,
+            body=SAMPLE_URLSET_XML,
+            headers={"ETag": '"v1"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"},
+        )
+        assert Sitemap(SITEMAP_URL, cache=cache).extract_pages_from_sitemap() == PAGES
+
+        responses.replace(responses.GET, SITEMAP_URL, status=304)
+        sitemap = Sitemap(SITEMAP_URL, cache=cache)
+
+        assert sitemap.extract_pages_from_sitemap() == PAGES
+        assert sitemap.type == "urlset"
+        request = responses.calls[1].request
+        assert request.headers["If-None-Match"] == '"v1"'
+        assert request.headers["If-Modified-Since"] == "Sat, 17 Oct 2026 10:00:00 GMT"
+
+    @responses.activate
+    def test_modified_sitemap_replaces_entry(self, cache):
+        cache.put(
+            SITEMAP_URL, "urlset", [("https://example.com/old", None)], etag='"v0"'
+        )
+        responses.get(SITEMAP_URL, body=SAMPLE_URLSET_XML, headers={"ETag": '"v1"'})
+
+        assert Sitemap(SITEMAP_URL, cache=cache).extract_pages_from_sitemap() == PAGES
+        assert cache.get(SITEMAP_URL)["etag"] == '"v1"'
+        assert list(cache.get(SITEMAP_URL)["entries"]) == ENTRIES
+
+    @responses.activate
+    def test_without_validators_nothing_is_cached(self, cache):
+        responses.get(SITEMAP_URL, body=SAMPLE_URLSET_XML)
+
+        Sitemap(SITEMAP_URL, cache=cache).extract_pages_from_sitemap()
+
+        assert cache.get(SITEMAP_URL) is None
+
+    @responses.activate
+    def test_partially_read_sitemap_is_not_cached(self, cache):
+        responses.get(SITEMAP_URL, body=SAMPLE_URLSET_XML, headers={"ETag": '"v1"'})
+
+        pages = Sitemap(SITEMAP_URL, cache=cache).iter_pages()
+        next(pages)
+        pages.close()
+
+        assert cache.get(SITEMAP_URL) is None
+
+    @responses.activate
+    def test_index_children_are_cached(self, cache):
+        index = "https://example.com/index.xml"
+        child = "https://example.com/child.xml"
+        responses.get(
+            index,
+            body=(
+                '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f"<sitemap><loc>{child}</loc></sitemap></sitemapindex>"
+            ),
+            headers={"ETag": '"i1"'},
+        )
+        responses.get(child, body=SAMPLE_URLSET_XML, headers={"ETag": '"c1"'})
+        Sitemap(index, cache=cache).extract_pages_from_sitemap()
+
+        responses.replace(responses.GET, index, status=304)
+        responses.replace(responses.GET, child, status=304)
+
+        assert sorted(Sitemap(index, cache=cache).extract_pages_from_sitemap()) == PAGES
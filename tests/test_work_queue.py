@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+from archivooor import work_queue as wq
+from archivooor.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = WorkQueue(db_path=str(tmp_path / "queue.db"))
+    yield q
+    q.close()
+
+
+def states(queue, run_id):
+    rows = queue._get_connection().execute(
+        "SELECT url, state, attempts FROM items WHERE run_id = ? ORDER BY id",
+        (run_id,),
+    )
+    return [tuple(row) for row in rows]
+
+
+class TestWorkQueue:
+    def test_enqueue_ignores_duplicates(self, queue):
+        run_id = queue.create_run()
+
+        added = queue.enqueue(
+            run_id, ["https://a.com", "https://b.com", "https://a.com"]
+        )
+
+        assert added == 2
+        assert queue.counts(run_id) == {"pending": 2}
+
+    def test_bulk_enqueue_in_chunks(self, queue, monkeypatch):
+        monkeypatch.setattr(wq, "ENQUEUE_CHUNK", 7)
+        run_id = queue.create_run()
+
+        added = queue.enqueue(run_id, (f"https://{i}.com" for i in range(100)))
+
+        assert added == 100
+
+    def test_claim_moves_to_in_flight(self, queue):
+        run_id = queue.create_run()
+        queue.enqueue(run_id, ["https://a.com", "https://b.com", "https://c.com"])
+
+        claimed = queue.claim(run_id, limit=2)
+
+        assert [url for _, url in claimed] == ["https://a.com", "https://b.com"]
+        assert states(queue, run_id) == [
+            ("https://a.com", "in_flight", 1),
+            ("https://b.com", "in_flight", 1),
+            ("https://c.com", "pending", 0),
+        ]
+
+    def test_concurrent_claims_never_overlap(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        setup = WorkQueue(db_path=path)
+        run_id = setup.create_run()
+        setup.enqueue(run_id, (f"https://{i}.com" for i in range(500)))
+        claimed = []
+        lock = threading.Lock()
+
+        def worker():
+            q = WorkQueue(db_path=path)
+            while batch := q.claim(run_id, limit=10):
+                with lock:
+                    claimed.extend(url for _, url in batch)
+            q.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(claimed) == 500
+        assert len(set(claimed)) == 500
+        setup.close()
+
+    def test_record_results(self, queue):
+        run_id = queue.create_run()
+        urls = ["https://a.com", "https://b.com", "https://c.com"]
+        assert list(queue.iter_run(run_id, urls)) == urls
+
+        queue.record_result(
+            run_id, {"url": "https://a.com", "status": "submitted", "job_id": "j1"}
+        )
+        queue.record_result(
+            run_id, {"url": "https://b.com", "status": "failed", "message": "boom"}
+        )
+        queue.record_result(run_id, {"url": "https://c.com", "status": "deadline"})
+
+        assert queue.counts(run_id) == {"submitted": 1, "failed": 1, "pending": 1}
+
+    def test_deadline_results_are_not_reclaimed_in_the_same_run(self, queue):
+        run_id = queue.create_run()
+        seen = []
+        for url in queue.iter_run(run_id, ["https://a.com", "https://b.com"]):
+            seen.append(url)
+            queue.record_result(run_id, {"url": url, "status": "deadline"})
+            queue.flush()
+
+        assert seen == ["https://a.com", "https://b.com"]
+
+    def test_resume_after_crash(self, tmp_path):
+        path = str(tmp_path / "queue.db")
+        first = WorkQueue(db_path=path)
+        run_id = first.create_run()
+        urls = [f"https://{i}.com" for i in range(5)]
+        first.enqueue(run_id, urls)
+        pages = first.iter_run(run_id)
+        for url in [next(pages), next(pages)]:
+            first.record_result(run_id, {"url": url, "status": "submitted"})
+        first.flush()
+        # The process dies here with a claimed batch in flight.
+        first._get_connection().close()
+
+        second = WorkQueue(db_path=path)
+        assert second.resume(run_id) == 3
+        assert list(second.iter_run(run_id)) == urls[2:]
+        second.close()
+
+    def test_resume_retries_failed_after_backoff(self, queue, monkeypatch):
+        monkeypatch.setattr(wq, "RETRY_DELAY", 0)
+        run_id = queue.create_run()
+        list(queue.iter_run(run_id, ["https://a.com"]))
+        queue.record_result(run_id, {"url": "https://a.com", "status": "failed"})
+        queue.flush()
+        time.sleep(0.01)
+
+        queue.resume(run_id, max_attempts=2)
+        assert list(queue.iter_run(run_id)) == ["https://a.com"]
+        queue.record_result(run_id, {"url": "https://a.com", "status": "failed"})
+        queue.flush()
+
+        assert queue.resume(run_id, max_attempts=2) == 0
+
+    def test_first_url_is_claimed_before_more_input_is_read(self, queue):
+        read = []
+
+        def slow_input():
+            for i in range(40):
+                read.append(i)
+                yield f"https://{i}.com"
+
+        run_id = queue.create_run()
+        pages = queue.iter_run(run_id, slow_input())
+
+        assert next(pages) == "https://0.com"
+        assert read == [0]
+        assert list(pages) == [f"https://{i}.com" for i in range(1, 40)]
+
+    def test_delete_run(self, queue):
+        run_id = queue.create_run()
+        other = queue.create_run()
+        queue.enqueue(run_id, ["https://a.com"])
+        queue.enqueue(other, ["https://a.com"])
+
+        queue.delete_run(run_id)
+
+        assert not queue.has_run(run_id)
+        assert queue.counts(run_id) == {}
+        assert queue.counts(other) == {"pending": 1}
+
+    def test_prune_old_runs(self, queue):
+        old = queue.create_run()
+        queue.enqueue(old, ["https://a.com"])
+        queue._get_connection().execute(
+            "UPDATE runs SET created_at = '2000-01-01T00:00:00+00:00'"
+        )
+        new = queue.create_run()
+
+        assert queue.prune() == 1
+        assert not queue.has_run(old)
+        assert queue.counts(old) == {}
+        assert queue.has_run(new)
+
+    def test_has_run(self, queue):
+        run_id = queue.create_run()
+
+        assert queue.has_run(run_id)
+        assert not queue.has_run("nope")